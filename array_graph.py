@@ -0,0 +1,203 @@
+import threading
+from array import array
+
+from vocab import relations
+
+RELATION_DATA = []  # the read-only edge attribute dict of each relation code, see `ArrayGraph.get_edge_data`
+_lock = threading.Lock()
+
+
+def relation_code(relation):
+    code = relations.code(relation)
+    if code >= len(RELATION_DATA):
+        with _lock:
+            while len(RELATION_DATA) <= code:
+                RELATION_DATA.append({"relation": relations.strings[len(RELATION_DATA)], "code": len(RELATION_DATA)})
+    return code
+
+
+class EdgeView():
+    """
+    the subset of networkx's edge view used by the syntax trees
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, edge):
+        data = self.graph.get_edge_data(edge[0], edge[1])
+        if data is None:
+            raise KeyError("The edge %s-%s is not in the graph." % edge)
+        return data
+
+    def __call__(self, data=False):
+        graph = self.graph
+        for i in graph.edge_order():
+            if data is False:
+                yield graph.heads[i], graph.deps[i]
+            elif data is True:
+                yield graph.heads[i], graph.deps[i], RELATION_DATA[graph.codes[i]]
+            else:
+                yield graph.heads[i], graph.deps[i], RELATION_DATA[graph.codes[i]].get(data)
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return len(self.graph.edge_index)
+
+
+class ArrayGraph():
+    """
+    A directed graph of small non-negative integer nodes stored in flat arrays, implementing the
+    part of `networkx.DiGraph` used by `SyntaxTree`. Edges are kept in insertion order in parallel
+    head, dependent and relation code arrays; the child lists are indexed by node and rebuilt
+    lazily after the edges change. The only edge attributes are "relation" and its "code".
+    """
+    def __init__(self):
+        self.node_set = set()
+        self.heads = array("i")
+        self.deps = array("i")
+        self.codes = array("i")
+        self.edge_index = {}     # (head, dependent) -> position in the edge arrays
+        self.edge_data = {}      # (head, dependent) -> the attribute dict of the relation code
+        self.adjacency = None    # node -> children, None when it has to be rebuilt
+        self.reverse = None      # node -> governors, built with `adjacency`
+
+    def add_node(self, node):
+        if node not in self.node_set:
+            self.node_set.add(node)
+            self.adjacency = None
+
+    def has_node(self, node):
+        return node in self.node_set
+
+    def __contains__(self, node):
+        return node in self.node_set
+
+    def nodes(self):
+        return sorted(self.node_set)
+
+    def add_edge(self, head, dep, relation=None, code=None):
+        # `code` is accepted like networkx's attributes, it is the code of `relation` anyway
+        code = relation_code(relation)
+        i = self.edge_index.get((head, dep))
+        if i is not None:  # updating the relation, like networkx the edge keeps its position
+            self.codes[i] = code
+            self.edge_data[(head, dep)] = RELATION_DATA[code]
+            return
+        self.node_set.add(head)
+        self.node_set.add(dep)
+        self.edge_index[(head, dep)] = len(self.heads)
+        self.edge_data[(head, dep)] = RELATION_DATA[code]
+        self.heads.append(head)
+        self.deps.append(dep)
+        self.codes.append(code)
+        self.adjacency = None
+
+    def has_edge(self, head, dep):
+        return (head, dep) in self.edge_index
+
+    def get_edge_data(self, head, dep, default=None):
+        return self.edge_data.get((head, dep), default)
+
+    def relation_code(self, head, dep):
+        """
+        :return: the relation code of the edge, -1 if there is no such edge
+        """
+        i = self.edge_index.get((head, dep))
+        return -1 if i is None else self.codes[i]
+
+    @property
+    def edges(self):
+        return EdgeView(self)
+
+    def neighbors(self, node):
+        adjacency = self.adjacency
+        if adjacency is None:
+            adjacency = self.build_index()
+        try:
+            return iter(adjacency[node])
+        except KeyError:
+            raise KeyError("The node %s is not in the graph." % node) from None
+
+    successors = neighbors
+
+    def remove_node(self, node):
+        if node not in self.node_set:
+            raise KeyError("The node %s is not in the graph." % node)
+        if self.adjacency is None:
+            self.build_index()
+        self.node_set.discard(node)
+        children = self.adjacency.pop(node)
+        governors = self.reverse.pop(node)
+        # the child lists are updated in place, so deleting a subtree doesn't rebuild them
+        for child in children:
+            if child != node:
+                self.reverse[child].remove(node)
+            self.remove_edge_entry(node, child)
+        for governor in governors:
+            if governor != node:
+                self.adjacency[governor].remove(node)
+                self.remove_edge_entry(governor, node)
+        if len(self.heads) > 2 * len(self.edge_index) + 8:
+            self.compact()
+
+    def remove_edge_entry(self, head, dep):
+        i = self.edge_index.pop((head, dep))
+        del self.edge_data[(head, dep)]
+        self.heads[i] = -1  # a tombstone, dropped by `compact`
+
+    def edge_order(self):
+        return [i for i in range(len(self.heads)) if self.heads[i] >= 0]
+
+    def compact(self):
+        order = self.edge_order()
+        self.heads = array("i", [self.heads[i] for i in order])
+        self.deps = array("i", [self.deps[i] for i in order])
+        self.codes = array("i", [self.codes[i] for i in order])
+        self.edge_index = {(head, dep): i for i, (head, dep) in enumerate(zip(self.heads, self.deps))}
+
+    def build_index(self):
+        # the edges are visited in insertion order, so children keep their order like in networkx
+        adjacency = {node: [] for node in self.node_set}
+        reverse = {node: [] for node in self.node_set}
+        for head, dep in zip(self.heads, self.deps):
+            if head >= 0:
+                adjacency[head].append(dep)
+                reverse[dep].append(head)
+        self.adjacency = adjacency
+        self.reverse = reverse
+        return adjacency
+
+    def copy(self):
+        graph = ArrayGraph()
+        graph.__setstate__(self.__getstate__())
+        return graph
+
+    def __getstate__(self):
+        # relation codes are local to a process, so the relations are pickled by name
+        order = self.edge_order()
+        codes = {}
+        names = []
+        local_codes = array("H")
+        for i in order:
+            code = self.codes[i]
+            if code not in codes:
+                codes[code] = len(names)
+                names.append(relations.strings[code])
+            local_codes.append(codes[code])
+        heads = array("H", [self.heads[i] for i in order])
+        deps = array("H", [self.deps[i] for i in order])
+        nodes = array("H", sorted(self.node_set))
+        return nodes.tobytes(), heads.tobytes(), deps.tobytes(), local_codes.tobytes(), names
+
+    def __setstate__(self, state):
+        nodes, heads, deps, local_codes, names = state
+        codes = [relation_code(relation) for relation in names]
+        self.node_set = set(array("H", nodes))
+        self.heads = array("i", array("H", heads))
+        self.deps = array("i", array("H", deps))
+        self.codes = array("i", [codes[code] for code in array("H", local_codes)])
+        self.edge_index = {(head, dep): i for i, (head, dep) in enumerate(zip(self.heads, self.deps))}
+        self.edge_data = {key: RELATION_DATA[code] for key, code in zip(self.edge_index, self.codes)}
+        self.adjacency = None
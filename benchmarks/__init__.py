@@ -0,0 +1,5 @@
+"""
+Benchmarks of the extraction pipeline, run from the repository root, eg.
+
+    python -m benchmarks.startup
+"""
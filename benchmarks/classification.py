@@ -0,0 +1,78 @@
+"""
+Time per node of the clause detection (on every word) and of the clause classification (on every
+verb), with the compiled decision tables and with the rules tried one at a time, plus the number of
+decisions in each table.
+
+    python -m benchmarks.classification --parses data/stages_corenlp.jsonl
+    python -m benchmarks.classification --synthetic 2000
+"""
+import argparse
+
+import clause_detection
+from array_graph import ArrayGraph
+from benchmarks.common import load_parses, summarize, timed, write_report
+from benchmarks.syntax_tree import build, synthesize, tree_class
+from clause_classification import TreeFeatures, TABLE as CORENLP_TABLE
+from sentence_classification_spacy import TABLE as SPACY_TABLE
+from vocab import IS_VERB
+
+RELATIONS = ["nsubj", "nsubjpass", "dobj", "iobj", "xcomp", "ccomp", "csubj", "cop", "aux", "auxpass", "expl",
+             "attr", "oprd", "conj", "cc", "appos", "advcl", "acl", "acl:relcl", "nmod", "case", "amod", "det",
+             "punct"]
+POS_TAGS = ["NN", "NNS", "VB", "VBD", "VBG", "VBN", "VBZ", "JJ", "IN", "DT"]
+WORDS = ["he", "is", "was", "be", "gave", "to", ",", "the", "apple", "running"]
+
+DETECTORS = {"detector": clause_detection.TABLE, "spacy_detector": clause_detection.SPACY_TABLE}
+CLASSIFIERS = {"corenlp_classifier": CORENLP_TABLE, "spacy_classifier": SPACY_TABLE}
+
+
+def classify_nodes(table, context, nodes, compiled):
+    classify = table.classify if compiled else table.first_match
+    for in_code, index in nodes:
+        classify(context, in_code, index)
+
+
+def measure(table, contexts, repeat):
+    """
+    :param contexts: a list of (context, [(incoming relation code, node)])
+    """
+    results = {"decisions": table.size()}
+    for name, compiled in (("compiled", True), ("rules", False)):
+        times = []
+        nodes = 0
+        for _ in range(repeat):
+            for context, items in contexts:
+                times.append(timed(classify_nodes, table, context, items, compiled)[0])
+                nodes += len(items)
+        results[name] = summarize(times, nodes)
+        results[name]["seconds_per_node"] = sum(times) / nodes if nodes else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parses", default=None, help="a recording of benchmarks.stages")
+    parser.add_argument("--synthetic", type=int, default=1000, help="the number of random trees without --parses")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="the JSON report path, stdout by default")
+    args = parser.parse_args()
+
+    if args.parses:
+        records = load_parses(args.parses)
+    else:
+        records = synthesize(args.synthetic, relations=RELATIONS, pos_tags=POS_TAGS, words=WORDS)
+    trees = [build(tree_class(backend), result, ArrayGraph) for backend, _, result in records]
+    words = [(tree, [(tree.in_coming_code(index), index) for index in tree.words]) for tree in trees]
+    verbs = []
+    for tree in trees:
+        features = TreeFeatures(tree)
+        verbs.append((features, [(features.in_coming_code(index), index) for index, token in tree.words.items()
+                                 if token.pos_flags & IS_VERB]))
+
+    results = {name: measure(table, words, args.repeat) for name, table in DETECTORS.items()}
+    results.update({name: measure(table, verbs, args.repeat) for name, table in CLASSIFIERS.items()})
+    write_report("classification", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTENCES_PATH = os.path.join(ROOT, "data", "wiki_sentences_extraction.txt")
+RECORDING_PATH = os.path.join(ROOT, "data", "stages_corenlp.jsonl")
+
+
+def percentile(values, q):
+    """
+    the q-th percentile (0 <= q <= 100) of the values, nearest-rank method
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(int(round(q / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(durations, items=None):
+    """
+    :param durations: the seconds taken by each call
+    :param items: the number of items (eg. sentences) processed, defaults to one item per call
+    """
+    total = sum(durations)
+    if items is None:
+        items = len(durations)
+    return {
+        "calls": len(durations),
+        "items": items,
+        "total": total,
+        "p50": percentile(durations, 50),
+        "p99": percentile(durations, 99),
+        "items_per_sec": items / total if total > 0 else None,
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL)
+        return output.decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(name, results, path=None):
+    """
+    Writing the results as a JSON report, to stdout if no path is given.
+    """
+    report = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path is None:
+        sys.stdout.write(text + "\n")
+    else:
+        with open(path, "w", encoding="utf-8") as fo:
+            fo.write(text + "\n")
+    return report
+
+
+def load_sentences(path=SENTENCES_PATH, limit=None):
+    from evaluate import load
+    sentences = [sentence for document in load(path) for sentence, _ in document]
+    return sentences[:limit] if limit else sentences
+
+
+def builder_class(backend):
+    if backend == "corenlp":
+        from corenlp_datastructure import CorenlpSentenceBuilder
+        return CorenlpSentenceBuilder
+    from spacy_datastructure import SpacySentenceBuilder
+    return SpacySentenceBuilder
+
+
+def load_parses(path):
+    """
+    Loading the parsing results of a recording of `benchmarks.stages`, the clauses reparsed by the
+    restructuring included.
+
+    :return: a list of (backend, text, parsing result)
+    """
+    records = []
+    with open(path, encoding="utf-8") as fi:
+        for line in fi:
+            if line.strip():
+                record = json.loads(line)
+                records.extend((record["backend"], text, result) for text, result in record["parses"].items())
+    return records
@@ -0,0 +1,73 @@
+"""
+Memory taken by the extraction data structures, measured with tracemalloc: bytes per tuple loaded
+from the annotated corpus, per tuple wrapped by `Graph.wrap`, and per token copied the way
+`SentenceBuilder.from_un_parsed_tokens` copies them. Run it at two revisions to compare.
+
+    python -m benchmarks.memory --output memory.json
+"""
+import argparse
+import gc
+import tracemalloc
+from copy import copy
+
+from benchmarks.common import SENTENCES_PATH, write_report
+from datastructure import Graph, Token
+from evaluate import load
+
+
+def allocated(func):
+    """
+    :return: the bytes still allocated by `func` when it returns (its result is kept alive), the peak
+             bytes, and the result
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, result
+
+
+def wrap_tuples(documents):
+    graph = Graph()
+    return [graph.wrap([tuples for _, tuples in document], True) for document in documents]
+
+
+def copy_tokens(documents):
+    tokens = []
+    for document in documents:
+        for sentence, _ in document:
+            words = [Token(word, "NN", i, i) for i, word in enumerate(sentence.split(" "))]
+            tokens.append([copy(token) for token in words])
+    return tokens
+
+
+def per_item(current, peak, items):
+    return {
+        "items": items,
+        "bytes": current,
+        "peak_bytes": peak,
+        "bytes_per_item": current / items if items else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=SENTENCES_PATH, help="the annotated corpus")
+    parser.add_argument("--output", default=None, help="the JSON report path, stdout by default")
+    args = parser.parse_args()
+
+    current, peak, documents = allocated(lambda: load(args.path))
+    tuple_count = sum(len(tuples) for document in documents for _, tuples in document)
+    results = {"load": per_item(current, peak, tuple_count)}
+
+    current, peak, _ = allocated(lambda: wrap_tuples(documents))
+    results["wrap"] = per_item(current, peak, tuple_count)
+
+    current, peak, tokens = allocated(lambda: copy_tokens(documents))
+    results["tokens"] = per_item(current, peak, sum(len(item) for item in tokens))
+    write_report("memory", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
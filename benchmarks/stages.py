@@ -0,0 +1,359 @@
+"""
+Per-stage cost of the extraction pipeline over the sentences of the annotated corpus: tokenization,
+parsing, building the sentences (`SentenceBuilder.build`), restructuring them, the lexical
+simplification of `CorenlpDecomposer`, open IE, building the tuples, building the semantic graph of
+each document and the propagation over it.
+
+The stages after parsing run offline on a recording: the parsing results and noun chunks of every
+text the stages of a sentence ask for, clauses reparsed by the restructuring included, and the lemmas
+of the verbs they stem. Recording
+needs the spaCy model and the parser backend, tokenization and parsing are timed while recording.
+
+data/stages_corenlp.jsonl is replayed by default, the first 200 sentences of the corpus. It was not
+made with a CoreNLP server: the parses are en_core_web_sm 3.8 trees of the whitespace tokenized texts,
+converted to the basic dependencies of CoreNLP (prepositions as `case` of an `nmod`, the copula as
+`cop` of its predicate). Recording again, on a machine with the spaCy model and a CoreNLP server (or
+the spaCy backend), gives the timings on the real parser's trees:
+
+    python -m benchmarks.stages --output stages.json
+    python -m benchmarks.stages --record data/stages_corenlp.jsonl --corenlp http://localhost:9000/ --limit 200
+
+The builders of both modes bypass the parse cache: a cache hit would neither be recorded nor read
+from the recording.
+
+p50 and p99 are per sentence, per document for the graph stages, and `items_per_sec` counts
+sentences. A stage failing on a sentence (eg. a clause whose parsing was not recorded because the
+restructuring changed) is counted in `errors` and the stages depending on it are skipped.
+"""
+import argparse
+import json
+import os
+import pickle
+from collections import Counter, defaultdict
+
+from benchmarks.common import RECORDING_PATH, SENTENCES_PATH, builder_class, summarize, timed, write_report
+
+STAGES = ["tokenization", "parsing", "build", "restructure", "lexical_simplification", "openie", "build_tuple",
+          "semantic_graph", "propagation"]
+LIVE_STAGES = ["tokenization", "parsing"]
+
+
+class Recording():
+    """
+    What the stages of a sentence asked the parser and spaCy for.
+    """
+    def __init__(self, backend, document, sentence, tokens, simplification=None, parses=None, chunks=None,
+                 lemmas=None):
+        """
+        :param document: the index of the document of the sentence
+        :param sentence: the raw sentence
+        :param tokens: the tokens of the raw sentence
+        :param simplification: the result of `spacy_util.extract_noun_chunks` on the raw sentence
+        :param parses: text -> parsing result
+        :param chunks: text -> noun chunks
+        :param lemmas: verb -> the lemma `spacy_util.stem` gave
+        """
+        self.backend = backend
+        self.document = document
+        self.sentence = sentence
+        self.tokens = tokens
+        self.text = " ".join(tokens)
+        self.simplification = simplification
+        self.parses = {}
+        for text, result in (parses or {}).items():
+            self.add_parse(text, result)
+        self.chunks = dict(chunks or {})
+        self.lemmas = dict(lemmas or {})
+
+    def add_parse(self, text, result):
+        # kept pickled, every lookup gets a fresh copy the way a ParseCache hit does
+        self.parses[text] = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def parse(self, text):
+        if text not in self.parses:
+            raise KeyError("The parsing result of %r was not recorded." % text)
+        return pickle.loads(self.parses[text])
+
+    def noun_chunks(self, text):
+        if text not in self.chunks:
+            raise KeyError("The noun chunks of %r were not recorded." % text)
+        return self.chunks[text]
+
+    def to_json(self):
+        return {
+            "backend": self.backend,
+            "document": self.document,
+            "sentence": self.sentence,
+            "tokens": self.tokens,
+            "simplification": self.simplification,
+            "parses": {text: pickle.loads(result) for text, result in self.parses.items()},
+            "chunks": self.chunks,
+            "lemmas": self.lemmas,
+        }
+
+    @classmethod
+    def from_json(cls, record):
+        return cls(record["backend"], record["document"], record["sentence"], record["tokens"],
+                   record["simplification"], record["parses"], record["chunks"], record.get("lemmas"))
+
+
+class RecordedAnalysis():
+    """
+    Standing in for the spacy analysis of a raw sentence, registered with `spacy_util.remember`.
+    """
+    def __init__(self, recording):
+        self.recording = recording
+
+    def tokens(self):
+        return list(self.recording.tokens)
+
+    def extract_noun_chunks(self):
+        if self.recording.simplification is None:
+            raise KeyError("The noun chunks of %r were not recorded." % self.recording.sentence)
+        tokens, kept_tokens, chunks = self.recording.simplification
+        return list(tokens), [tuple(token) for token in kept_tokens], [tuple(chunk) for chunk in chunks]
+
+
+class Recorder():
+    """
+    A sentence builder mixin adding the parsing results and noun chunks it is asked for to `recording`.
+    """
+    recording = None
+
+    def parse(self, sentence):
+        result = super().parse(sentence)
+        self.recording.add_parse(sentence, result[0])
+        return result
+
+    def parse_batch(self, sentences):
+        results = super().parse_batch(sentences)
+        for sentence, result in zip(sentences, results):
+            self.recording.add_parse(sentence, result)
+        return results
+
+    def chunk_nouns(self, sentence):
+        chunks = list(super().chunk_nouns(sentence))
+        self.recording.chunks[sentence] = chunks
+        return chunks
+
+
+class Replayer():
+    """
+    A sentence builder mixin answering the parsing requests and noun chunks from `recording`.
+    """
+    recording = None
+
+    def parse(self, sentence):
+        return [self.recording.parse(sentence)]
+
+    def parse_batch(self, sentences):
+        return [self.recording.parse(sentence) for sentence in sentences]
+
+    def chunk_nouns(self, sentence):
+        return iter(self.recording.noun_chunks(sentence))
+
+
+def mixed_builder(mixin, backend):
+    class Builder(mixin, builder_class(backend)):
+        parse_cache = None  # every parsing goes through the mixin, whatever cache the builders use
+    return Builder()
+
+
+class Components():
+    """
+    the pipeline components of a backend, all parsing through `builder`
+    """
+    def __init__(self, backend, builder):
+        from clause_detection import ClauseDetector, SpacyClauseDetector
+        from openie import CorenlpOpenIE
+        from openie_spacy import SpacyOpenIE
+        from sentence_decomposition import CorenlpDecomposer
+        from sentence_structure import SentenceRestructurer
+
+        self.builder = builder
+        if backend == "corenlp":
+            detector, self.openie = ClauseDetector(), CorenlpOpenIE()
+        else:
+            detector, self.openie = SpacyClauseDetector(), SpacyOpenIE()
+        self.restructurer = SentenceRestructurer(builder, detector)
+        self.decomposer = CorenlpDecomposer()
+        self.decomposer.builder = builder
+        self.decomposer.restructurer = self.restructurer
+
+
+class StageTimes():
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.items = Counter()
+        self.errors = Counter()
+        self.first_errors = {}
+
+    def run(self, stage, func, *args, items=1):
+        """
+        Timing a stage on one input, a failure is counted instead of raised.
+
+        :return: whether the stage succeeded, and its result
+        """
+        try:
+            seconds, result = timed(func, *args)
+        except Exception as e:
+            self.errors[stage] += 1
+            self.first_errors.setdefault(stage, "%s: %s" % (type(e).__name__, e))
+            return False, None
+        self.durations[stage].append(seconds)
+        self.items[stage] += items
+        return True, result
+
+    def report(self, skipped=()):
+        results = {}
+        for stage in STAGES:
+            if stage in skipped and stage not in self.durations and stage not in self.errors:
+                results[stage] = {"skipped": skipped[stage]}
+                continue
+            results[stage] = summarize(self.durations[stage], self.items[stage])
+            results[stage]["errors"] = self.errors[stage]
+            if stage in self.first_errors:
+                results[stage]["first_error"] = self.first_errors[stage]
+        return results
+
+
+def build_tuples(raw_tuples, raw_sentence):
+    from tuple_extraction import build_tuple
+    tuples = []
+    for tuple_ in raw_tuples:
+        tuple_ = build_tuple(tuple_)
+        tuple_.predicate.sentence = raw_sentence  # recording the raw sentence in the predicate
+        tuples.append(tuple_)
+    return tuples
+
+
+def build_semantic_graph(tuples_list):
+    from datastructure import Graph
+    graph = Graph()
+    graph.build_semantic_graph(tuples_list)
+    return graph
+
+
+def measure_sentence(times, components, recording):
+    """
+    Running the offline stages of a sentence, the builder of the components reads or fills `recording`.
+
+    :return: the tuples extracted from the sentence
+    """
+    ok, result = times.run("build", components.builder.from_parsing_result, recording.parse(recording.text))
+    if ok:
+        ok, _ = times.run("restructure", components.restructurer.restructure, result)
+    if ok:
+        ok, result = times.run("openie", components.openie.process_sentence, result)
+    if ok:
+        ok, result = times.run("build_tuple", build_tuples, result, recording.sentence)
+    tuples = result if ok else []
+    times.run("lexical_simplification", components.decomposer.lexical_simplification_first, recording.sentence,
+              components.restructurer)
+    return tuples
+
+
+def measure_graphs(times, documents):
+    """
+    :param documents: the tuples of each sentence of each document
+    """
+    from graph import propagation
+    for tuples_list in documents:
+        ok, graph = times.run("semantic_graph", build_semantic_graph, tuples_list, items=len(tuples_list))
+        if ok:
+            times.run("propagation", propagation, graph.graph, items=len(tuples_list))
+
+
+def replay(recordings, repeat, times):
+    import spacy_util
+    from lemma_util import verb_lemmatizer
+    builder = mixed_builder(Replayer, recordings[0].backend)
+    components = Components(recordings[0].backend, builder)
+    for _ in range(repeat):
+        documents = defaultdict(list)
+        for recording in recordings:
+            builder.recording = recording
+            spacy_util.remember(recording.sentence, RecordedAnalysis(recording))
+            verb_lemmatizer.memo.update(recording.lemmas)
+            documents[recording.document].append(measure_sentence(times, components, recording))
+        measure_graphs(times, [documents[document] for document in sorted(documents)])
+
+
+def record(backend, path, times, limit=None):
+    """
+    Running the stages on the corpus with the real models, writing what they asked for to `path`.
+    Tokenization and parsing are timed here, once per sentence.
+
+    :return: the recordings
+    """
+    import spacy_util
+    from evaluate import load
+    from lemma_util import verb_lemmatizer
+
+    builder = mixed_builder(Recorder, backend)
+    components = Components(backend, builder)
+    recordings = []
+    with open(path, "w", encoding="utf-8") as fo:
+        for i, document in enumerate(load(SENTENCES_PATH)):
+            for sentence, _ in document:
+                if limit is not None and len(recordings) >= limit:
+                    return recordings
+                ok, tokens = times.run("tokenization", spacy_util.tokenize, sentence)
+                if not ok:
+                    continue
+                recording = Recording(backend, i, sentence, tokens, spacy_util.extract_noun_chunks(sentence))
+                builder.recording = recording
+                ok, _ = times.run("parsing", builder.cached_parse, recording.text)
+                if not ok:
+                    continue
+                verb_lemmatizer.memo.clear()  # the lemmas of the verbs the sentence stems are what's left in it
+                measure_sentence(StageTimes(), components, recording)
+                recording.lemmas = dict(verb_lemmatizer.memo)
+                fo.write(json.dumps(recording.to_json(), ensure_ascii=False) + "\n")
+                recordings.append(recording)
+    return recordings
+
+
+def load_recordings(path):
+    with open(path, encoding="utf-8") as fi:
+        return [Recording.from_json(json.loads(line)) for line in fi if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--recording", default=RECORDING_PATH, help="replaying a recording written by --record")
+    group.add_argument("--record", default=None, help="recording the stages to this JSON lines file, then replaying it")
+    parser.add_argument("--backend", choices=["corenlp", "spacy"], default="corenlp", help="the backend of --record")
+    parser.add_argument("--corenlp", nargs="*", default=None, help="CoreNLP endpoints")
+    parser.add_argument("--limit", type=int, default=None, help="the number of sentences recorded")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="the JSON report path, stdout by default")
+    args = parser.parse_args()
+
+    times = StageTimes()
+    skipped = {}
+    if args.record:
+        if args.corenlp:
+            import corenlp_util
+            corenlp_util.set_endpoints(args.corenlp)
+        recordings = record(args.backend, args.record, times, args.limit)
+    else:
+        if not os.path.exists(args.recording):
+            parser.error("no recording at %s, make one with --record" % args.recording)
+        recordings = load_recordings(args.recording)
+        skipped = {stage: "timed by --record only, it needs the spaCy model and the parser backend"
+                   for stage in LIVE_STAGES}
+    if recordings:
+        replay(recordings, args.repeat, times)
+    results = {
+        "backend": recordings[0].backend if recordings else args.backend,
+        "sentences": len(recordings),
+        "repeat": args.repeat,
+        "stages": times.report(skipped),
+    }
+    write_report("stages", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Startup cost of the pipeline: the import time of the main modules and the latency of the first
+extracted sentence, each measured in a fresh interpreter.
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --first-sentence --corenlp http://localhost:9000/
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks.common import ROOT, load_sentences, percentile, write_report
+
+MODULES = ["tuple_extraction", "pipeline", "graph", "evaluate", "spacy_util", "corenlp_util", "datastructure"]
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import %s
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+FIRST_SENTENCE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import corenlp_util
+import tuple_extraction
+imported = time.perf_counter()
+endpoints = %r
+if endpoints:
+    corenlp_util.set_endpoints(endpoints)
+sentences = %r
+latencies = []
+for sentence in sentences:
+    begin = time.perf_counter()
+    list(tuple_extraction.extract_from_raw_sentence(sentence))
+    latencies.append(time.perf_counter() - begin)
+print(json.dumps({"import": imported - start, "latencies": latencies}))
+"""
+
+
+def run(script):
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=ROOT)
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def measure_imports(modules, repeat):
+    results = {}
+    for module in modules:
+        try:
+            seconds = [run(IMPORT_SCRIPT % module)["seconds"] for _ in range(repeat)]
+        except subprocess.CalledProcessError:
+            results[module] = {"error": "import failed"}
+            continue
+        results[module] = {"p50": percentile(seconds, 50), "min": min(seconds), "max": max(seconds)}
+    return results
+
+
+def measure_first_sentence(endpoints, sentences):
+    result = run(FIRST_SENTENCE_SCRIPT % (endpoints, sentences))
+    latencies = result["latencies"]
+    return {
+        "import": result["import"],
+        "first_sentence": latencies[0],
+        "warm_sentence_p50": percentile(latencies[1:], 50) if len(latencies) > 1 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module")
+    parser.add_argument("--modules", nargs="*", default=MODULES)
+    parser.add_argument("--first-sentence", action="store_true",
+                        help="also measure the first-sentence latency, needs the parser backends")
+    parser.add_argument("--corenlp", nargs="*", default=None, help="CoreNLP endpoints")
+    parser.add_argument("--output", default=None, help="the JSON report path, stdout by default")
+    args = parser.parse_args()
+
+    results = {"imports": measure_imports(args.modules, args.repeat)}
+    if args.first_sentence:
+        sentences = load_sentences(limit=5)
+        results["first_sentence"] = measure_first_sentence(args.corenlp, sentences)
+    write_report("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
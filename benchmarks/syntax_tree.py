@@ -0,0 +1,109 @@
+"""
+Per-sentence cost of the syntax tree engines: building a tree from a parsing result, the queries
+of the clause detection and extraction (children, relations, subtrees, subjects, objects) and
+deleting a subtree, plus the pickled size of a tree and the hit rate of the memoized queries.
+
+    python -m benchmarks.syntax_tree --parses data/stages_corenlp.jsonl
+    python -m benchmarks.syntax_tree --synthetic 2000
+"""
+import argparse
+import pickle
+import random
+
+import networkx as nx
+
+from array_graph import ArrayGraph
+from benchmarks.common import load_parses, summarize, timed, write_report
+from datastructure import SyntaxTree, Token
+
+ENGINES = {"networkx": nx.DiGraph, "array": ArrayGraph}
+RELATIONS = ["nsubj", "dobj", "amod", "det", "nmod", "case", "conj", "cc", "punct", "advcl", "acl", "compound"]
+
+
+def synthesize(n, seed=0, relations=RELATIONS, pos_tags=("NN", "VBD", "JJ", "IN"), words=None):
+    """
+    random trees of 5 to 40 words, for running without recorded parses
+    :param words: the vocabulary of the words, they are named after their position by default
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        size = rng.randint(5, 40)
+        root = rng.randint(1, size)
+        dependencies = [(0, root, "ROOT")]
+        attached = [root]
+        for dep in rng.sample([i for i in range(1, size + 1) if i != root], size - 1):
+            dependencies.append((rng.choice(attached), dep, rng.choice(relations)))
+            attached.append(dep)
+        result = {"words": [rng.choice(words) if words else "w%d" % i for i in range(size)],
+                  "pos_tags": [rng.choice(pos_tags) for _ in range(size)],
+                  "dependencies": dependencies}
+        records.append(("corenlp", None, result))
+    return records
+
+
+def tree_class(backend):
+    if backend == "corenlp":
+        from corenlp_datastructure import CorenlpSyntaxTree
+        return CorenlpSyntaxTree
+    from spacy_datastructure import SpacySynaxTree
+    return SpacySynaxTree
+
+
+def build(cls, result, graph_class):
+    tokens = [Token(word, pos, i, i) for i, (word, pos) in enumerate(zip(result["words"], result["pos_tags"]))]
+    return cls(tokens, result["dependencies"], graph_class)
+
+
+def query(tree):
+    for index in list(tree.words):
+        tree.children(index)
+        tree.in_coming_relation(index)
+        tree.out_going_relations(index)
+        if tree.graph.has_node(index):
+            tree.get_subjects(index)
+            tree.get_objects(index)
+    if not tree.graph.has_node(tree.root):  # a one word clause has no edge
+        return
+    subtree = tree.get_subtree(tree.root)
+    deletable = [index for index in subtree if index != tree.root]
+    if deletable:
+        tree.delete_subtree(sorted(tree.get_subtree(deletable[len(deletable) // 2])))
+
+
+def measure(records, graph_class, repeat):
+    build_times = []
+    query_times = []
+    sizes = []
+    SyntaxTree.count_queries()
+    SyntaxTree.reset_query_stats()
+    for _ in range(repeat):
+        for backend, _, result in records:
+            cls = tree_class(backend)
+            seconds, tree = timed(build, cls, result, graph_class)
+            build_times.append(seconds)
+            sizes.append(len(pickle.dumps(tree.graph, protocol=pickle.HIGHEST_PROTOCOL)))
+            query_times.append(timed(query, tree)[0])
+    return {
+        "build": summarize(build_times),
+        "query": summarize(query_times),
+        "pickled_graph_bytes": sum(sizes) / len(sizes) if sizes else 0,
+        "query_hit_rate": SyntaxTree.query_hit_rate(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parses", default=None, help="a recording of benchmarks.stages")
+    parser.add_argument("--synthetic", type=int, default=1000, help="the number of random trees without --parses")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="the JSON report path, stdout by default")
+    args = parser.parse_args()
+
+    records = load_parses(args.parses) if args.parses else synthesize(args.synthetic)
+    results = {name: measure(records, graph_class, args.repeat) for name, graph_class in ENGINES.items()}
+    write_report("syntax_tree", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
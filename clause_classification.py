@@ -1,4 +1,7 @@
 from corenlp_util import is_copula
+from datastructure import ROOT_CODE
+from decision_table import DecisionTable
+from vocab import relations, IS_NOMINAL_SUBJECT, IS_VERB
 
 
 SV = "SV"
@@ -34,50 +37,146 @@ EXPL = "expl"
 AUX = "aux"
 CONJ = "conj"
 
+# the interned codes, see `vocab`
+DOBJ_CODE = relations.code(DOBJ)
+CONJ_CODE = relations.code(CONJ)
+
+
+class TreeFeatures():
+    """
+    The relations around every node of a tree, collected in one pass over its edges and shared by
+    the classification of all its verbs and the extraction of their tuples.
+    """
+    def __init__(self, tree):
+        self.tree = tree
+        self.dependents = {}      # node -> [(child, relation code)] in the order of `graph.neighbors`
+        self.out_codes = {}       # node -> the codes of its out going relations
+        self.edge_codes = {}      # (governor, dependent) -> relation code
+        self.subject_heads = set()  # the nodes with a nominal subject
+        for gov, dep, code in tree.graph.edges(data="code"):
+            self.edge_codes[(gov, dep)] = code
+            self.dependents.setdefault(gov, []).append((dep, code))
+            self.out_codes.setdefault(gov, set()).add(code)
+            if relations.flags[code] & IS_NOMINAL_SUBJECT:
+                self.subject_heads.add(gov)
+
+    def out_going_codes(self, index):
+        return self.out_codes.get(index, ())
+
+    def in_coming_code(self, index):
+        """
+        the same as `SyntaxTree.in_coming_code`
+        """
+        tree = self.tree
+        if not tree.graph.has_node(index):
+            return 0
+        if index == tree.root:
+            return ROOT_CODE
+        return self.edge_codes.get((tree.parents.get(index), index), 0)
+
+    def has_subject(self, index):
+        """
+        whether `SyntaxTree.get_subjects` finds a subject, the one of the first conjunct counts for the others
+        """
+        if index in self.subject_heads:
+            return True
+        return self.in_coming_code(index) == CONJ_CODE and self.tree.parents[index] in self.subject_heads
+
+    def dependents_of(self, index, code):
+        return [child for child, code_ in self.dependents.get(index, ()) if code_ == code]
+
+    def subjects(self, index):
+        """
+        the same as `SyntaxTree.get_subjects`
+        """
+        subjects = self.own_subjects(index)
+        if not subjects and self.in_coming_code(index) == CONJ_CODE:
+            subjects = self.own_subjects(self.tree.parents[index])
+        return subjects
+
+    def own_subjects(self, index):
+        for child, code in self.dependents.get(index, ()):
+            if relations.flags[code] & IS_NOMINAL_SUBJECT:
+                return [child] + self.tree.get_conjunction(child)
+        return []
+
+    def objects(self, index):
+        """
+        the same as `SyntaxTree.get_objects`
+        """
+        objects = []
+        for child in self.dependents_of(index, DOBJ_CODE):
+            objects.append(child)
+            objects.extend(self.tree.get_conjunction(child))
+        return objects
+
+
+def shares_objects(features, index):
+    """
+    whether the first conjunct, the parent of the verb, has objects all following the verb
+    """
+    objects = features.objects(features.tree.parents[index])
+    return bool(objects) and min(objects) > index
+
+
+def dependent_feature(code):
+    return lambda features, index: code in features.out_going_codes(index)
+
+
+# the features of a verb, computed on the `TreeFeatures` of its tree
+FEATURES = {
+    "copula": lambda features, index: is_copula(features.tree.words[index].word),
+    "subject": lambda features, index: features.has_subject(index),
+    "shares_objects": shares_objects,
+}
+for relation in ["dobj", "iobj", "xcomp", "ccomp", "expl", "attr", "oprd"]:
+    FEATURES["has_" + relation] = dependent_feature(relations.code(relation))
+
+# (incoming relations, features, clause type), the first matching rule gives the type, None if none
+RULES = [
+    ([COP], ["copula"], SVc),
+    ([AUX, AUXPASS], ["copula"], None),
+    (None, ["copula", "subject", "has_ccomp"], SVcC),
+    (None, ["copula", "subject", "has_xcomp"], SVcX),
+    (None, ["copula", "subject", "has_expl"], SVb),   # there be
+    (None, ["!subject"], None),
+    (None, ["has_dobj", "has_iobj"], SVOO),
+    (None, ["has_dobj", "has_xcomp"], SVOC),
+    (None, ["has_dobj"], SVO),
+    (None, ["has_xcomp"], SVX),
+    (None, ["has_ccomp"], SVC),
+    (None, [], SV),
+]
+
+TABLE = DecisionTable(RULES, FEATURES)
 
-class ClauseClassifier():
-    def classify_clause(self, tree, index):
-        raise NotImplementedError
 
+class ClauseClassifier():
+    table = None  # the `DecisionTable` of the rules
 
-class CorenlpClauseClassifier(ClauseClassifier):
     def classify_clause(self, tree, index):
-        if is_copula(tree.words[index].word):
-            in_relation = tree.in_coming_relation(index)
-            if COP == in_relation:
-                return SVc
-
-            if AUX == in_relation or AUXPASS == in_relation:
-                return None
-
-            out_relations = tree.out_going_relations(index)
-            if tree.get_subjects(index) and CCOMP in out_relations:
-                return SVcC
-            if tree.get_subjects(index) and XCOMP in out_relations:
-                return SVcX
-            if tree.get_subjects(index) and EXPL in out_relations:   # there be
-                return SVb
+        return self.classify(TreeFeatures(tree), index)
+
+    def label_tree(self, tree, features=None):
+        """
+        Classifying the clauses of all the verbs of a tree at once.
+        :param features: the `TreeFeatures` of the tree, if they are already collected
+        :return: the plan of the extraction, a list of (index, clause type) in the order of the words,
+                 verbs not heading a known clause are left out
+        """
+        if features is None:
+            features = TreeFeatures(tree)
+        plan = []
+        for index, token in tree.words.items():
+            if token.pos_flags & IS_VERB:
+                type_ = self.classify(features, index)
+                if type_ is not None:
+                    plan.append((index, type_))
+        return plan
+
+    def classify(self, features, index):
+        return self.table.classify(features, features.in_coming_code(index), index)
 
-        out_relations = tree.out_going_relations(index)
-        conj = None
-        conj_objects = None
 
-        if tree.get_subjects(index) and DOBJ in out_relations and IOBJ in out_relations:
-            return SVOO
-
-        if tree.get_subjects(index) and DOBJ in out_relations and XCOMP in out_relations:
-            return SVOC
-
-        if tree.get_subjects(index) and DOBJ in out_relations:
-            return SVO
-        elif conj and conj_objects and min(conj_objects) > index:
-            return SVO
-
-        if tree.get_subjects(index) and DOBJ not in out_relations and XCOMP in out_relations:  #
-            return SVX
-
-        if tree.get_subjects(index) and DOBJ not in out_relations and CCOMP in out_relations:  #
-            return SVC
-
-        if DOBJ not in out_relations and tree.get_subjects(index):
-            return SV
+class CorenlpClauseClassifier(ClauseClassifier):
+    table = TABLE
@@ -1,3 +1,6 @@
+from decision_table import DecisionTable
+from vocab import relations, tags, ADNOMINAL_RELATIONS, IS_NOMINAL_SUBJECT, IS_NOUN, IS_PARTICIPLE, IS_VERB
+
 ACL = "acl"
 ACL_RELCL = "acl:relcl"
 RELCL = "relcl"
@@ -32,6 +35,86 @@ PARADVCL = "PARADVCL"
 PARACL = "PARACL"
 INFINITE = "INFINITE"
 
+# the interned codes, see `vocab`
+CASE_CODE = relations.code(CASE)
+DOBJ_CODE = relations.code(DOBJ)
+VBG_CODE = tags.code(VBG)
+JJ_CODE = tags.code(JJ)
+POTENTIAL_POINTS = relations.code_set([ADVCL, ACL, ACL_RELCL, RELCL, APPOS, CCOMP, CSUBJ, XCOMP, NMOD])
+SPACY_POTENTIAL_POINTS = relations.code_set([ADVCL, ACL, ACL_RELCL, RELCL, APPOS, CCOMP, CSUBJ])
+PREP_RELATION_CODE = relations.code(PREP)  # spacy's detector compares the relation with the tag "IN"
+
+
+def has_gerund_case(tree, node):
+    for child in tree.children(node):
+        if tree.dependent_code(node, child) == CASE_CODE and tree.words[child].pos_code == VBG_CODE:
+            return True
+    return False
+
+
+def has_comma_after_parent(tree, node):
+    for idx in range(tree.parents[node]+1, node):
+        if idx in tree.words and tree.words[idx].word == ",":
+            return True
+    return False
+
+
+# the features of the root of a candidate clause, computed on the syntax tree
+FEATURES = {
+    "participle": lambda tree, node: tree.words[node].pos_flags & IS_PARTICIPLE,
+    "gerund": lambda tree, node: tree.words[node].pos_code == VBG_CODE,
+    "noun": lambda tree, node: tree.words[node].pos_flags & IS_NOUN,
+    "adjective": lambda tree, node: tree.words[node].pos_code == JJ_CODE,
+    "subject": lambda tree, node: tree.out_going_flags(node) & IS_NOMINAL_SUBJECT,
+    "after_to": lambda tree, node: node-1 in tree.words and tree.words[node-1].word == TO,
+    "after_parent": lambda tree, node: tree.parents[node] < node,
+    "comma_after_parent": has_comma_after_parent,
+    "gerund_case": has_gerund_case,
+    "parent_noun": lambda tree, node: tree.words[tree.parents[node]].pos_flags & IS_NOUN,
+    "parent_verb": lambda tree, node: tree.words[tree.parents[node]].pos_flags & IS_VERB,
+    "parent_dobj": lambda tree, node: DOBJ_CODE in tree.out_going_codes(tree.parents[node]),
+}
+
+# (incoming relations, features, clause type), the first matching rule gives the type, CORE if none
+RULES = [
+    ([APPOS], ["parent_noun"], APPOS),
+    ([ADVCL], ["participle", "!subject"], PARADVCL),   # the boy, waving his arms, cried
+    ([ADVCL], ["after_to"], INFINITE),
+    ([ADVCL], ["subject"], ADVCL),
+    (ADNOMINAL_RELATIONS, ["participle", "!subject"], PARACL),   # the boy, waving his arms, cried
+    (ADNOMINAL_RELATIONS, ["after_to"], INFINITE),
+    (ADNOMINAL_RELATIONS, ["after_parent"], ACL),
+    ([CCOMP], ["subject", "!parent_dobj", "parent_noun"], APPOSCL),
+    ([CCOMP], ["subject", "!parent_dobj"], OBJCL),
+    ([CCOMP], ["subject"], CORE),
+    ([CCOMP], ["noun"], NN),
+    ([CCOMP], ["adjective"], JJ),
+    ([XCOMP], ["participle", "after_parent", "comma_after_parent"], PARADVCL),
+    ([CSUBJ], [], SUBJCL),
+    ([NMOD], ["gerund_case", "parent_noun"], PARACL),
+    ([NMOD], ["gerund_case", "parent_verb"], PARADVCL),
+]
+
+SPACY_RULES = [
+    ([APPOS], ["parent_noun"], APPOS),
+    ([ADVCL], ["participle", "!subject"], PARADVCL),  # the boy, waving his arms, cried
+    ([ADVCL], ["after_to"], INFINITE),
+    ([ADVCL], ["subject"], ADVCL),
+    ([ADVCL], ["noun"], NN),   # for spacy
+    ([ADVCL], ["adjective"], JJ),   # for spacy
+    (ADNOMINAL_RELATIONS, ["participle", "!subject"], PARACL),  # the boy, waving his arms, cried
+    (ADNOMINAL_RELATIONS, ["after_to"], INFINITE),
+    (ADNOMINAL_RELATIONS, ["after_parent"], ACL),
+    ([CCOMP], ["subject", "!parent_dobj", "parent_noun"], APPOSCL),
+    ([CCOMP], ["subject", "!parent_dobj"], OBJCL),
+    ([CSUBJ], [], SUBJCL),
+    ([PREP], ["gerund", "parent_noun"], PARACL),
+    ([PREP], ["gerund", "parent_verb"], PARADVCL),
+]
+
+TABLE = DecisionTable(RULES, FEATURES, CORE)
+SPACY_TABLE = DecisionTable(SPACY_RULES, FEATURES, CORE)
+
 
 class ClauseDetector():
     def get_potential_point(self, sentence):
@@ -43,65 +126,13 @@ class ClauseDetector():
         tree = sentence.tree
         points = []
         for idx in tree.words:
-            if tree.in_coming_relation(idx) in [ADVCL, ACL, ACL_RELCL, RELCL, APPOS, CCOMP, CSUBJ, XCOMP, NMOD]:
+            if tree.in_coming_code(idx) in POTENTIAL_POINTS:
                 points.append(idx)
         return points
 
     def classify_clause(self, sentence, root):
         tree = sentence.tree
-        token = tree.words[root]
-        parent = tree.parents[root]
-        out_rels = tree.out_going_relations(root)
-
-        if tree.in_coming_relation(root) == APPOS and tree.words[parent].pos.startswith(NN):
-            return APPOS
-
-        elif tree.in_coming_relation(root) == ADVCL:
-            if (token.pos == VBG or token.pos == VBN) and NSUBPASS not in out_rels and NSUBJ not in out_rels:
-                return PARADVCL   # the boy, waving his arms, cried
-            elif root-1 in tree.words and tree.words[root-1].word == TO:
-                return INFINITE
-            elif NSUBJ in out_rels or NSUBPASS in out_rels:
-                return ADVCL
-
-        elif tree.in_coming_relation(root) in [ACL, ACL_RELCL, RELCL]:
-            if (token.pos == VBG or token.pos == VBN) and NSUBPASS not in out_rels and NSUBJ not in out_rels:
-                return PARACL   # the boy, waving his arms, cried
-            elif root-1 in tree.words and tree.words[root-1].word == TO:
-                return INFINITE
-            elif parent < root:
-                return ACL
-
-        elif tree.in_coming_relation(root) == CCOMP:
-            if NSUBPASS in out_rels or NSUBJ in out_rels:
-                if DOBJ not in tree.out_going_relations(parent):
-                    parent = tree.words[parent]
-                    if parent.pos.startswith(NN):
-                        return APPOSCL
-                    else:
-                        return OBJCL
-            elif tree.words[root].pos.startswith(NN):
-                return NN
-            elif tree.words[root].pos == JJ:
-                return JJ
-
-        elif tree.in_coming_relation(root) == XCOMP:
-            if (tree.words[root].pos == VBG or tree.words[root].pos == VBN) and root > parent:
-                for idx in range(parent+1, root):
-                    if idx in tree.words and tree.words[idx].word == ",":
-                        return PARADVCL
-
-        elif tree.in_coming_relation(root) == CSUBJ:
-            return SUBJCL
-
-        elif tree.in_coming_relation(root) == NMOD:
-            for child in tree.children(root):
-                if tree.dependent_relation(root, child) == CASE and tree.words[child].pos == VBG:
-                    if tree.words[parent].pos.startswith("NN"):
-                        return PARACL
-                    elif tree.words[parent].pos.startswith("VB"):
-                        return PARADVCL
-        return CORE
+        return TABLE.classify(tree, tree.in_coming_code(root), root)
 
 
 class SpacyClauseDetector():
@@ -114,57 +145,13 @@ class SpacyClauseDetector():
         tree = sentence.tree
         points = []
         for idx in tree.words:
-            if tree.in_coming_relation(idx) in [ADVCL, ACL, ACL_RELCL, RELCL, APPOS, CCOMP, CSUBJ]:
+            in_code = tree.in_coming_code(idx)
+            if in_code in SPACY_POTENTIAL_POINTS:
                 points.append(idx)
-            elif tree.in_coming_relation(idx) == PREP and tree.words[idx].pos == VBG:
+            elif in_code == PREP_RELATION_CODE and tree.words[idx].pos_code == VBG_CODE:
                 points.append(idx)
         return points
 
     def classify_subtree(self, sentence, root):
         tree = sentence.tree
-        token = tree.words[root]
-        parent = tree.parents[root]
-        out_rels = tree.out_going_relations(root)
-
-        if tree.in_coming_relation(root) == APPOS and tree.words[parent].pos.startswith(NN):
-            return APPOS
-
-        elif tree.in_coming_relation(root) == ADVCL:
-            if (token.pos == VBG or token.pos == VBN) and NSUBPASS not in out_rels and NSUBJ not in out_rels:
-                return PARADVCL  # the boy, waving his arms, cried
-            elif root - 1 in tree.words and tree.words[root - 1].word == TO:
-                return INFINITE
-            elif NSUBJ in out_rels or NSUBPASS in out_rels:
-                return ADVCL
-            elif tree.words[root].pos.startswith(NN):  # for spacy
-                return NN
-            elif tree.words[root].pos == JJ:  # for spacy
-                return JJ
-
-        elif tree.in_coming_relation(root) in [ACL, ACL_RELCL, RELCL]:
-            if (token.pos == VBG or token.pos == VBN) and NSUBPASS not in out_rels and NSUBJ not in out_rels:
-                return PARACL  # the boy, waving his arms, cried
-            elif root - 1 in tree.words and tree.words[root - 1].word == TO:
-                return INFINITE
-            elif parent < root:
-                return ACL
-
-        elif tree.in_coming_relation(root) == CCOMP:
-            if NSUBPASS in out_rels or NSUBJ in out_rels:
-                if DOBJ not in tree.out_going_relations(parent):
-                    parent = tree.words[parent]
-                    if parent.pos.startswith(NN):
-                        return APPOSCL
-                    else:
-                        return OBJCL
-
-        elif tree.in_coming_relation(root) == CSUBJ:
-            return SUBJCL
-
-        elif tree.in_coming_relation(root) == PREP and tree.words[root].pos == "VBG":
-            parent = tree.parents[root]
-            if tree.words[parent].pos.startswith("NN"):
-                return PARACL
-            elif tree.words[parent].pos.startswith("VB"):
-                return PARADVCL
-        return CORE
+        return SPACY_TABLE.classify(tree, tree.in_coming_code(root), root)
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Endpoint():
+    """
+    a CoreNLP server together with its keep-alive session and latency statistics
+    """
+    def __init__(self, url, pool_size):
+        self.url = url
+        self.session = requests.Session()
+        self.mount(pool_size)
+        self.outstanding = 0     # requests sent but not answered yet
+        self.request_count = 0
+        self.failure_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def mount(self, pool_size):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def stats(self):
+        mean_latency = self.total_latency / self.request_count if self.request_count else 0.0
+        return {
+            "url": self.url,
+            "requests": self.request_count,
+            "failures": self.failure_count,
+            "outstanding": self.outstanding,
+            "mean_latency": mean_latency,
+            "max_latency": self.max_latency,
+        }
+
+
+class CorenlpClient():
+    """
+    A CoreNLP client keeping persistent connections to several servers. Every request is sent to the
+    server with the least outstanding requests, so that one run can keep all of the servers busy.
+    """
+    def __init__(self, endpoints, pool_size=8, timeout=120):
+        """
+        :param endpoints: the url of a CoreNLP server or a list of urls
+        :param pool_size: the number of connections kept alive for each server
+        :param timeout: seconds to wait for the response of a server
+        """
+        if isinstance(endpoints, str):
+            endpoints = [endpoints]
+        if not endpoints:
+            raise ValueError("at least one CoreNLP endpoint is required")
+        self.endpoints = [Endpoint(url, pool_size) for url in endpoints]
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.next_index = 0  # breaking ties in turn so that idle servers share sequential requests
+
+    def acquire(self):
+        with self.lock:
+            n = len(self.endpoints)
+            candidates = [self.endpoints[(self.next_index + i) % n] for i in range(n)]
+            endpoint = min(candidates, key=lambda item: item.outstanding)
+            endpoint.outstanding += 1
+            self.next_index = (self.next_index + 1) % n
+        return endpoint
+
+    def release(self, endpoint, latency, failed):
+        with self.lock:
+            endpoint.outstanding -= 1
+            endpoint.request_count += 1
+            endpoint.total_latency += latency
+            endpoint.max_latency = max(endpoint.max_latency, latency)
+            if failed:
+                endpoint.failure_count += 1
+
+    def annotate(self, text, properties=None):
+        """
+        Annotating the text, the interface is the same as `pycorenlp.StanfordCoreNLP.annotate`.
+        """
+        if properties is None:
+            properties = {}
+        endpoint = self.acquire()
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = endpoint.session.post(endpoint.url, params={"properties": json.dumps(properties)},
+                                             data=text.encode("utf-8"), timeout=self.timeout)
+            output = response.text
+            failed = False
+        finally:
+            self.release(endpoint, time.perf_counter() - start, failed)
+        if properties.get("outputFormat") == "json":
+            try:
+                output = json.loads(output, strict=True)
+            except ValueError:
+                pass
+        return output
+
+    def reserve_connections(self, pool_size):
+        """
+        Keeping at least `pool_size` connections alive for each server, eg. for as many concurrent
+        requests. The requests in flight keep the connections they use.
+        """
+        with self.lock:
+            if pool_size > self.pool_size:
+                for endpoint in self.endpoints:
+                    endpoint.mount(pool_size)
+                self.pool_size = pool_size
+
+    def latency_report(self):
+        with self.lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def clone(self):
+        """
+        a client of the same servers with new connections, eg. for a forked process
+        """
+        return CorenlpClient([endpoint.url for endpoint in self.endpoints], self.pool_size, self.timeout)
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.session.close()
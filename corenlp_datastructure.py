@@ -1,20 +1,26 @@
-from datastructure import SyntaxTree, SentenceBuilder
+from datastructure import SyntaxTree, SentenceBuilder, CONJ_CODE, TRIM, TRIM_SKIPPING_FIRST
 import corenlp_util
 import spacy_util
 from collections import defaultdict
+from vocab import relations, tags
+
+NMOD_CODE = relations.code("nmod")
+CASE_CODE = relations.code("case")
+VBG_CODE = tags.code("VBG")
+TRIMMED_CODES = relations.code_set(["acl", "advcl", "acl:relcl", "relcl"])  # the clauses cut off by `trim_subtree`
 
 
 class CorenlpSyntaxTree(SyntaxTree):
     """
     SyntaxTree for corenlp parser
     """
-    def __init__(self, tokens, dependencies):
-        super().__init__(tokens, dependencies)
+    def __init__(self, tokens, dependencies, graph_class=None):
+        super().__init__(tokens, dependencies, graph_class)
 
-    def get_conjunction(self, index):
+    def find_conjunction(self, index):
         conjunctions = []
         for child in self.children(index):
-            if self.dependent_relation(index, child) == "conj":
+            if self.dependent_code(index, child) == CONJ_CODE:
                 conjunctions.append(child)
         return conjunctions
 
@@ -75,34 +81,16 @@ class CorenlpSyntaxTree(SyntaxTree):
                 break
         return prep
 
-    def trim_subtree(self, subtree):
-        i = 0
-        n = len(subtree)
-        while i < n:
-            node = subtree[i]
-            if self.in_coming_relation(node) == "nmod":
-                for child in self.children(node):
-                    if self.dependent_relation(node, child) == "case" and self.words[child].pos == "VBG":  # eg. including
-                        subtree = self.trim_at(subtree, node)
-                        i = 0
-                        n = len(subtree)
-                else:
-                    i += 1
-            elif self.in_coming_relation(node) in ["acl", "advcl", "acl:relcl", "relcl"]:
-                subtree = self.trim_at(subtree, node)
-                i = 0
-                n = len(subtree)
-            else:
-                i += 1
-        return subtree
-
-    def trim_at(self, subtree, node):
-        subtree = [node for node in subtree]  # copy
-        subtree_ = self.get_subtree(node)
-        for node_ in subtree_:
-            if node_ in subtree:
-                subtree.remove(node_)
-        return subtree
+    def trim_point(self, node):
+        code = self.in_coming_code(node)
+        if code == NMOD_CODE:
+            for child in self.children(node):
+                # eg. including
+                if self.dependent_code(node, child) == CASE_CODE and self.words[child].pos_code == VBG_CODE:
+                    return TRIM_SKIPPING_FIRST  # the next scan starts at the second node
+        elif code in TRIMMED_CODES:
+            return TRIM
+        return None
 
     def get_extra_adverbial(self):
         adverbials = defaultdict(list)
@@ -150,12 +138,18 @@ class CorenlpSyntaxTree(SyntaxTree):
 
 
 class CorenlpSentenceBuilder(SentenceBuilder):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, graph_class=None):
+        super().__init__(graph_class)
         self.syntaxtree_class = CorenlpSyntaxTree
+        self.backend = "corenlp"
+        # a sentence is parsed as one line like in a batch, so both paths share the cached results
+        self.parse_properties = corenlp_util.BATCH_PARSE_PROPERTIES
 
     def parse(self, sentence):
-        return corenlp_util.parse(sentence)
+        return corenlp_util.parse_sentences([sentence])
+
+    def parse_batch(self, sentences):
+        return corenlp_util.parse_sentences(sentences)
 
     def chunk_nouns(self, sentence):
         return spacy_util.chunk_nouns(sentence)
@@ -1,10 +1,56 @@
-# -*- coding:utf-8 -*-
-from pycorenlp import StanfordCoreNLP
 import re
-from nltk import RegexpParser
+import threading
+from vocab import relations, IS_COMPOUND, IS_VERB
+
+DEFAULT_ENDPOINTS = ["http://corenlp.run/"]
+# DEFAULT_ENDPOINTS = ["http://localhost:9000/", "http://localhost:9001/"]
+
+_client = None
+_vp_parser = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    the CoreNLP client, created on first use
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from corenlp_client import CorenlpClient
+                _client = CorenlpClient(DEFAULT_ENDPOINTS)
+    return _client
+
+
+def set_endpoints(endpoints, pool_size=8):
+    """
+    Sending the requests to the given CoreNLP servers.
+
+    :param endpoints: a list of server urls
+    :param pool_size: the number of connections kept alive for each server
+    """
+    global _client
+    from corenlp_client import CorenlpClient
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = CorenlpClient(endpoints, pool_size)
+
+
+def reopen_client():
+    """
+    Giving a forked process connections of its own, the connections kept alive belong to the parent.
+    """
+    global _client, _lock
+    _lock = threading.Lock()  # it may have been held by another thread of the parent when forking
+    if _client is not None:
+        _client = _client.clone()
+
+
+def latency_report():
+    return get_client().latency_report()
 
-#nlp = StanfordCoreNLP('http://localhost:9000/')
-nlp = StanfordCoreNLP("http://corenlp.run/")
 
 grammar = """
     V: {<VB.*><PR>?<IN|TO>?}
@@ -15,7 +61,15 @@ grammar = """
     VP1: {<V>}
 """
 
-vp_parser = RegexpParser(grammar)
+
+def get_vp_parser():
+    global _vp_parser
+    if _vp_parser is None:
+        with _lock:
+            if _vp_parser is None:
+                from nltk import RegexpParser
+                _vp_parser = RegexpParser(grammar)
+    return _vp_parser
 
 
 def clean(word):
@@ -25,7 +79,7 @@ def clean(word):
 
 
 def analyze(sentence):
-    output = nlp.annotate(sentence, properties={
+    output = get_client().annotate(sentence, properties={
         'annotators': 'tokenize,ssplit,pos,parse,depparse,coref',
         'tokenize.whitespace': True,
         'outputFormat': 'json'
@@ -36,7 +90,7 @@ def analyze(sentence):
 def tokenize(text):
     # if isinstance(text, unicode):
     #     text = text.encode('utf-8', errors="ignore")
-    output = nlp.annotate(text, properties={
+    output = get_client().annotate(text, properties={
         'annotators': 'tokenize,ssplit',
         'outputFormat': 'json'
     })
@@ -45,7 +99,7 @@ def tokenize(text):
 
 
 def split_sentence(text):
-    output = nlp.annotate(text, properties={
+    output = get_client().annotate(text, properties={
         'annotators': 'ssplit',
         'outputFormat': 'json'
     })
@@ -72,12 +126,18 @@ def is_copula(verb):
     return verb in ["is", "am", "are", "was", "were", "be", "been", "being"]
 
 
+PARSE_PROPERTIES = {
+    'annotators': 'tokenize,ssplit,pos,parse,depparse,ner',
+    'tokenize.whitespace': True,
+    'outputFormat': 'json'
+}
+
+# one sentence per line, the server never splits a line into several sentences
+BATCH_PARSE_PROPERTIES = dict(PARSE_PROPERTIES, **{'ssplit.eolonly': True})
+
+
 def analyze_(sentence):
-    output = nlp.annotate(sentence, properties={
-        'annotators': 'tokenize,ssplit,pos,parse,depparse,ner',
-        'tokenize.whitespace': True,
-        'outputFormat': 'json'
-    })
+    output = get_client().annotate(sentence, properties=PARSE_PROPERTIES)
     return output
 
 
@@ -121,19 +181,50 @@ def parse(text):
     return convert_sentence(sentences)
 
 
+def parse_sentences(sentences, batch_size=64):
+    """
+    Parsing tokenized sentences with one request per batch instead of one request per sentence.
+
+    :param sentences: a list of whitespace tokenized sentences
+    :param batch_size: the number of sentences sent in one request, None for the whole list
+
+    :return: the parsing results, one for each input sentence
+    """
+    if batch_size is None:
+        batch_size = max(len(sentences), 1)
+    result = []
+    for start in range(0, len(sentences), batch_size):
+        batch = [sentence.replace("\n", " ") for sentence in sentences[start:start+batch_size]]
+        output = get_client().annotate("\n".join(batch), properties=BATCH_PARSE_PROPERTIES)
+        parsed = convert_sentence(output["sentences"])
+        if len(parsed) != len(batch):  # eg. an empty line, the results can't be aligned with the input
+            parsed = [parse_one(sentence) for sentence in batch]
+        result.extend(parsed)
+    return result
+
+
+def parse_one(sentence):
+    """
+    Parsing a sentence on its own, an empty sentence gets an empty parsing result without a request.
+    """
+    if not sentence.strip():
+        return {"words": [], "pos_tags": [], "dependencies": [], "nes": {}}
+    parsed = parse(sentence)
+    if not parsed:
+        raise ValueError("CoreNLP returned no sentence for %r." % sentence)
+    return parsed[0]
+
+
 def convert_sentence(sentences):
     result = []
     for sentence in sentences:
         words = [token["word"] for token in sentence["tokens"]]
         pos_tags = [token["pos"] for token in sentence["tokens"]]
         dependencies = [(dep["governor"], dep["dependent"], dep["dep"]) for dep in sentence["basicDependencies"]]
-        if "entitymentions" in sentence:
-            nes = {}
-            for mention in sentence["entitymentions"]:
-                nes[mention["text"]] = mention["ner"]
-            result.append({"words": words, "pos_tags": pos_tags, "dependencies": dependencies, "nes": nes})
-        else:
-            result.append({"words": words, "pos_tags": pos_tags, "dependencies": dependencies})
+        nes = {}
+        for mention in sentence.get("entitymentions", []):
+            nes[mention["text"]] = mention["ner"]
+        result.append({"words": words, "pos_tags": pos_tags, "dependencies": dependencies, "nes": nes})
     return result
 
 
@@ -142,7 +233,7 @@ position_pattern = re.compile("<(\d+)>")
 
 def chunk_verb(words, tags):
     words = ["%s<%d>" % (word, i+1) for i, word in enumerate(words)]
-    tree = vp_parser.parse(list(zip(words, tags)))
+    tree = get_vp_parser().parse(list(zip(words, tags)))
     for subtree in tree.subtrees():
         if subtree.label().startswith("VP"):
             leaves = subtree.leaves()
@@ -153,6 +244,10 @@ def chunk_verb(words, tags):
                 yield positions
 
 
+XCOMP_CODE = relations.code("xcomp")
+PTR_CODE = relations.code("ptr")
+
+
 def merge_verb_phrase(tree):
     # merge verb phrase that match some pattern
     # tokens = sorted(tree.words.items(), key=lambda item: item[0])
@@ -164,21 +259,20 @@ def merge_verb_phrase(tree):
     # merge something like 'began to learn', 'started learning'
     chunks = []
     for index, token in tree.words.items():
-        if token.pos.startswith("VB"):
+        if token.pos_flags & IS_VERB:
             chunk = []
             for child in tree.graph.neighbors(index):
+                code = tree.dependent_code(index, child)
                 # case like 'start to learn'
-                if tree.dependent_relation(index, child) == "xcomp" and tree.words[child].pos.startswith("VB") \
-                        and not tree.get_subjects(child):
+                if code == XCOMP_CODE and tree.words[child].pos_flags & IS_VERB and not tree.get_subjects(child):
                     # avoid the case like "he walked in the room, waving his flag
                     # avoid the case like "he said he would come"
                     if "," not in [tree.words[i].word for i in range(index, child) if i in tree.words]:
                         chunk.extend(range(index, child + 1))
                 else:
-                    rel = tree.dependent_relation(index, child)
                     # case like give up
                     # if rel.startswith("compound") or rel == "auxpass" or rel == "aux" or rel == "ptr":
-                    if rel.startswith("compound") or rel == "ptr":
+                    if relations.flags[code] & IS_COMPOUND or code == PTR_CODE:
                         if tree.words[child].word not in ["do", "did", "does"]:
                             chunk.append(child)
             if chunk:
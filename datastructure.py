@@ -1,20 +1,103 @@
 import networkx as nx
 from copy import copy
+from operator import itemgetter
 from itertools import chain
+from collections import defaultdict, deque
 import time
 import re
+import threading
+from vocab import relations, tags, IS_NOMINAL_SUBJECT
 
 TOKEN = "TOKEN"
 NOUN = "NOUN"
+ROOT_CODE = relations.code("ROOT")
+CONJ_CODE = relations.code("conj")
+DOBJ_CODE = relations.code("dobj")
+TRIM = 1                 # see `SyntaxTree.trim_point`
+TRIM_SKIPPING_FIRST = 2
+VIEW_FIELDS = ("graph", "words", "parents", "dfs_order", "intervals", "memo")  # see `SyntaxTree.swap_view`
+
+
+def slot_names(cls):
+    """
+    the slots of a class and its bases
+    """
+    names = _slot_names.get(cls)
+    if names is None:
+        names = []
+        for base in reversed(cls.__mro__):
+            names.extend(name for name in base.__dict__.get("__slots__", ()) if name not in names)
+        _slot_names[cls] = names
+    return names
+
+
+_slot_names = {}
+
+
+def get_slot_state(obj):
+    """
+    the attributes of a slotted object as a dict, the pickled state of the classes before they had slots
+    """
+    state = {}
+    for name in slot_names(type(obj)):
+        try:
+            state[name] = getattr(obj, name)
+        except AttributeError:  # an unset slot
+            pass
+    return state
+
+
+def set_slot_state(obj, state):
+    """
+    restoring a slotted object from a dict state (as pickled before the slots) or from the
+    (dict, slots) state of the default protocol
+    """
+    if isinstance(state, tuple):
+        state = dict(chain.from_iterable(part.items() for part in state if part))
+    for name, value in state.items():
+        setattr(obj, name, value)
 
 
 class Token():
+    __slots__ = ("word", "_pos", "pos_code", "pos_flags", "idx", "original_idx")
+
     def __init__(self, word, pos, idx, original_idx):
         self.word = word
         self.pos = pos
         self.idx = idx                    # the index in the current clause
         self.original_idx = original_idx  # original index in the sentence
 
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos):
+        # the tag is interned once, the classifiers test `pos_code` and `pos_flags`
+        self._pos = pos
+        self.pos_code = tags.code(pos)
+        self.pos_flags = tags.flags[self.pos_code]
+
+    def __getstate__(self):
+        # the codes are local to a process, the tag is pickled as before
+        state = get_slot_state(self)
+        state["pos"] = state.pop("_pos")
+        del state["pos_code"]
+        del state["pos_flags"]
+        return state
+
+    def __setstate__(self, state):
+        set_slot_state(self, state)
+
+    def __copy__(self):
+        token = object.__new__(type(self))
+        for name in slot_names(type(self)):
+            try:
+                setattr(token, name, getattr(self, name))
+            except AttributeError:  # an unset slot
+                pass
+        return token
+
     def __str__(self):
         return self.word
 
@@ -23,6 +106,8 @@ class Token():
 
 
 class Phrase(Token):
+    __slots__ = ("tokens", "head", "in_edges", "out_edges", "type_")
+
     def __init__(self, tokens, head, in_edges, out_edges=None, type_=NOUN):
         word = " ".join([token.word for _, token in tokens])
         pos = head.pos
@@ -38,9 +123,21 @@ class Phrase(Token):
         return self.type_
 
 
+def add_dependency(graph, gov, dep, relation):
+    """
+    Adding a dependency edge to the graph of a tree, with the code of its relation in `vocab.relations`.
+    """
+    graph.add_edge(gov, dep, relation=relation, code=relations.code(relation))
+
+
 class SyntaxTree():
-    def __init__(self, tokens, dependencies):
-        self.graph = nx.DiGraph()
+    graph_class = nx.DiGraph  # the default graph engine, `array_graph.ArrayGraph` is the array-backed one
+    counting_queries = False  # counting the memo hits and misses of all the trees, see `count_queries`
+    query_stats = {"hits": 0, "misses": 0}
+    query_stats_lock = threading.Lock()  # the trees may be queried from several threads
+
+    def __init__(self, tokens, dependencies, graph_class=None):
+        self.graph = (graph_class or self.graph_class)()
         self.parents = {}
         for dependencie in dependencies:
             gov, dep, rel = dependencie
@@ -48,16 +145,145 @@ class SyntaxTree():
                 self.root = dep
                 self.parents[dep] = 0
             else:
-                self.graph.add_edge(gov, dep, relation=rel)
+                add_dependency(self.graph, gov, dep, rel)
                 self.parents[dep] = gov
         self.word_count = len(tokens)
         self.words = {i+1: token for i, token in enumerate(tokens)}
         self.noun_phrases = []
         self.verb_phrases = []
+        self.dfs_order = None   # the nodes in the order `get_subtree` visits them from the roots
+        self.intervals = None   # node -> (enter, exit) in `dfs_order`, None until built, False if not a forest
+        self.memo = {}          # (query, node) -> result of the memoized queries
+        # the noun phrases are merged in one view of the tree and stretched to tokens in the other,
+        # `other_view` keeps the fields of the view not in use, None once the tree has changed
+        self.stretched = False
+        self.other_view = None
+
+    def __setstate__(self, state):
+        # the relation codes on the edges are local to a process, they are interned again
+        self.__dict__.update(state)
+        graphs = [self.graph]
+        if getattr(self, "other_view", None):
+            graphs.append(self.other_view["graph"])
+        for graph in graphs:
+            if isinstance(graph, nx.DiGraph):
+                for _, _, data in graph.edges(data=True):
+                    data["code"] = relations.code(data["relation"])
 
     def get_conjunction(self, index):
+        return self.memoized("conjunction", index, self.find_conjunction)
+
+    def find_conjunction(self, index):
         raise NotImplementedError
 
+    def invalidate(self):
+        """
+        Dropping the indexes and the query results computed from the graph, called whenever the tree changes.
+        """
+        self.dfs_order = None
+        self.intervals = None
+        self.memo.clear()
+
+    def memoized(self, query, index, compute):
+        """
+        Answering a query from the memo, a copy is returned since the callers extend the lists.
+        """
+        result = self.memo.get((query, index))
+        if result is None:
+            result = compute(index)
+            self.memo[(query, index)] = result
+            if self.counting_queries:
+                self.count_query("misses")
+        elif self.counting_queries:
+            self.count_query("hits")
+        return list(result)
+
+    @classmethod
+    def count_queries(cls, enabled=True):
+        """
+        Counting the memo hits and misses of the trees of this class (and its subclasses), off by default
+        since the counters are shared by the threads and guarded by a lock.
+        """
+        cls.counting_queries = enabled
+
+    @classmethod
+    def count_query(cls, counted):
+        with cls.query_stats_lock:
+            cls.query_stats[counted] += 1
+
+    @classmethod
+    def query_hit_rate(cls):
+        with cls.query_stats_lock:
+            hits, misses = cls.query_stats["hits"], cls.query_stats["misses"]
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    @classmethod
+    def reset_query_stats(cls):
+        with cls.query_stats_lock:
+            cls.query_stats["hits"] = 0
+            cls.query_stats["misses"] = 0
+
+    def remove_word(self, index):
+        """
+        Dropping a word that is no longer a part of the sentence, its node stays in the graph.
+        """
+        del self.words[index]
+        del self.parents[index]
+        self.memo.clear()
+        self.other_view = None
+
+    def build_intervals(self):
+        """
+        Indexing the subtrees: every subtree is the slice `dfs_order[enter:exit]` of a depth first
+        traversal visiting the children in the same order as `get_subtree`.
+        :return: the traversal order and the intervals, (None, False) if a node has more than one
+                 governor (eg. after merging a verb phrase) or the graph has a cycle
+        """
+        graph = self.graph
+        nodes = list(graph.nodes())
+        governors = {}
+        for node in nodes:
+            for child in graph.neighbors(node):
+                if child in governors:
+                    return None, False
+                governors[child] = node
+        order = []
+        for root in nodes:
+            if root in governors:
+                continue
+            unvisited = [root]
+            while unvisited:
+                node = unvisited.pop()
+                order.append(node)
+                unvisited.extend(graph.neighbors(node))
+        if len(order) != len(nodes):  # the nodes of a cycle are unreachable from the roots
+            return None, False
+        sizes = dict.fromkeys(order, 1)
+        for node in reversed(order):
+            if node in governors:
+                sizes[governors[node]] += sizes[node]
+        intervals = {node: (i, i + sizes[node]) for i, node in enumerate(order)}
+        return order, intervals
+
+    def get_intervals(self):
+        if self.intervals is None:
+            self.dfs_order, self.intervals = self.build_intervals()
+        return self.intervals
+
+    def is_descendant(self, node, ancestor):
+        """
+        Whether `node` is in the subtree of `ancestor` (a node is in its own subtree).
+        """
+        intervals = self.get_intervals()
+        if intervals and ancestor in intervals:
+            if node not in intervals:
+                return False
+            start, end = intervals[ancestor]
+            return start <= intervals[node][0] < end
+        if not self.graph.has_node(ancestor):
+            return node == ancestor
+        return node in self.get_subtree(ancestor)
+
     def build_conjunction(self, conjunction):
         if len(conjunction) == 1:
             return [self.words[conjunction[0]]]
@@ -74,16 +300,43 @@ class SyntaxTree():
         return []
 
     def dependent_relation(self, gov, dep):
-        if self.graph.has_edge(gov, dep):
-            return self.graph.edges[gov, dep]["relation"]
+        data = self.graph.get_edge_data(gov, dep)
+        if data is not None:
+            return data["relation"]
         return None
 
+    def dependent_code(self, gov, dep):
+        """
+        :return: the code of the relation in `vocab.relations`, 0 if there is no such dependency
+        """
+        data = self.graph.get_edge_data(gov, dep)
+        if data is not None:
+            return data["code"]
+        return 0
+
     def out_going_relations(self, index):
+        return self.memoized("out_going_relations", index, self.find_out_going_relations)
+
+    def find_out_going_relations(self, index):
         if index == 0 or not self.graph.has_node(index):
             return []
         relations = [self.dependent_relation(index, child) for child in self.children(index)]
         return relations
 
+    def out_going_codes(self, index):
+        if index == 0 or not self.graph.has_node(index):
+            return []
+        return [self.dependent_code(index, child) for child in self.children(index)]
+
+    def out_going_flags(self, index):
+        """
+        :return: the union of the category bitmasks of the out going relations
+        """
+        flags = 0
+        for code in self.out_going_codes(index):
+            flags |= relations.flags[code]
+        return flags
+
     def in_coming_relation(self, index):
         if not self.graph.has_node(index):
             return None
@@ -94,12 +347,25 @@ class SyntaxTree():
         else:
             return self.dependent_relation(self.parents[index], index)
 
+    def in_coming_code(self, index):
+        """
+        the code of `in_coming_relation`, 0 for None
+        """
+        if not self.graph.has_node(index):
+            return 0
+        if index == self.root:
+            return ROOT_CODE
+        if index not in self.parents or not self.graph.has_node(self.parents[index]):
+            return 0
+        return self.dependent_code(self.parents[index], index)
+
     def merge_noun_phrases(self, spans):
         """
         Merging noun phrases to a node.
         :param spans: a list of noun phrase span
         :return:
         """
+        self.other_view = None
         for span in spans:
             if len(span) > 1:
                 head = self.get_phrase_head(span)  # getting head word of the phrase
@@ -121,6 +387,7 @@ class SyntaxTree():
     def shrink_nounphrase(self, phrase):
         for idx, token in phrase.tokens:
             if token != phrase.head and self.graph.has_node(idx):
+                self.invalidate()
                 self.graph.remove_node(idx)
                 del self.words[idx]
                 del self.parents[idx]
@@ -128,12 +395,65 @@ class SyntaxTree():
                 self.words[idx] = phrase
 
     def stretch_nounphrases(self):
+        """
+        Stretching the noun phrases to their tokens. When every phrase is merged into its head, the
+        stretched tree is built aside and the merged one kept, so that shrinking and stretching again
+        only swap the two views until the tree is changed.
+        """
+        if self.other_view is not None:
+            if not self.stretched:
+                self.swap_view()
+                self.stretched = True
+            return
+        if self.noun_phrases and self.phrases_merged():
+            self.other_view = self.build_token_view()
+            self.swap_view()
+        else:
+            for phrase in self.noun_phrases:
+                for idx, token in phrase.tokens:
+                    self.words[idx] = token
+                for edge in phrase.in_edges:
+                    self.invalidate()
+                    add_dependency(self.graph, edge[0], edge[1], edge[2])
+                    self.parents[edge[1]] = edge[0]
+        self.stretched = True
+
+    def phrases_merged(self):
+        """
+        Whether every noun phrase is merged into its head and only there: the head is in the graph,
+        the other tokens are not in the tree, and no token is in two phrases. Shrinking the stretched
+        tree gives back exactly such a tree.
+        """
+        seen = set()
+        for phrase in self.noun_phrases:
+            for idx, token in phrase.tokens:
+                if idx in seen:
+                    return False
+                seen.add(idx)
+                if token == phrase.head:
+                    if self.words.get(idx) is not phrase or not self.graph.has_node(idx):
+                        return False
+                elif idx in self.words or idx in self.parents or self.graph.has_node(idx):
+                    return False
+        return True
+
+    def build_token_view(self):
+        graph = self.graph.copy()
+        words = dict(self.words)
+        parents = dict(self.parents)
         for phrase in self.noun_phrases:
             for idx, token in phrase.tokens:
-                self.words[idx] = token
+                words[idx] = token
             for edge in phrase.in_edges:
-                self.graph.add_edge(edge[0], edge[1], relation=edge[2])
-                self.parents[edge[1]] = edge[0]
+                add_dependency(graph, edge[0], edge[1], edge[2])
+                parents[edge[1]] = edge[0]
+        return {"graph": graph, "words": words, "parents": parents, "dfs_order": None, "intervals": None, "memo": {}}
+
+    def swap_view(self):
+        other_view = self.other_view
+        self.other_view = {name: getattr(self, name) for name in VIEW_FIELDS}
+        for name in VIEW_FIELDS:
+            setattr(self, name, other_view[name])
 
     def get_phrase_head(self, span):
         min_ = min(span)
@@ -154,8 +474,18 @@ class SyntaxTree():
         yield NotImplementedError
 
     def shrink_nounphrases(self):
+        """
+        Merging the noun phrases into their heads again, by swapping the views back if the tree
+        hasn't changed since `stretch_nounphrases` built them.
+        """
+        if self.other_view is not None:
+            if self.stretched:
+                self.swap_view()
+                self.stretched = False
+            return
         for phrase in self.noun_phrases:
             self.shrink_nounphrase(phrase)
+        self.stretched = False
 
     def merge_verb_phrase(self, chunk):
         """
@@ -180,32 +510,129 @@ class SyntaxTree():
                         break
         if len(nodes_with_outedges) > 1:  # invalid phrase
             return
+        self.other_view = None
         # recording dependency edges in order to recover the syntax structure
         if nodes_with_outedges:
             node = nodes_with_outedges[0]
             for child in self.children(node):
                 rel = self.dependent_relation(node, child)
+                self.invalidate()
                 self.parents[child] = root
-                self.graph.add_edge(root, child, relation=rel)
+                add_dependency(self.graph, root, child, rel)
         tokens = [(i, self.words[i]) for i in range(min_, max_ + 1)]
         phrase = Phrase(tokens, self.words[root], None, None, "VERB")
         self.words[root] = phrase
 
     def get_subtree(self, index, exclusion=None):
+        intervals = self.get_intervals()
+        if not intervals or index not in intervals:
+            return self.walk_subtree(index, exclusion)
+        start, end = intervals[index]
+        if exclusion is None:
+            return self.dfs_order[start:end]
+        excluded = relations.code_set(exclusion)
+        nodes = []
+        i = start
+        while i < end:
+            node = self.dfs_order[i]
+            if self.in_coming_code(node) in excluded:
+                i = intervals[node][1]  # skipping the subtree of the node
+            else:
+                nodes.append(node)
+                i += 1
+        return nodes
+
+    def walk_subtree(self, index, exclusion=None):
+        excluded = relations.code_set(exclusion) if exclusion is not None else None
         nodes = []
         unvisited = [index]
         while unvisited:
             node = unvisited.pop()
-            if exclusion is not None and self.in_coming_relation(node) in exclusion:
+            if excluded is not None and self.in_coming_code(node) in excluded:
                 continue
             nodes.append(node)
             unvisited.extend(self.graph.neighbors(node))
         return nodes
 
+    def trim_point(self, node):
+        """
+        Whether the subtree of a node is trimmed off by `trim_subtree`.
+        :return: None, TRIM, or TRIM_SKIPPING_FIRST when the next scan skips the first remaining node
+        """
+        return None
+
+    def trim_subtree(self, subtree):
+        """
+        Trimming the subtrees of the trim points off a list of nodes. The list is scanned from the
+        start again after each cut, which is replayed in one pass: the nodes scanned before never
+        become trim points, so only the nodes after the last scanned one (and a skipped first node)
+        are looked at.
+        """
+        positions = defaultdict(deque)  # node -> the positions of the node still in the list
+        for i, node in enumerate(subtree):
+            positions[node].append(i)
+        n = len(subtree)
+        alive = [True] * n
+        scanned = [False] * n  # scanned and not a trim point
+        points = {}
+        first = 0
+        frontier = 0
+        skip_first = False
+        while True:
+            while first < n and not alive[first]:
+                first += 1
+            if first == n:
+                break
+            cut = None
+            if not skip_first and not scanned[first]:
+                if subtree[first] not in points:
+                    points[subtree[first]] = self.trim_point(subtree[first])
+                if points[subtree[first]]:
+                    cut = first
+                else:
+                    scanned[first] = True
+            if cut is None:
+                frontier = max(frontier, first + 1)
+                while frontier < n:
+                    if alive[frontier] and not scanned[frontier]:
+                        node = subtree[frontier]
+                        if node not in points:
+                            points[node] = self.trim_point(node)
+                        if points[node]:
+                            cut = frontier
+                            break
+                        scanned[frontier] = True
+                    frontier += 1
+            if cut is None:
+                break
+            skip_first = points[subtree[cut]] == TRIM_SKIPPING_FIRST
+            for node in self.get_subtree(subtree[cut]):
+                if positions[node]:
+                    alive[positions[node].popleft()] = False
+        return [subtree[i] for i in range(n) if alive[i]]
+
+    def trim_at(self, subtree, node):
+        """
+        Removing the nodes of the subtree of `node` from a list of nodes.
+        """
+        removals = defaultdict(int)
+        for node_ in self.get_subtree(node):
+            removals[node_] += 1
+        trimmed = []
+        for node_ in subtree:
+            if removals[node_] > 0:  # like `list.remove`, the first occurrences are removed
+                removals[node_] -= 1
+            else:
+                trimmed.append(node_)
+        return trimmed
+
     def get_subjects(self, index):
+        return self.memoized("subjects", index, self.find_subjects)
+
+    def find_subjects(self, index):
         subjects = self._get_subjects(index)
         if not subjects:
-            if self.in_coming_relation(index) == "conj":
+            if self.in_coming_code(index) == CONJ_CODE:
                 subjects = self._get_subjects(self.parents[index])
         return subjects
 
@@ -214,22 +641,26 @@ class SyntaxTree():
         if not self.graph.has_node(index):
             return subjects
         for child in self.graph.neighbors(index):
-            rel = self.dependent_relation(index, child)
-            if rel == "nsubj" or rel == "nsubjpass":
+            if relations.flags[self.dependent_code(index, child)] & IS_NOMINAL_SUBJECT:  # nsubj or nsubjpass
                 subjects.append(child)
                 subjects.extend(self.get_conjunction(child))
                 break
         return subjects
 
     def get_objects(self, index):
+        return self.memoized("objects", index, self.find_objects)
+
+    def find_objects(self, index):
         objects = []
         for child in self.graph.neighbors(index):
-            if self.dependent_relation(index, child) == "dobj":
+            if self.dependent_code(index, child) == DOBJ_CODE:
                 objects.append(child)
                 objects.extend(self.get_conjunction(child))
         return objects
 
     def delete_subtree(self, subtree, drop_following_comma=False):
+        self.invalidate()
+        self.other_view = None
         idxes = []
         for node in subtree:
             if node in self.words:
@@ -258,14 +689,14 @@ class SyntaxTree():
 
 
 class SpacySyntaxTree(SyntaxTree):
-    def __init__(self, tokens, dependencies):
-        super().__init__(tokens, dependencies)
+    def __init__(self, tokens, dependencies, graph_class=None):
+        super().__init__(tokens, dependencies, graph_class)
 
-    def get_conjunction(self, index):
+    def find_conjunction(self, index):
         conjunctions = []
         while index is not None:
             for child in self.children(index):
-                if self.dependent_relation(index, child) == "conj":
+                if self.dependent_code(index, child) == CONJ_CODE:
                     conjunctions.append(child)
                     index = child
                     break
@@ -274,9 +705,102 @@ class SpacySyntaxTree(SyntaxTree):
         return conjunctions
 
 
+def flatten_tokens(tokens):
+    """
+    Copying the tokens, the tokens of phrases are copied one by one.
+    """
+    flattened = []
+    for token in tokens:
+        if isinstance(token, Phrase):
+            for _, token_ in token.tokens:
+                flattened.append(copy(token_))
+        else:
+            flattened.append(copy(token))
+    return flattened
+
+
 class SentenceBuilder():
-    def __init__(self):
+    parse_cache = None  # shared by all builders, see `use_parse_cache`
+    projecting = False  # projecting trees onto the remaining tokens instead of reparsing, see `use_projection`
+    graph_class = None  # the graph engine of the built trees, None for the tree class's default, see `use_graph_class`
+
+    def __init__(self, graph_class=None):
+        """
+        :param graph_class: the graph engine of the trees of this builder, eg. `array_graph.ArrayGraph`,
+                            the one of its class by default
+        """
         self.syntaxtree_class = None
+        if graph_class is not None:
+            self.graph_class = graph_class
+        self.backend = None
+        self.parse_properties = None  # the annotator properties of `parse` and `parse_batch`, part of the cache keys
+        self.projection_stats = {"projected": 0, "reparsed": 0}
+        self.request_slots = None  # a semaphore bounding the parser requests in flight, shared between builders
+
+    @classmethod
+    def use_parse_cache(cls, cache):
+        """
+        Caching the parsing results of the builders of this class (and its subclasses).
+
+        :param cache: a ParseCache, None to disable caching
+        """
+        cls.parse_cache = cache
+
+    @classmethod
+    def use_projection(cls, enabled=True):
+        """
+        Projecting the trees of the builders of this class (and its subclasses) onto the words left
+        after deleting subtrees, instead of reparsing them, see `rebuild`.
+        """
+        cls.projecting = enabled
+
+    @classmethod
+    def use_graph_class(cls, graph_class):
+        """
+        Building the trees of the builders of this class (and its subclasses) on the given graph engine.
+
+        :param graph_class: eg. `array_graph.ArrayGraph`, None for the default of the tree classes
+        """
+        cls.graph_class = graph_class
+
+    def request(self, parse, *args):
+        """
+        Sending a parser request, waiting for one of the `request_slots` first if they are set.
+        """
+        if self.request_slots is None:
+            return parse(*args)
+        with self.request_slots:
+            return parse(*args)
+
+    def cached_parse(self, sentence):
+        """
+        Parsing a sentence through the parse cache, returning the parsing result of the first sentence.
+        """
+        if self.parse_cache is None:
+            return self.request(self.parse, sentence)[0]
+        key = self.parse_cache.make_key(self.backend, self.parse_properties, sentence)
+        result = self.parse_cache.get(key)
+        if result is None:
+            result = self.request(self.parse, sentence)[0]
+            self.parse_cache.put(key, result)
+        return result
+
+    def cached_parse_batch(self, sentences):
+        """
+        Parsing a list of sentences through the parse cache, only the uncached sentences are sent to `parse_batch`.
+        """
+        if self.parse_cache is None:
+            return self.request(self.parse_batch, sentences)
+        keys = [self.parse_cache.make_key(self.backend, self.parse_properties, sentence)
+                for sentence in sentences]
+        results = [self.parse_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            parsed = self.request(self.parse_batch, [sentences[i] for i in missing])
+            for i, result in zip(missing, parsed):
+                self.parse_cache.put(keys[i], result)
+                results[i] = result
+        return results
 
     def build(self, tokens, dependencies, merging_noun=True, merging_verb=False):
         """
@@ -285,7 +809,7 @@ class SentenceBuilder():
         :param merging_noun:   indicate whether noun phrases are chunked
         :param merging_verb:   indicate whether verb phrases are chunked
         """
-        tree = self.syntaxtree_class(tokens, dependencies)
+        tree = self.syntaxtree_class(tokens, dependencies, self.graph_class)
         if merging_verb:  # chunk verb phrases
             self.chunk_verbs(tree)
         raw_sentence = " ".join(token.word for token in tokens)
@@ -295,9 +819,16 @@ class SentenceBuilder():
         return Sentence(raw_sentence, tree)
 
     def from_raw_senence(self, sentence, merging_noun=True, merging_verb=False):
-        sentence = self.parse(sentence)[0]
+        sentence = self.cached_parse(sentence)
         return self.from_parsing_result(sentence, merging_noun, merging_verb)
 
+    def from_raw_sentences(self, sentences, merging_noun=True, merging_verb=False):
+        """
+        Building sentences from a list of raw sentences, parsing them with `parse_batch`.
+        """
+        parsed = self.cached_parse_batch(sentences)
+        return [self.from_parsing_result(sentence, merging_noun, merging_verb) for sentence in parsed]
+
     def from_parsing_result(self, sentence, merging_noun=True, merging_verb=False):
         words = sentence["words"]
         pos_tags = sentence["pos_tags"]
@@ -311,30 +842,148 @@ class SentenceBuilder():
         sentence = " ".join([token.word for token in tokens])
         if printing:
             print(sentence)
-        # flatten phrases
-        tokens_ = []
-        for i in range(len(tokens)):
-            if isinstance(tokens[i], Phrase):
-                for _, token in tokens[i].tokens:
-                    tokens_.append(copy(token))
-            else:
-                tokens_.append(copy(tokens[i]))
-        tokens = tokens_
+        tokens = flatten_tokens(tokens)
+        sentence = self.cached_parse(sentence)
+        if printing:
+            print(sentence["dependencies"])
+        return self.from_parsed_tokens(tokens, sentence, merging_noun, merging_verb)
 
-        result = self.parse(sentence)
-        sentence = result[0]
+    def from_parsed_tokens(self, tokens, sentence, merging_noun=True, merging_verb=False):
+        """
+        Building a sentence from flattened tokens and the parsing result of their text.
+        """
         for i, pos in enumerate(sentence["pos_tags"]):
             tokens[i].pos = pos  # reassign pos tag
             tokens[i].idx = i  # reassign the index in the current clause
+        return self.build(tokens, sentence["dependencies"], merging_noun, merging_verb)
 
-        dependencies = sentence["dependencies"]
-        if printing:
-            print(dependencies)
-        return self.build(tokens, dependencies, merging_noun, merging_verb)
+    def from_un_parsed_tokens_batch(self, clauses, merging_noun=True, merging_verb=False):
+        """
+        Building sentences from a list of token lists, parsing all of them in one batched request.
+        """
+        sentences = [self.defer(tokens, merging_noun, merging_verb) for tokens in clauses]
+        self.flush(sentences)
+        return sentences
+
+    def defer(self, tokens, merging_noun=True, merging_verb=False):
+        """
+        Creating a sentence from unparsed tokens whose parsing is postponed until `flush`, so that
+        the clauses of a sentence are parsed together. The tokens are copied at once, later changes
+        of them don't affect the sentence.
+
+        :return: a pending sentence, its tree is None until flushed
+        """
+        sentence = Sentence(" ".join([token.word for token in tokens]), None)
+        sentence.pending = (flatten_tokens(tokens), merging_noun, merging_verb)
+        return sentence
+
+    def flush(self, sentences):
+        """
+        Parsing the pending ones of the sentences with one `parse_batch` call, then assigning the
+        pos tags and dependencies back to their tokens.
+        """
+        pending = [sentence for sentence in sentences if sentence.pending is not None]
+        if not pending:
+            return
+        parsed = self.cached_parse_batch([sentence.raw_sentence for sentence in pending])
+        for sentence, result in zip(pending, parsed):
+            tokens, merging_noun, merging_verb = sentence.pending
+            built = self.from_parsed_tokens(tokens, result, merging_noun, merging_verb)
+            sentence.raw_sentence = built.raw_sentence
+            sentence.tree = built.tree
+            sentence.pending = None
+
+    def rebuild(self, tree, merging_noun=True, merging_verb=False, printing=False):
+        """
+        Building a sentence from the remaining words of a tree after subtrees were deleted.
+        In projection mode the existing tree is projected onto the remaining tokens and the
+        sentence is reparsed only when the projection would be malformed.
+        """
+        if self.projecting:
+            sentence = self.project(tree, merging_noun, merging_verb)
+            if sentence is not None:
+                self.projection_stats["projected"] += 1
+                return sentence
+        self.projection_stats["reparsed"] += 1
+        tokens = [item[1] for item in sorted(tree.words.items(), key=itemgetter(0))]
+        return self.from_un_parsed_tokens(tokens, merging_noun, merging_verb, printing)
+
+    def defer_rebuild(self, tree, merging_noun=True, merging_verb=False):
+        """
+        `rebuild` with the reparsing postponed until `flush`, so that the reparses of several
+        sentences are sent together.
+
+        :return: the projected sentence, or a pending sentence
+        """
+        if self.projecting:
+            sentence = self.project(tree, merging_noun, merging_verb)
+            if sentence is not None:
+                self.projection_stats["projected"] += 1
+                return sentence
+        self.projection_stats["reparsed"] += 1
+        tokens = [item[1] for item in sorted(tree.words.items(), key=itemgetter(0))]
+        return self.defer(tokens, merging_noun, merging_verb)
+
+    def project(self, tree, merging_noun=True, merging_verb=False):
+        """
+        Projecting a tree onto its remaining tokens, renumbering the tokens and keeping the relations.
+
+        :return: the projected sentence, None if the remaining tokens don't form a well-formed tree
+                 (eg. a word whose head was deleted)
+        """
+        tokens = {}  # position -> token
+        heads = {}   # position -> (head position, relation)
+        for idx, word in tree.words.items():
+            if isinstance(word, Phrase):
+                if word.type() != NOUN:  # merged verb phrases rewire edges, reparsing is safer
+                    return None
+                for i, token in word.tokens:
+                    tokens[i] = token
+                for gov, dep, rel in word.in_edges:
+                    heads[dep] = (gov, rel)
+            else:
+                tokens[idx] = word
+            if idx == tree.root:
+                heads[idx] = (0, "ROOT")
+            else:
+                rel = tree.in_coming_relation(idx)
+                if rel is None:
+                    return None
+                heads[idx] = (tree.parents[idx], rel)
+
+        positions = sorted(tokens)
+        new_index = {position: i + 1 for i, position in enumerate(positions)}
+        dependencies = []
+        roots = 0
+        for position in positions:
+            if position not in heads:
+                return None
+            head, rel = heads[position]
+            if head == 0:
+                roots += 1
+            elif head not in new_index:
+                return None
+            dependencies.append((new_index.get(head, 0), new_index[position], rel))
+        if roots != 1:
+            return None
+
+        tokens_ = []
+        for i, position in enumerate(positions):
+            token = copy(tokens[position])
+            token.idx = i  # reassign the index in the current clause
+            tokens_.append(token)
+        return self.build(tokens_, dependencies, merging_noun, merging_verb)
 
     def parse(self, sentence):
         raise NotImplementedError
 
+    def parse_batch(self, sentences):
+        """
+        Parsing a list of sentences, returning the parsing result of each sentence.
+        Builders whose parser accepts several sentences in one request should override this.
+        """
+        return [self.parse(sentence)[0] for sentence in sentences]
+
     def chunk_nouns(self, sentence):
         raise NotImplementedError
 
@@ -349,6 +998,7 @@ class Sentence():
         self.left = []
         self.right = []
         self.raw_tuples = []   # the extracted raw tuples
+        self.pending = None    # the tokens waiting to be parsed, see `SentenceBuilder.defer`
 
     def __str__(self):
         return self.raw_sentence
@@ -378,6 +1028,9 @@ class Sentence():
 
 
 class Tuple:
+    __slots__ = ("subject", "predicate", "direct_object", "indirect_object", "adverbial", "clause_type",
+                 "negation", "sentence")
+
     def __init__(self):
         self.subject = None
         self.predicate = None
@@ -386,6 +1039,14 @@ class Tuple:
         self.adverbial = []
         self.clause_type = None
         self.negation = False
+        self.sentence = None
+
+    def __getstate__(self):
+        return get_slot_state(self)
+
+    def __setstate__(self, state):
+        self.sentence = None  # missing in the tuples pickled before it was a slot
+        set_slot_state(self, state)
 
     def to_word(self, element, with_index=False):
         if not element:
@@ -522,6 +1183,8 @@ class Tuple:
 
 
 class Element:
+    __slots__ = ("word", "word_index", "sentence", "entity", "reference", "prep", "ne_type")
+
     def __init__(self):
         self.word = ""
         self.word_index = []
@@ -531,6 +1194,12 @@ class Element:
         self.prep = None       # for adverbial
         self.ne_type = None    # for ner
 
+    def __getstate__(self):
+        return get_slot_state(self)
+
+    def __setstate__(self, state):
+        set_slot_state(self, state)
+
     def __eq__(self, other):
         if other is not None:
             if self.prep is None and other.prep is None:
@@ -566,6 +1235,7 @@ class Node():
     PREDICATE = "Predicate"
     Entity = "Entity"
     current_id = int(time.time()*1000)
+    __slots__ = ("value", "type", "sentence_index", "name", "node_id")
 
     def __init__(self, value, type_, sentence_index=None):
         self.value = value
@@ -577,6 +1247,12 @@ class Node():
             self.name = value["uri"]
         self.node_id = self.generate_id()
 
+    def __getstate__(self):
+        return get_slot_state(self)
+
+    def __setstate__(self, state):
+        set_slot_state(self, state)
+
     def generate_id(self):
         if self.type == self.PREDICATE:
             _id = int(Node.current_id)  # breaking reference
@@ -598,6 +1274,19 @@ class Node():
         return self.node_id
 
 
+def wrap_entities(element):
+    """
+    Wrapping the linked entities of an element to nodes, the entities already wrapped are dropped.
+    """
+    if element.entity:
+        entity = []
+        for item in element.entity:
+            if isinstance(item, Node):
+                continue
+            entity.append(Node(item, Node.Entity))
+        element.entity = entity
+
+
 class Graph():
     def __init__(self, tuples_list=None):
         if not tuples_list:
@@ -669,13 +1358,7 @@ class Graph():
     def wrap_element(self, element, type_, sentence_index):
         if element is None:
             return None
-        if element.entity:
-            entity = []
-            for item in element.entity:
-                if isinstance(item, Node):
-                    continue
-                entity.append(Node(item, Node.Entity))
-            element.entity = entity
+        wrap_entities(element)
         return Node(element, type_, sentence_index)
 
     def check_collision(self, tuples):
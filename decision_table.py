@@ -0,0 +1,100 @@
+"""
+Classification rules compiled into decision tables. A rule is data: the incoming relations of the
+nodes it applies to (None for any node), the features of the node that must hold (prefixed with "!"
+for those that must not) and the label. The rules are tried in order and the first one matching
+gives the label. `DecisionTable` compiles them into a decision tree per incoming relation, which
+tests a feature of a node only when the label still depends on it, and at most once.
+"""
+from vocab import relations
+
+
+def parse_condition(condition):
+    if condition.startswith("!"):
+        return condition[1:], False
+    return condition, True
+
+
+def assume(rules, feature, value):
+    """
+    the rules still matching when `feature` is `value`, without their conditions on it
+    """
+    remaining = []
+    for conditions, label in rules:
+        if (feature, not value) in conditions:
+            continue
+        remaining.append((tuple(condition for condition in conditions if condition[0] != feature), label))
+    return remaining
+
+
+class DecisionTable():
+    def __init__(self, rules, features, default=None):
+        """
+        :param rules: a list of (incoming relations or None, conditions, label)
+        :param features: feature name -> function(context, index) telling whether the node has the feature
+        :param default: the label of the nodes no rule matches
+        """
+        self.rules = []
+        for incoming, conditions, label in rules:
+            conditions = tuple(parse_condition(condition) for condition in conditions)
+            for feature, _ in conditions:
+                if feature not in features:
+                    raise ValueError("Unknown feature %s in the rule of %s." % (feature, label))
+            codes = None if incoming is None else relations.code_set(incoming)
+            self.rules.append((codes, conditions, label))
+        self.features = features
+        self.default = default
+        keys = set()
+        for codes, _, _ in self.rules:
+            if codes is not None:
+                keys.update(codes)
+        self.tables = {code: self.compile(self.applicable(code)) for code in keys}
+        self.fallback = self.compile(self.applicable(None))  # for the other incoming relations
+
+    def applicable(self, in_code):
+        return [(conditions, label) for codes, conditions, label in self.rules if codes is None or in_code in codes]
+
+    def compile(self, rules):
+        """
+        :return: a label, or a decision (feature, decision if the node has it, decision otherwise)
+        """
+        if not rules:
+            return self.default
+        conditions, label = rules[0]
+        if not conditions:
+            return label
+        feature = conditions[0][0]
+        return feature, self.compile(assume(rules, feature, True)), self.compile(assume(rules, feature, False))
+
+    def classify(self, context, in_code, index):
+        """
+        :param context: passed to the feature functions, eg. the syntax tree
+        :param in_code: the code of the incoming relation of the node
+        :param index: the node
+        """
+        decision = self.tables.get(in_code, self.fallback)
+        features = self.features
+        while type(decision) is tuple:
+            feature, positive, negative = decision
+            decision = positive if features[feature](context, index) else negative
+        return decision
+
+    def first_match(self, context, in_code, index):
+        """
+        Trying the rules one at a time, the reference the compiled tables are checked against.
+        """
+        for codes, conditions, label in self.rules:
+            if codes is not None and in_code not in codes:
+                continue
+            if all(bool(self.features[feature](context, index)) == value for feature, value in conditions):
+                return label
+        return self.default
+
+    def size(self):
+        """
+        :return: the number of decisions in the compiled tables
+        """
+        def count(decision):
+            if type(decision) is tuple:
+                return 1 + count(decision[1]) + count(decision[2])
+            return 0
+        return sum(count(decision) for decision in self.tables.values()) + count(self.fallback)
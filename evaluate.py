@@ -1,14 +1,22 @@
+import json
 import re
-from tuple_extraction import Element, Tuple
+from datastructure import Element, Tuple
 from spacy_util import tokenize
-from itertools import chain
-import pickle
+from itertools import chain, zip_longest
+from collections import Counter, defaultdict, deque
+from stream_util import load_records
 
 
 def load(path):
+    return list(iter_documents(path))
+
+
+def iter_documents(path):
+    """
+    Reading the documents of an annotated corpus one at a time.
+    """
     with open(path, encoding="utf-8") as fi:
         in_sentence = False
-        documents = []
         document = []
         sentence = None
         tuples = []
@@ -25,7 +33,7 @@ def load(path):
                 if document:
                     if sentence:
                         document.append((sentence, tuples))
-                    documents.append(document)
+                    yield document
                     document = []
                     sentence = None
                     in_sentence = False
@@ -53,8 +61,7 @@ def load(path):
         if document:
             if sentence:
                 document.append((sentence, tuples))
-                documents.append(document)
-        return documents
+                yield document
 
 
 def build_tuple(splits):
@@ -183,18 +190,19 @@ def refine_word(word):
 
 
 def validate_by_lexical(sentence, tuples):
-    sentence_ = " ".join(tokenize(sentence))
+    sentence_ = None  # the tokenized sentence, only needed for the words not in the raw one
     tuples_ = []
     for tuple_ in tuples:
-        if tuple_.subject.word not in sentence and tuple_.subject.word not in sentence_:
-            continue
+        words = [tuple_.subject.word]
         if tuple_.direct_object:
-            if tuple_.direct_object.word not in sentence and tuple_.direct_object.word not in sentence_:
-                continue
+            words.append(tuple_.direct_object.word)
         if tuple_.indirect_object:
-            if tuple_.indirect_object.word not in sentence and tuple_.indirect_object.word not in sentence_:
-                continue
-        tuples_.append(tuple_)
+            words.append(tuple_.indirect_object.word)
+        missing = [word for word in words if word not in sentence]
+        if missing and sentence_ is None:
+            sentence_ = " ".join(tokenize(sentence))
+        if all(word in sentence_ for word in missing):
+            tuples_.append(tuple_)
     return tuples_
 
 
@@ -207,29 +215,32 @@ def merge_documents(documents1, documents2):
         document = []
         for (sent1, tuples1), (sent2, tuples2) in zip(doc1, doc2):
             assert sent1 == sent2
-            tuples = [tuple_ for tuple_ in tuples1]
-            for tuple2 in tuples2:
-                tuple_ = None
-                merged_tuple = None
-                for tuple1 in tuples:
-                    # if compare_tuples(tuple1, tuple2):
-                    #     break
-                    tuple_ = merge_tuples(tuple1, tuple2)
-                    if tuple_ is not None:
-                        merged_tuple = tuple1
-                        break
-                if tuple_ is not None:
-                    tuples.remove(merged_tuple)
-                    tuples.append(tuple_)
-                else:
-                    tuples.append(tuple2)
-
+            tuples = merge_sentence_tuples(tuples1, tuples2)
             tuples = validate_by_lexical(sent1, tuples)
             document.append((sent1, tuples))
         documents.append(document)
     return documents
 
 
+def merge_sentence_tuples(tuples1, tuples2):
+    """
+    Merging the tuples of the second extraction of a sentence into those of the first one: a tuple
+    is merged into the first tuple with the same signature (see `tuple_signature`), the merged tuple
+    moving to the end, and it is appended if there is none.
+    """
+    tuples = {}   # id -> tuple, in the order of the merged list
+    index = defaultdict(deque)  # signature -> the ids of its tuples, in the same order
+    for i, tuple_ in enumerate(chain(tuples1, tuples2)):
+        signature = tuple_signature(tuple_)
+        if i >= len(tuples1) and index[signature]:
+            merged = index[signature].popleft()
+            tuple_ = union_tuples(tuples.pop(merged), tuple_)
+            signature = tuple_signature(tuple_)
+        tuples[i] = tuple_
+        index[signature].append(i)
+    return list(tuples.values())
+
+
 def tuples2triples(tuples):
     return list(chain.from_iterable([tuple_.to_triples() for tuple_ in tuples]))
 
@@ -251,57 +262,173 @@ def compare_triple(triple1, triple2):
 
 
 def evaluate_triple(gold_documents, documents):
-    gold_totgal = 0
-    extracted_total = 0
-    correct = 0
-    assert len(gold_documents) == len(documents)
-    for doc1, doc2 in zip(gold_documents, documents):
-        assert len(doc1) == len(doc2)
-        for (sent1, tuples1), (sent2, tuples2) in zip(doc1, doc2):
-            assert sent1 == sent2
-            triples1 = tuples2triples(tuples1)
-            triples2 = tuples2triples(tuples2)
-            gold_totgal += len(triples1)
-            extracted_total += len(triples2)
-            for triple2 in triples2:
-                for triple1 in triples1:
-                    if compare_triple(triple1, triple2):
-                        correct += 1
-                        break
-    print(correct, extracted_total)
-    recall = correct / gold_totgal
-    precision = correct / extracted_total
-    f1 = 2 * recall * precision / (recall + precision)
-    print(f"recall: {recall:.3f}")
-    print(f"precision: {precision:.3f}")
-    print(f"f1: {f1:.3f}")
+    results = TripleEvaluator().evaluate(gold_documents, {"system": documents})["system"]["overall"]
+    print(results["correct"], results["extracted"])
+    print(f"recall: {results['recall']:.3f}")
+    print(f"precision: {results['precision']:.3f}")
+    print(f"f1: {results['f1']:.3f}")
+    return results
+
+
+def scores(correct, extracted, gold):
+    """
+    precision, recall and f1, 0 where they are undefined
+    """
+    precision = correct / extracted if extracted else 0.0
+    recall = correct / gold if gold else 0.0
+    f1 = 2 * recall * precision / (recall + precision) if recall + precision else 0.0
+    return {"correct": correct, "extracted": extracted, "gold": gold,
+            "precision": precision, "recall": recall, "f1": f1}
+
+
+def precision_scores(correct, extracted):
+    """
+    the precision of a category the gold triples aren't counted in, its gold count, recall and f1 being None
+    """
+    precision = correct / extracted if extracted else 0.0
+    return {"correct": correct, "extracted": extracted, "gold": None,
+            "precision": precision, "recall": None, "f1": None}
+
+
+class TripleEvaluator():
+    """
+    Scoring extracted triples against gold ones. Every triple is normalized once into its
+    `triple_key`, and a predicted triple is correct if the key is in the set of the gold keys of its
+    sentence. The triples are counted overall, by the clause type of their tuple and by their label
+    (dobj, iobj, the preposition of an adverbial or None), for several systems at once.
+
+    The annotated tuples have no clause type, so the gold triples are only counted overall and by
+    label: the clause types of a system get its precision, without recall and f1.
+    """
+    def __init__(self, names=("system",)):
+        self.names = list(names)
+        self.gold = Counter()   # category -> gold triples, for the categories of `gold_categories`
+        self.extracted = {name: Counter() for name in self.names}
+        self.correct = {name: Counter() for name in self.names}
+
+    def add_sentence(self, gold_tuples, system_tuples):
+        """
+        :param gold_tuples: the gold tuples of a sentence
+        :param system_tuples: the tuples extracted from the sentence by each system, in the order of `names`
+        """
+        gold_keys = set()
+        for tuple_ in gold_tuples:
+            for triple in tuple_.to_triples():
+                key = triple_key(triple)
+                gold_keys.add(key)
+                self.gold.update(gold_categories(key))
+        for name, tuples in zip(self.names, system_tuples):
+            extracted = self.extracted[name]
+            correct = self.correct[name]
+            for tuple_ in tuples:
+                for triple in tuple_.to_triples():
+                    key = triple_key(triple)
+                    extracted.update(categories(tuple_, key))
+                    if key in gold_keys:
+                        correct.update(categories(tuple_, key))
+
+    def evaluate(self, gold_documents, system_documents):
+        """
+        Scoring the systems in one pass over the documents, which can be streamed (eg. `iter_documents`),
+        the counts add up to those of the previous calls.
+        :param gold_documents: the annotated documents
+        :param system_documents: system name -> its documents, aligned with the gold ones, for each of `names`
+        :return: see `results`
+        """
+        missing = object()
+        streams = [system_documents[name] for name in self.names]
+        for gold_document, *documents in zip_longest(gold_documents, *streams, fillvalue=missing):
+            assert gold_document is not missing and all(document is not missing for document in documents)
+            assert all(len(document) == len(gold_document) for document in documents)
+            for i, (sentence, gold_tuples) in enumerate(gold_document):
+                assert all(document[i][0] == sentence for document in documents)
+                self.add_sentence(gold_tuples, [document[i][1] for document in documents])
+        return self.results()
+
+    def results(self):
+        """
+        :return: system name -> {"overall": scores, "clause_type": {type: scores}, "label": {label: scores}},
+                 the scores being the counts with the precision, recall and f1 (see `precision_scores` for
+                 the clause types)
+        """
+        results = {}
+        for name in self.names:
+            extracted = self.extracted[name]
+            correct = self.correct[name]
+            result = {"overall": None, "clause_type": {}, "label": {}}
+            for category in set(self.gold) | set(extracted):
+                if category[0] == "clause_type":
+                    score = precision_scores(correct[category], extracted[category])
+                else:
+                    score = scores(correct[category], extracted[category], self.gold[category])
+                if category[0] == "overall":
+                    result["overall"] = score
+                else:
+                    result[category[0]][str(category[1])] = score
+            if result["overall"] is None:
+                result["overall"] = scores(0, 0, 0)
+            results[name] = result
+        return results
+
+
+def categories(tuple_, key):
+    """
+    the categories an extracted triple is counted in
+    """
+    return ("overall", None), ("clause_type", tuple_.clause_type), ("label", key[3])
+
+
+def gold_categories(key):
+    """
+    the categories a gold triple is counted in
+    """
+    return ("overall", None), ("label", key[3])
+
+
+def element_key(element):
+    """
+    the normalized element, equal for the elements `Element.__eq__` finds equal
+    """
+    if element is None:
+        return None
+    return element.word.lower(), element.prep.lower() if element.prep is not None else None
+
+
+def tuple_signature(tuple_):
+    """
+    the normalized (subject, predicate, direct object, indirect object), tuples with the same signature are merged
+    """
+    return (element_key(tuple_.subject), element_key(tuple_.predicate), element_key(tuple_.direct_object),
+            element_key(tuple_.indirect_object))
+
+
+def triple_key(triple):
+    """
+    the normalized triple, equal for the triples `Tuple.compare_triple` finds equal
+    """
+    element = refine_word(triple[2].word).lower() if triple[2] is not None else None
+    return refine_word(triple[0].word).lower(), triple[1].word, element, triple[3]
 
 
 def merge_tuples(tuple1, tuple2):
-    to_merge = False
-    if tuple1.subject == tuple2.subject and tuple1.predicate == tuple2.predicate:
-        to_merge = True
-    if tuple1.direct_object is not None and tuple2.direct_object is not None:
-        if tuple1.direct_object != tuple2.direct_object:
-            to_merge = False
-    elif tuple1.direct_object is not None or tuple2.direct_object is not None:
-        to_merge = False
-    if tuple1.indirect_object is not None and tuple2.indirect_object is not None:
-        if tuple1.indirect_object != tuple2.indirect_object:
-            to_merge = False
-    elif tuple1.indirect_object is not None or tuple2.indirect_object is not None:
-        to_merge = False
-    if not to_merge:
+    if tuple_signature(tuple1) != tuple_signature(tuple2):
         return None
+    return union_tuples(tuple1, tuple2)
+
+
+def union_tuples(tuple1, tuple2):
+    """
+    the tuple of the union of the triples of two tuples with the same signature
+    """
     triples1 = tuple1.to_triples()
-    triples2 = tuple2.to_triples()
-    for triple2 in triples2:
-        for triple1 in triples1:
-            if Tuple.compare_triple(triple1, triple2):
-                break
-        else:
+    keys = set(triple_key(triple) for triple in triples1)
+    for triple2 in tuple2.to_triples():
+        key = triple_key(triple2)
+        if key not in keys:
+            keys.add(key)
             triples1.append(triple2)
     tuple_ = Tuple()
+    adverbial_keys = set()
     for triple in triples1:
         if tuple_.predicate is None:
             tuple_.predicate = triple[1]
@@ -314,18 +441,20 @@ def merge_tuples(tuple1, tuple2):
             tuple_.indirect_object = triple[2]
         if label is None:
             tuple_.subject = triple[0]
-        elif triple[2] not in tuple_.adverbial:
+        elif element_key(triple[2]) not in adverbial_keys:
             tuple_.subject = triple[0]
             tuple_.adverbial.append(triple[2])
+            adverbial_keys.add(element_key(triple[2]))
     return tuple_
 
 
 if __name__ == "__main__":
     documents1 = load("data/wiki_sentences_extraction.txt")
     # documents2 = load("data/tuples_raw.txt")
-    with open("data/tuples_spacy_raw.pkl", "rb") as fi:
-        documents2 = pickle.load(fi)
+    documents2 = load_records("data/tuples_spacy_raw.pkl")
     documents3 = load("data/tuples_lexical.txt")
     documents4 = load("data/tuples_refined.txt")
     documents = merge_documents(documents2, documents3)
     evaluate_triple(documents1, documents)
+    systems = {"raw": documents2, "lexical": documents3, "refined": documents4, "merged": documents}
+    print(json.dumps(TripleEvaluator(systems).evaluate(documents1, systems), indent=2))
@@ -1,17 +1,25 @@
-import data
-from datastructure import Node, Graph
+from datastructure import Node, Graph, wrap_entities
 import random
 import networkx as nx
-from entity_linking import annotate
 import pickle
 from itertools import combinations
 from itertools import chain
-from tuple_extraction import Tuple
+from datastructure import Tuple
 import numpy as np
-import sklearn.preprocessing as pp
-from dbpedia_util import semantic_relatedness
 from collections import defaultdict
 from evaluate import load
+from stream_util import Checkpoint, load_records, file_fingerprint, make_fingerprint
+import os
+
+
+def normalize_columns(W):
+    """
+    l1-normalizing the columns of W, all-zero columns are left as they are
+    (the same as sklearn.preprocessing.normalize(W, axis=0, norm="l1"))
+    """
+    norms = np.abs(W).sum(axis=0)
+    norms[norms == 0] = 1
+    return W / norms
 
 
 def annotate_tuple(tuple, mention_entities, nes):
@@ -52,15 +60,29 @@ def pronoun_type(word):
         return None
 
 
-def annotate_documents(documents, save_path):
-    annotated_docs = []
-    for i, document in enumerate(documents):
-        print(i)
-        sentences = [sent for sent, _ in document]
-        doc = annotate(sentences, 0.05)
-        annotated_docs.append(doc)
-    with open(save_path, "wb") as fo:
-        pickle.dump(annotated_docs, fo)
+def annotate_documents(documents, save_path, resume=False, fingerprint=None):
+    """
+    :param resume: continuing an interrupted run, the annotated documents are checkpointed in
+                   `<save_path>.part` until all of them are done
+    :param fingerprint: identifying the documents, a checkpoint of other documents is not resumed,
+                        see `stream_util.make_fingerprint`
+    """
+    from entity_linking import annotate  # DBpedia spotlight client, only needed here
+    part_path = save_path + ".part"
+    with Checkpoint(part_path, fingerprint) as checkpoint:
+        done = checkpoint.open(resume)
+        for i, document in enumerate(documents):
+            if i < done:
+                continue
+            print(i)
+            sentences = [sent for sent, _ in document]
+            doc = annotate(sentences, 0.05)
+            checkpoint.append(doc)
+        annotated_docs = load_records(part_path)
+        with open(save_path, "wb") as fo:
+            pickle.dump(annotated_docs, fo)
+        checkpoint.finish()
+    os.remove(part_path)
 
 
 def derive_first_level_graph(graph):
@@ -84,11 +106,12 @@ def derive_first_level_graph(graph):
                 if nodes[child]["type"] == Node.Noun:
                     j = first_level_nodes.index(nodes[child]["name"])
                     W[i, j] = W[j, i] = 1
-    W = pp.normalize(W, axis=0, norm="l1")
+    W = normalize_columns(W)
     return first_level_nodes, v, W
 
 
 def derive_second_level_graph(graph):
+    from dbpedia_util import semantic_relatedness  # DBpedia and redis clients, only needed here
     nodes = graph.nodes()
     nouns = []
     noun_candidates = defaultdict(list)
@@ -124,7 +147,7 @@ def derive_second_level_graph(graph):
                     uri1 = str(nodes[cand1]["value"]["uri"])
                     uri2 = str(nodes[cand2]["value"]["uri"])
                     W[idx1, idx2] = W[idx2, idx1] = semantic_relatedness(uri1, uri2)
-    W = pp.normalize(W, axis=0, norm="l1")
+    W = normalize_columns(W)
     return nouns, noun_candidates, enrolled_nodes, W
 
 
@@ -257,28 +280,69 @@ def un_wrap_tuple(tuple_):
     return t
 
 
-def annotate_graph(documents, annoated_docs_path, save_path, semantic_graph=True):
+def annotate_graph(documents, annoated_docs_path, save_path, semantic_graph=True, resume=False, fingerprint=None):
+    """
+    :param resume: continuing an interrupted run, the graphs are checkpointed in `<save_path>.part`
+                   together with the predicate id counter, so the resumed run goes on numbering the
+                   nodes where the interrupted one stopped (the counter starts from the clock, so the
+                   graphs differ from those of a run started at another time anyway)
+    :param fingerprint: identifying the documents, a checkpoint of other documents or annotations
+                        is not resumed, see `stream_util.make_fingerprint`
+    """
     with open(annoated_docs_path, "rb") as fi:
         annotated_docs = pickle.load(fi)
-    graphs = []
-    for i, document in enumerate(documents):
-        all_tuples = []
-        mention_entities, nes_list = annotated_docs[i]
-        for (sent, tuples), nes in zip(document, nes_list):
-            for tuple_ in tuples:
-                annotate_tuple(tuple_, mention_entities, nes)
-                tuple_.sentence = sent
-            all_tuples.append(tuples)
-        print(sum(map(len, all_tuples)))
-        if semantic_graph:
-            graph = Graph()
-            graph.build_semantic_graph(all_tuples)
-        else:
-            graph = Graph(all_tuples)
-        graphs.append(graph)
+    part_path = save_path + ".part"
+    fingerprint = make_fingerprint(file_fingerprint(annoated_docs_path), semantic_graph, fingerprint)
+    with Checkpoint(part_path, fingerprint) as checkpoint:
+        done = checkpoint.open(resume)
+        if checkpoint.state is not None:
+            Node.current_id = checkpoint.state
+        for i, document in enumerate(documents):
+            # the tuples of the documents done are annotated again, the callers use them afterwards
+            all_tuples = annotate_document(document, annotated_docs[i])
+            if i < done:
+                wrap_document_entities(all_tuples)
+                continue
+            checkpoint.append(build_graph(all_tuples, semantic_graph), Node.current_id)
+        graphs = load_records(part_path)
+        with open(save_path, "wb") as fo:
+            pickle.dump(graphs, fo)
+        checkpoint.finish()
+    os.remove(part_path)
 
-    with open(save_path, "wb") as fo:
-        pickle.dump(graphs, fo)
+
+def annotate_document(document, annotated_doc):
+    all_tuples = []
+    mention_entities, nes_list = annotated_doc
+    for (sent, tuples), nes in zip(document, nes_list):
+        for tuple_ in tuples:
+            annotate_tuple(tuple_, mention_entities, nes)
+            tuple_.sentence = sent
+        all_tuples.append(tuples)
+    return all_tuples
+
+
+def wrap_document_entities(all_tuples):
+    """
+    What building the graph of a document does to its tuples, without building it: the linked
+    entities of the elements are wrapped to nodes in the same order.
+    """
+    for tuples in all_tuples:
+        for tuple_ in tuples:
+            elements = [tuple_.subject, tuple_.predicate, tuple_.direct_object, tuple_.indirect_object]
+            for element in elements + list(tuple_.adverbial or []):
+                if element is not None:
+                    wrap_entities(element)
+
+
+def build_graph(all_tuples, semantic_graph=True):
+    print(sum(map(len, all_tuples)))
+    if semantic_graph:
+        graph = Graph()
+        graph.build_semantic_graph(all_tuples)
+    else:
+        graph = Graph(all_tuples)
+    return graph
 
 
 def propagation(graph, gamma1=0.3, gamma2=0.1):
@@ -379,6 +443,7 @@ def join_optimize(documents, source_path, save_path, lambda1, lambda2, K, dump_g
 
 
 if __name__ == "__main__":
+    import data
     # documents = load("data/tuples_refined.txt")
     # annotate_graph(documents, "data/annotated_docs.txt", "data/graph1.pkl", semantic_graph=False)
 
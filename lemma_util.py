@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                         "doc2graph")
+TABLE_PATH = os.path.join(CACHE_DIR, "verb_lemmas.json")
+
+
+def resources_version():
+    """
+    the version of spacy, whose lemma resources the table is built from
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("spacy")
+    except PackageNotFoundError:
+        return None
+
+
+def lemmatize(string, index, exceptions, rules):
+    """
+    The rule based lemmatization of spacy's Lemmatizer.
+
+    :return: the candidate lemmas, and whether they were derived from the resources
+             (otherwise the string itself is returned)
+    """
+    orig = string
+    string = string.lower()
+    forms = []
+    oov_forms = []
+    for old, new in rules:
+        if string.endswith(old):
+            form = string[:len(string) - len(old)] + new
+            if not form:
+                pass
+            elif form in index or not form.isalpha():
+                forms.append(form)
+            else:
+                oov_forms.append(form)
+    # removing duplicates but preserving the ordering of applied rules
+    forms = list(OrderedDict.fromkeys(forms))
+    # exceptions are put at the front of the list so that they get priority
+    for form in exceptions.get(string, []):
+        if form not in forms:
+            forms.insert(0, form)
+    if not forms:
+        forms.extend(oov_forms)
+    if not forms:
+        return [orig], False
+    return forms, True
+
+
+class VerbLemmatizer():
+    """
+    Verb lemmatization with a lookup table built once from spacy's lemma index, exceptions and rules.
+    The table is persisted to a json file in the user's cache directory with the spacy version it was
+    built with, a table of another version is rebuilt; forms not in the table are lemmatized with the
+    rules and memorized.
+    """
+    def __init__(self, path=TABLE_PATH):
+        self.path = path
+        self.table = None
+        self.resources = None
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, verb):
+        lemma = self.memo.get(verb)
+        if lemma is None:
+            lemma = self.get_table().get(verb.lower())
+            if lemma is None:  # unseen form
+                index, exceptions, rules = self.get_resources()
+                lemma = lemmatize(verb, index, exceptions, rules)[0][0]
+            self.memo[verb] = lemma
+        return lemma
+
+    def get_resources(self):
+        if self.resources is None:
+            from spacy.lang.en import LEMMA_INDEX, LEMMA_EXC, LEMMA_RULES
+            self.resources = (set(LEMMA_INDEX.get("verb", [])), LEMMA_EXC.get("verb", {}),
+                              LEMMA_RULES.get("verb", []))
+        return self.resources
+
+    def get_table(self):
+        if self.table is None:
+            with self.lock:
+                if self.table is None:
+                    version = resources_version()
+                    table = self.load_table(version)
+                    if table is None:
+                        table = self.build_table()
+                        if self.path:
+                            self.save_table(table, version)
+                    self.table = table
+        return self.table
+
+    def load_table(self, version):
+        """
+        :return: the saved table, None if there is none or it was built with another spacy version
+        """
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as fi:
+                saved = json.load(fi)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get("spacy") != version or "table" not in saved:
+            return None
+        return saved["table"]
+
+    def build_table(self):
+        """
+        Lemmatizing every form that the rules can derive from the indexed verbs, plus the exceptions.
+        """
+        index, exceptions, rules = self.get_resources()
+        candidates = set(index)
+        candidates.update(exceptions)
+        for base in index:
+            for old, new in rules:
+                if base.endswith(new):
+                    candidates.add(base[:len(base) - len(new)] + old)
+        table = {}
+        for form in candidates:
+            forms, found = lemmatize(form, index, exceptions, rules)
+            if found:  # the lemma of an underived form depends on its case, so it isn't tabled
+                table[form] = forms[0]
+        return table
+
+    def save_table(self, table, version):
+        """
+        Writing the table through a temporary file of its own, so that processes building the table
+        at the same time don't write to the same file. A table that can't be saved is still used.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fo = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False)
+        except OSError:
+            return
+        try:
+            with fo:
+                json.dump({"spacy": version, "table": table}, fo, separators=(",", ":"), sort_keys=True)
+            os.replace(fo.name, self.path)
+        except OSError:
+            os.remove(fo.name)
+
+
+verb_lemmatizer = VerbLemmatizer()
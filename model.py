@@ -1,5 +1,4 @@
-from tuple_extraction import openie, restructurer
-from tuple_extraction import build_tuple
+from tuple_extraction import build_tuple, components
 import pickle
 
 
@@ -40,11 +39,12 @@ def load_data(path):
 def generate_positive_samples():
     sentences = load_data("data/UD_English-EWT-r1.4/en-ud-dev.conllu")
     samples = []
+    c = components()
     for sentence in sentences[120:125]:
         sample = {"sentence": sentence}
         sentence_ = Sentence.from_parsing_result(sentence)
-        restructurer.apposition_first(sentence_)
-        sample["tuples"] = list(openie.process_sentence(sentence_))
+        c.restructurer.apposition_first(sentence_)
+        sample["tuples"] = list(c.openie.process_sentence(sentence_))
         samples.append(sample)
     with open("data/positive_tuples.pkl", "wb") as fo:
         pickle.dump(samples, fo)
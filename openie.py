@@ -1,9 +1,22 @@
 import clause_classification as SCLF
 from corenlp_util import merge_verb_phrase
 import json
-from itertools import chain
+from itertools import chain, product
 from datastructure import Phrase, Token
-from clause_classification import CorenlpClauseClassifier
+from clause_classification import CorenlpClauseClassifier, TreeFeatures
+from vocab import relations, tags, IS_AUX, IS_NOUN, IS_VERB
+
+# the interned codes, see `vocab`
+NEG_CODE = relations.code("neg")
+COP_CODE = relations.code("cop")
+CONJ_CODE = relations.code("conj")
+DOBJ_CODE = relations.code("dobj")
+IOBJ_CODE = relations.code("iobj")
+XCOMP_CODE = relations.code("xcomp")
+NSUBJPASS_CODE = relations.code("nsubjpass")
+AUXPASS_CODE = relations.code("auxpass")
+VBG_CODE = tags.code("VBG")
+VBN_CODE = tags.code("VBN")
 
 
 class CorenlpOpenIE():
@@ -84,7 +97,7 @@ def assign_adverbial(tree, adverbials, tuple_):
 
     if not isinstance(predicate, list):
         idx = predicate.idx + 1
-        if tree.in_coming_relation(idx) == "conj":
+        if tree.in_coming_code(idx) == CONJ_CODE:
             parent = tree.parents[idx]
             if parent-1 in adverbials:  # pay attention to the index
                 adverbial = [item for item in adverbials[parent-1] if len(item) > 1]
@@ -110,46 +123,25 @@ def extract_tuples(clause_clf, sentence):
     :param tree: the syntax tree of the sentence
     :return:
     """
-    tree = sentence.tree
+    matcher = DependencyMatcher(sentence.tree, lambda clause: extract_tuples(clause_clf, clause))
     processed = []
-    for index, token in tree.words.items():
-        if index not in processed and token.pos.startswith('VB'):
-            type_ = clause_clf.classify_clause(tree, index)
-            if type_ == SCLF.SV:
-                for n_tuple in extract_SV(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVO:
-                for n_tuple in extract_SVO(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVC:
-                sentence.object_clause = True
-                for n_tuple in extract_SVC(tree, index, sentence):
-                    yield n_tuple
-                break  # need fix
-
-            elif type_ == SCLF.SVOO:
-                for n_tuple in extract_SVOO(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVb:
-                for n_tuple in extract_SVb(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVc:
-                for n_tuple in extract_SVc(tree, index, processed):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVcC:
-                sentence.object_clause = True
-                for n_tuple in extract_SVcC(tree, index, sentence):
-                    yield n_tuple
-                break   # need fix
-
-            elif type_ == SCLF.SVX:
-                for n_tuple in extract_SVX(tree, index):
-                    yield n_tuple
+    for index, type_ in clause_clf.label_tree(matcher.tree, matcher.features):
+        extract = EXTRACTIONS.get(type_)
+        if index in processed or extract is None:
+            continue
+        if type_ in OBJECT_CLAUSES:
+            sentence.object_clause = True
+        for n_tuple in extract(matcher, index, sentence, processed):
+            yield n_tuple
+        if type_ in OBJECT_CLAUSES:
+            break  # need fix
+
+
+def matched(pattern):
+    """
+    the extraction of the tuples matched by a pattern, see `DependencyMatcher`
+    """
+    return lambda matcher, index, sentence, processed: matcher.build(pattern(matcher, index, processed))
 
 
 def expand_phrase(extract_func):
@@ -187,13 +179,14 @@ def expand_predicate(tree, element):
     idx = element.idx + 1
     element_ = [element]
     for child in tree.children(idx):
-        if tree.dependent_relation(idx, child) in ["aux", "auxpass"] and tree.words[child].word not in ["did", "do"]:
+        if relations.flags[tree.dependent_code(idx, child)] & IS_AUX and tree.words[child].word not in ["did", "do"]:
             element_.append(tree.words[child])
     else:
-        if tree.words[idx].pos == "VBG" or tree.words[idx].pos == "VBN" and tree.in_coming_relation(idx) == "conj":
+        pos_code = tree.words[idx].pos_code
+        if pos_code == VBG_CODE or pos_code == VBN_CODE and tree.in_coming_code(idx) == CONJ_CODE:
             parent = tree.parents[idx]
             for child in tree.children(parent):
-                if tree.dependent_relation(parent, child) in ["aux", "auxpass"] and tree.words[child].word not in ["did", "do"]:
+                if relations.flags[tree.dependent_code(parent, child)] & IS_AUX and tree.words[child].word not in ["did", "do"]:
                     element_.append(tree.words[child])
     if len(element_) > 1:
         return sorted(element_, key=lambda token: token.idx)
@@ -201,9 +194,64 @@ def expand_predicate(tree, element):
         return element
 
 
+class DependencyMatcher():
+    """
+    Matching the extraction patterns of the clauses of a tree. The dependents of every node are
+    indexed by relation in one pass over the edges (see `TreeFeatures`), a pattern reads the roles of
+    the tuples of a clause from the index, and each noun head and predicate is expanded once however
+    many tuples share it.
+
+    A pattern is a function(matcher, index, processed) yielding matches (fields, roles): `fields`
+    are the entries shared by the tuples of the match, "V" being a node or a list of tokens, and
+    `roles` a list of (key, nodes), a tuple is built for every combination of the nodes.
+
+    :param extract_clause: function(sentence) extracting the tuples of a complement clause, for
+        the clause types taking one (SVC, SVcC)
+    """
+    def __init__(self, tree, extract_clause=None):
+        self.tree = tree
+        self.extract_clause = extract_clause
+        self.features = TreeFeatures(tree)
+        self.elements = {}    # node -> `expand_element` of its word
+        self.predicates = {}  # node -> `expand_predicate` of its word
+
+    def negative(self, index):
+        return NEG_CODE in self.features.out_going_codes(index)
+
+    def element(self, node):
+        element = self.elements.get(node)
+        if element is None:
+            element = expand_element(self.tree, self.tree.words[node])
+            self.elements[node] = element
+        return list(element) if isinstance(element, list) else element
+
+    def predicate(self, node):
+        predicate = self.predicates.get(node)
+        if predicate is None:
+            predicate = expand_predicate(self.tree, self.tree.words[node])
+            self.predicates[node] = predicate
+        return predicate
+
+    def build(self, matches):
+        """
+        :return: the tuple dicts of the matches, as consumed by `tuple_extraction.build_tuple`
+        """
+        for fields, roles in matches:
+            predicate = fields.get("V")
+            if isinstance(predicate, int):
+                predicate = self.predicate(predicate)
+            keys = [key for key, _ in roles]
+            for nodes in product(*[nodes for _, nodes in roles]):
+                n_tuple = dict(fields)
+                n_tuple["V"] = list(predicate) if isinstance(predicate, list) else predicate
+                for key, node in zip(keys, nodes):
+                    n_tuple[key] = self.element(node)
+                yield n_tuple
+
+
 @expand_phrase
-def extract_SVC(tree, index, sentence):
-    if "neg" in tree.out_going_relations(index):
+def extract_SVC(tree, index, sentence, extract_clause):
+    if NEG_CODE in tree.out_going_codes(index):
         negative = True
     else:
         negative = False
@@ -213,7 +261,7 @@ def extract_SVC(tree, index, sentence):
         sentence.right[0][1].stretch_nounphrases()
         merge_verb_phrase(sentence.right[0][1].tree)
         sentence.right[0][1].shrink_nounphrases()
-        C = list(extract_tuples(sentence.right[0][1]))
+        C = list(extract_clause(sentence.right[0][1]))
         for subject in subjects:
             n_tuple = {}
             n_tuple["category"] = SCLF.SVC
@@ -225,8 +273,8 @@ def extract_SVC(tree, index, sentence):
 
 
 @expand_phrase
-def extract_SVcC(tree, index, sentence):
-    if "neg" in tree.out_going_relations(tree.parents[index]):
+def extract_SVcC(tree, index, sentence, extract_clause):
+    if NEG_CODE in tree.out_going_codes(tree.parents[index]):
         negative = True
     else:
         negative = False
@@ -237,8 +285,8 @@ def extract_SVcC(tree, index, sentence):
         subjects = tree.get_subjects(tree.parents[index])
 
     if sentence.right:
-        C = list(extract_tuples(sentence.right[0][1]))
-        if "auxpass" in tree.in_coming_relation(index):  # it is known that
+        C = list(extract_clause(sentence.right[0][1]))
+        if tree.in_coming_code(index) == AUXPASS_CODE:  # it is known that
             if subjects:
                 n_tuple = {}
                 n_tuple["category"] = SCLF.SVcC
@@ -262,99 +310,50 @@ def extract_SVOC(tree, index):
     pass
 
 
-@expand_phrase
-def extract_SV(tree, index):
-    if "neg" in tree.out_going_relations(index):
-        negative = True
-    else:
-        negative = False
-
-    subjects = tree.get_subjects(index)
-
-    for subject in subjects:
-        n_tuple = {}
-        n_tuple["S"] = tree.words[subject]
-        n_tuple["V"] = tree.words[index]
-        n_tuple["N"] = negative
-        n_tuple["category"] = SCLF.SV
-        yield n_tuple
-
-
-@expand_phrase
-def extract_SVO(tree, index):
-    if "neg" in tree.out_going_relations(index):
-        negative = True
-    else:
-        negative = False
-
-    subjects = tree.get_subjects(index)
-    objects = tree.get_objects(index)
-    for subject in subjects:
-        for object in objects:
-            n_tuple = {}
-            n_tuple["S"] = tree.words[subject]
-            n_tuple["V"] = tree.words[index]
-            n_tuple["O"] = tree.words[object]
-            n_tuple["N"] = negative
-            n_tuple["category"] = SCLF.SVO
-            yield n_tuple
+def match_SV(matcher, index, processed):
+    fields = {"V": index, "N": matcher.negative(index), "category": SCLF.SV}
+    yield fields, [("S", matcher.features.subjects(index))]
 
 
-@expand_phrase
-def extract_SVOO(tree, index):
-    if "neg" in tree.out_going_relations(index):
-        negative = True
-    else:
-        negative = False
+def match_SVO(matcher, index, processed):
+    features = matcher.features
+    fields = {"V": index, "N": matcher.negative(index), "category": SCLF.SVO}
+    yield fields, [("S", features.subjects(index)), ("O", features.objects(index))]
 
-    subjects = tree.get_subjects(index)
-    dobj,iobj = get_idobj(tree, index)
 
+def match_SVOO(matcher, index, processed):
+    features = matcher.features
+    tree = matcher.tree
     dobjects = []
+    for obj in features.dependents_of(index, DOBJ_CODE):
+        dobjects.append(obj)
+        dobjects.extend(tree.get_conjunction(obj))
     iobjects = []
-    for obj in dobj:
-        dobjects.append(tree.words[obj])
-        conjunctions = tree.get_conjunction(obj)
-        for conjunction in conjunctions:
-            dobjects.append(tree.words[conjunction])
-
-    for obj in iobj:
-        iobjects.append(tree.words[obj])
-        conjunctions = tree.get_conjunction(obj)
-        for conjunction in conjunctions:
-            iobjects.append(tree.words[conjunction])
-    for subject in subjects:
-        for dobject in dobjects:
-            for iobject in iobjects:
-                n_tuple = {}
-                n_tuple["S"] = tree.words[subject]
-                n_tuple["V"] = tree.words[index]
-                n_tuple["dO"] = dobject
-                n_tuple["iO"] = iobject
-                n_tuple["N"] = negative
-                n_tuple["category"] = SCLF.SVOO
-                yield n_tuple
+    for obj in features.dependents_of(index, IOBJ_CODE):
+        iobjects.append(obj)
+        iobjects.extend(tree.get_conjunction(obj))
+    fields = {"V": index, "N": matcher.negative(index), "category": SCLF.SVOO}
+    yield fields, [("S", features.subjects(index)), ("dO", dobjects), ("iO", iobjects)]
 
 
-@expand_phrase
-def extract_SVc(tree, index, processed):
+def match_SVc(matcher, index, processed):
+    tree = matcher.tree
+    features = matcher.features
     parent = tree.parents[index]
-    subjects = tree.get_subjects(parent)
+    subjects = features.subjects(parent)
     conjunctions = tree.get_conjunction(parent)
     conjunctions.append(parent)
     processed.append(parent)
-    for subject in subjects:
-        for conjunction in conjunctions:
-            if tree.words[conjunction].pos.startswith('VB'):
-                continue
-            if conjunction != parent and 'cop' in tree.out_going_relations(conjunction):   # he is a boy and is a student
-                continue
-            n_tuple = {}
-            n_tuple["S"] = tree.words[subject]
-            n_tuple["V"] = tree.words[index]
-            n_tuple["P"] = tree.words[conjunction]
-            n_tuple["category"] = SCLF.SVc
-            yield n_tuple
+    if not subjects:  # the words of the conjunctions are only looked up for a subject
+        return
+    predicatives = []
+    for conjunction in conjunctions:
+        if tree.words[conjunction].pos_flags & IS_VERB:
+            continue
+        if conjunction != parent and COP_CODE in features.out_going_codes(conjunction):   # he is a boy and is a student
+            continue
+        predicatives.append(conjunction)
+    yield {"V": index, "category": SCLF.SVc}, [("S", subjects), ("P", predicatives)]
 
 
 def extract_SVb(tree, index):
@@ -365,10 +364,11 @@ def get_idobj(tree, index):
     iobj = []
     dobj = []
     for child in tree.graph.neighbors(index):
-        if tree.dependent_relation(index, child) == "dobj":
+        code = tree.dependent_code(index, child)
+        if code == DOBJ_CODE:
             dobj.append(child)
 
-        elif tree.dependent_relation(index, child) == "iobj":
+        elif code == IOBJ_CODE:
             iobj.append(child)
 
     return dobj, iobj
@@ -377,9 +377,10 @@ def get_idobj(tree, index):
 def get_pass(tree, index):
     nodes = []
     for child in tree.graph.neighbors(index):
-        if tree.dependent_relation(index, child) == "nsubjpass":
+        code = tree.dependent_code(index, child)
+        if code == NSUBJPASS_CODE:
             nodes.append(index)
-        elif tree.dependent_relation(index, child) == "auxpass":
+        elif code == AUXPASS_CODE:
             nodes.append(child)
     return nodes
 
@@ -391,33 +392,40 @@ def is_negative(tree, index): # neither...nor... need fix
     return False
 
 
-@expand_phrase
-def extract_SVX(tree, index):
-    if "neg" in tree.out_going_relations(index):
-        negative = True
-    else:
-        negative = False
-    for child in tree.graph.neighbors(index):
-        if tree.dependent_relation(index, child) == "xcomp" and tree.words[child].pos.startswith("VB"):
+def match_SVX(matcher, index, processed, noun_complement=XCOMP_CODE):
+    """
+    :param noun_complement: the relation of a noun complementing the verb, xcomp for corenlp
+    """
+    tree = matcher.tree
+    features = matcher.features
+    negative = matcher.negative(index)
+    for child, code in features.dependents.get(index, ()):
+        if code == XCOMP_CODE and tree.words[child].pos_flags & IS_VERB:
             phrase = [tree.words[idx] for idx in range(index, child+1) if idx in tree.words]
-            subjects = tree.get_subjects(index)
-            objects = tree.get_objects(child)
-            for subject in subjects:
-                n_tuple = {"category": "SVX", "S": tree.words[subject], "V": phrase, "N": negative}
-                if objects:
-                    for object in objects:
-                        n_tuple["O"] = tree.words[object]
-                        yield n_tuple
-                else:
-                    yield n_tuple
-        elif tree.dependent_relation(index, child) == "xcomp" and tree.words[child].pos.startswith("NN"):
-            subjects = tree.get_subjects(index)
+            roles = [("S", features.subjects(index))]
+            objects = features.objects(child)
+            if objects:
+                roles.append(("O", objects))
+            yield {"category": "SVX", "V": phrase, "N": negative}, roles
+        elif code == noun_complement and tree.words[child].pos_flags & IS_NOUN:
             objects = [child] + tree.get_conjunction(child)
-            for subject in subjects:
-                n_tuple = {"category": "SVX", "S": tree.words[subject], "V": tree.words[index], "N": negative}
-                for object in objects:
-                    n_tuple["O"] = tree.words[object]
-                    yield n_tuple
+            yield {"category": "SVX", "V": index, "N": negative}, [("S", features.subjects(index)), ("O", objects)]
+
+
+# clause type -> the extraction of its tuples, called with (matcher, index, sentence, processed)
+EXTRACTIONS = {
+    SCLF.SV: matched(match_SV),
+    SCLF.SVO: matched(match_SVO),
+    SCLF.SVC: lambda matcher, index, sentence, processed:
+        extract_SVC(matcher.tree, index, sentence, matcher.extract_clause),
+    SCLF.SVOO: matched(match_SVOO),
+    SCLF.SVb: lambda matcher, index, sentence, processed: extract_SVb(matcher.tree, index),
+    SCLF.SVc: matched(match_SVc),
+    SCLF.SVcC: lambda matcher, index, sentence, processed:
+        extract_SVcC(matcher.tree, index, sentence, matcher.extract_clause),
+    SCLF.SVX: matched(match_SVX),
+}
+OBJECT_CLAUSES = {SCLF.SVC, SCLF.SVcC}  # their tuples are taken from `sentence.right`, ending the extraction
 
 
 if __name__ == "__main__":
@@ -3,9 +3,13 @@ from sentence_classification_spacy import SpacyClauseClassifier
 from openie import tostr
 from corenlp_util import merge_verb_phrase
 import json
-from openie import extract_SV, extract_SVO, extract_SVOO
-from openie import extract_SVC, extract_SVcC
-from openie import record_clause, expand_phrase, assign_adverbial
+from openie import record_clause, assign_adverbial
+from openie import DependencyMatcher, matched, match_SVX
+from openie import EXTRACTIONS as OPENIE_EXTRACTIONS, OBJECT_CLAUSES
+from vocab import relations
+
+ATTR_CODE = relations.code(SCLF.ATTR)
+OPRD_CODE = relations.code("oprd")
 
 
 class SpacyOpenIE():
@@ -62,69 +66,28 @@ def extract_tuples(clause_clf, sentence):
     :param tree: the syntax tree of the sentence
     :return:
     """
-    tree = sentence.tree
+    matcher = DependencyMatcher(sentence.tree, lambda clause: extract_tuples(clause_clf, clause))
     processed = []
-    for index, token in tree.words.items():
-        if index not in processed and token.pos.startswith('VB'):
-            type_ = clause_clf.classify_clause(tree, index)
-            if type_ == SCLF.SV:
-                for n_tuple in extract_SV(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVO:
-                for n_tuple in extract_SVO(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVC:
-                sentence.object_clause = True
-                for n_tuple in extract_SVC(tree, index, sentence):
-                    yield n_tuple
-                break  # need fix
-
-            elif type_ == SCLF.SVOO:
-                for n_tuple in extract_SVOO(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVb:
-                for n_tuple in extract_SVb(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVc:
-                for n_tuple in extract_SVc(tree, index):
-                    yield n_tuple
-
-            elif type_ == SCLF.SVcC:
-                sentence.object_clause = True
-                for n_tuple in extract_SVcC(tree, index, sentence):
-                    yield n_tuple
-                break   # need fix
-
-            elif type_ == SCLF.SVX:
-                for n_tuple in extract_SVX(tree, index):
-                    yield n_tuple
-
-
-@expand_phrase
-def extract_SVc(tree, index):
-    if "neg" in tree.out_going_relations(tree.parents[index]):
-        negative = True
-    else:
-        negative = False
-    subjects = tree.get_subjects(index)
-    objects = []
-    for child in tree.children(index):
-        if tree.dependent_relation(index, child) == SCLF.ATTR:
-            objects = [child] + tree.get_conjunction(child)
-            break
-    for subject in subjects:
-        for object in objects:
-            n_tuple = {}
-            n_tuple["category"] = SCLF.SVc
-            n_tuple["S"] = tree.words[subject]
-            n_tuple["V"] = tree.words[index]
-            n_tuple["P"] = tree.words[object]
-            n_tuple["N"] = negative
+    for index, type_ in clause_clf.label_tree(matcher.tree, matcher.features):
+        extract = EXTRACTIONS.get(type_)
+        if index in processed or extract is None:
+            continue
+        if type_ in OBJECT_CLAUSES:
+            sentence.object_clause = True
+        for n_tuple in extract(matcher, index, sentence, processed):
             yield n_tuple
+        if type_ in OBJECT_CLAUSES:
+            break  # need fix
+
+
+def match_SVc(matcher, index, processed):
+    features = matcher.features
+    objects = []
+    attributes = features.dependents_of(index, ATTR_CODE)
+    if attributes:
+        objects = [attributes[0]] + matcher.tree.get_conjunction(attributes[0])
+    fields = {"category": SCLF.SVc, "V": index, "N": matcher.negative(matcher.tree.parents[index])}
+    yield fields, [("S", features.subjects(index)), ("P", objects)]
 
 
 def extract_SVOC(tree, index):
@@ -138,33 +101,10 @@ def extract_SVb(tree, index):
     return []
 
 
-@expand_phrase
-def extract_SVX(tree, index):
-    if "neg" in tree.out_going_relations(index):
-        negative = True
-    else:
-        negative = False
-    for child in tree.graph.neighbors(index):
-        if tree.dependent_relation(index, child) == "xcomp" and tree.words[child].pos.startswith("VB"):
-            phrase = [tree.words[idx] for idx in range(index, child+1) if idx in tree.words]
-            subjects = tree.get_subjects(index)
-            objects = tree.get_objects(child)
-            for subject in subjects:
-                n_tuple = {"category": "SVX", "S": tree.words[subject], "V": phrase, "N": negative}
-                if objects:
-                    for object in objects:
-                        n_tuple["O"] = tree.words[object]
-                        yield n_tuple
-                else:
-                    yield n_tuple
-        elif tree.dependent_relation(index, child) == "oprd" and tree.words[child].pos.startswith("NN"):
-            subjects = tree.get_subjects(index)
-            objects = [child] + tree.get_conjunction(child)
-            for subject in subjects:
-                n_tuple = {"category": "SVX", "S": tree.words[subject], "V": tree.words[index], "N": negative}
-                for object in objects:
-                    n_tuple["O"] = tree.words[object]
-                    yield n_tuple
+# the extractions of `openie`, except for the spaCy relations of SVc and SVX
+EXTRACTIONS = dict(OPENIE_EXTRACTIONS)
+EXTRACTIONS[SCLF.SVc] = matched(match_SVc)
+EXTRACTIONS[SCLF.SVX] = matched(lambda matcher, index, processed: match_SVX(matcher, index, processed, OPRD_CODE))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ParseCache():
+    """
+    A two-tier cache of parsing results: an in-process LRU in front of an optional SQLite store.
+    Entries are keyed by the parser backend, the annotator properties and the exact sentence, so
+    a re-run over an unchanged corpus is answered from the cache. A read doesn't write: the access
+    times of the disk hits, which order the eviction from disk, are kept until the next commit.
+    """
+    def __init__(self, path=None, memory_size=10000, disk_size=1000000, commit_every=100, timeout=60.0):
+        """
+        :param path: the SQLite file, None for a memory only cache
+        :param memory_size: the maximum number of entries kept in memory
+        :param disk_size: the maximum number of entries kept on disk
+        :param commit_every: the number of writes committed together, the rest is committed by
+                             `commit` or `close`
+        :param timeout: the seconds a write waits for the other processes writing to the SQLite file
+        """
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.lock = threading.RLock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = path
+        self.connection = None
+        self.disk_count = 0
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.accessed = {}  # key -> the time of its last disk hit, not written yet
+        self.timeout = timeout
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS parses (key TEXT PRIMARY KEY, value BLOB, accessed REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS parses_accessed ON parses (accessed)")
+            self.connection.commit()
+            self.disk_count = self.connection.execute("SELECT COUNT(*) FROM parses").fetchone()[0]
+
+    @staticmethod
+    def make_key(backend, properties, sentence):
+        raw = json.dumps([backend, properties, sentence], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        :return: the cached parsing result, None if the key is not cached
+        """
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return pickle.loads(value)  # a fresh copy, callers may modify the result
+            if self.connection is not None:
+                row = self.connection.execute("SELECT value FROM parses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.accessed[key] = time.time()
+                    if len(self.accessed) >= self.memory_size:  # bounding the buffer on a read only run
+                        self.commit()
+                    self.disk_hits += 1
+                    self._put_memory(key, row[0])
+                    return pickle.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self._put_memory(key, value)
+            if self.connection is not None:
+                exists = self.connection.execute("SELECT 1 FROM parses WHERE key = ?", (key,)).fetchone()
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO parses (key, value, accessed) VALUES (?, ?, ?)", (key, value, time.time()))
+                if exists is None:
+                    self.disk_count += 1
+                if self.disk_count > self.disk_size:
+                    self._evict_disk()
+                self._written()
+
+    def _written(self):
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """
+        Committing the pending writes, eg. before forking so that the children can write.
+        """
+        with self.lock:
+            if self.connection is not None:
+                self._write_accessed()
+                if self.uncommitted:
+                    self.connection.commit()
+            self.uncommitted = 0
+
+    def _write_accessed(self):
+        if self.accessed:
+            self.connection.executemany("UPDATE parses SET accessed = ? WHERE key = ?",
+                                        [(accessed, key) for key, accessed in self.accessed.items()])
+            self.accessed = {}
+            self.uncommitted += 1
+
+    def _put_memory(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # dropping the least recently used tenth so that eviction doesn't happen on every insertion
+        n = self.disk_count - self.disk_size + self.disk_size // 10
+        self._write_accessed()
+        self.connection.execute(
+            "DELETE FROM parses WHERE key IN (SELECT key FROM parses ORDER BY accessed LIMIT ?)", (n,))
+        self.disk_count = self.connection.execute("SELECT COUNT(*) FROM parses").fetchone()[0]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_entries": self.disk_count,
+            }
+
+    def share(self):
+        """
+        Preparing the SQLite file for the processes forked next to write to it, see `reopen`: the
+        pending writes are committed and the file is switched to write-ahead logging, so that
+        reading doesn't block the writer.
+        """
+        with self.lock:
+            self.commit()
+            if self.connection is not None:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        """
+        Opening a connection of its own in a forked process, a SQLite connection can't be shared
+        with the parent. The entries in memory are kept. Every write is committed at once, so that
+        a process holds the write lock of the file (see `share`) only while writing.
+        """
+        self.lock = threading.RLock()
+        self.uncommitted = 0  # the writes of the parent are its own to commit
+        self.accessed = {}
+        self.commit_every = 1
+        if self.path is not None:
+            self.connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self._write_accessed()
+                self.connection.commit()
+                self.connection.close()
+                self.connection = None
+                self.uncommitted = 0
@@ -1,69 +1,115 @@
-from evaluate import load, merge_documents
+from evaluate import load, iter_documents, merge_documents
 from tuple_extraction import extract_from_raw_sentence, extract_tuples_with_lexical_simplification
 from tuple_extraction import extract_tuples
 from graph import annotate_documents, annotate_graph, join_optimize
-from tuple_extraction import process_document
-from sentence_decomposition import lexical_simplification_first
-import time
-from collections import defaultdict
-from tuple_extraction import restructurer
-import pickle
-
-
-def extract_tuples_from_raw_sentence(source_path, save_path):
-    documents = load(source_path)
-    documents_ = []
-    with open(save_path, "w", encoding="utf-8") as fo:
-        for document in documents:
-            doc = [sent for sent, _ in document]
-            sentence_tuples = defaultdict(list)
-            for tuple_ in process_document(doc, False):
-                sentence_tuples[tuple_.predicate.sentence].append(tuple_)
-            document_ = []
-            for sent in doc:
-                tuples = sentence_tuples.get(sent)
-                if tuples is None:
-                    tuples = []
-                document_.append((sent, tuples))
-            documents_.append(document_)
-        with open(save_path, "wb") as fo:
-            pickle.dump(documents_, fo)
-
-
-def extract_tuples_with_simplification(source_path, save_path):
-    documents = load(source_path)
-    documents_ = []
-    with open(save_path, "w", encoding="utf-8") as fo:
-        for document in documents:
-            doc = [sent for sent, _ in document]
-            sentence_tuples = defaultdict(list)
-            for tuple_ in process_document(doc, True):
-                sentence_tuples[tuple_.predicate.sentence].append(tuple_)
-            document_ = []
-            for sent in doc:
-                tuples = sentence_tuples.get(sent)
-                if tuples is None:
-                    tuples = []
-                document_.append((sent, tuples))
-            documents_.append(document_)
-        with open(save_path, "wb") as fo:
-            pickle.dump(documents_, fo)
-
-
-def annotate_documents_(source_path, save_path):
-    documents = load(source_path)
-    annotate_documents(documents, save_path)
+from tuple_extraction import process_document, extract_documents, extract_from_raw_documents
+from collections import Counter, defaultdict
+from itertools import islice, tee
+from datastructure import SentenceBuilder
+from parse_cache import ParseCache
+from stream_util import Checkpoint, file_fingerprint, make_fingerprint
+
+
+def enable_parse_cache(path):
+    """
+    Caching the parsing results of all sentence builders in the given SQLite file,
+    a re-run over an unchanged corpus then hardly parses anything.
+    """
+    SentenceBuilder.use_parse_cache(ParseCache(path))
+
+
+def extract_document_tuples(documents, simplification, concurrency=1, workers=1, batch_size=64, n_process=1,
+                            stats=None):
+    """
+    The tuples of each document, the documents are read lazily.
+
+    :param documents: an iterable of documents, each a list of raw sentences
+    :param concurrency: the number of sentences extracted at the same time in a process
+    :param workers: the number of processes extracting documents, see `tuple_extraction.extract_documents`
+    :param batch_size: the number of sentences tokenized and parsed together without simplification
+    :param n_process: the number of processes tokenizing with nlp.pipe without simplification, in
+                      a single worker at concurrency 1
+    :param stats: a Counter the projection counts are added to, see `tuple_extraction.process_document`
+    """
+    if workers > 1:
+        return extract_documents(documents, simplification, workers, stats)
+    if not simplification and concurrency <= 1:
+        return extract_from_raw_documents(documents, batch_size, n_process)
+    return (list(process_document(document, simplification, concurrency, stats)) for document in documents)
+
+
+def group_tuples(document, tuples):
+    """
+    :return: the sentences of the document, each with the tuples extracted from it
+    """
+    sentence_tuples = defaultdict(list)
+    for tuple_ in tuples:
+        sentence_tuples[tuple_.predicate.sentence].append(tuple_)
+    return [(sent, sentence_tuples.get(sent, [])) for sent in document]
+
+
+def extract_to_file(source_path, save_path, simplification, parse_cache_path=None, concurrency=1, workers=1,
+                    resume=True, batch_size=64, n_process=1, projecting=False, graph_class=None):
+    """
+    Extracting tuples from the documents of the source file, a document at a time. The tuples of
+    each document are appended to the save file as soon as they are extracted, read them with
+    `stream_util.iter_records` or `stream_util.load_records`.
+
+    :param resume: continuing an interrupted run from its checkpoint, see `stream_util.Checkpoint`. A
+                   checkpoint of another source file or other options is refused.
+    :param projecting: projecting the trees of the clauses left after deleting subtrees instead of
+                       reparsing them, see `SentenceBuilder.rebuild` (only the simplification deletes
+                       subtrees)
+    :param graph_class: the graph engine of the syntax trees, eg. `array_graph.ArrayGraph`, see
+                        `SentenceBuilder.use_graph_class`
+    :return: the number of documents in the save file, with the number of the trees of this run that
+             were projected ("projected") and reparsed ("reparsed")
+    """
+    if parse_cache_path is not None:
+        enable_parse_cache(parse_cache_path)
+    SentenceBuilder.use_projection(projecting)
+    SentenceBuilder.use_graph_class(graph_class)
+    fingerprint = make_fingerprint(file_fingerprint(source_path), simplification, projecting)
+    with Checkpoint(save_path, fingerprint) as checkpoint:
+        done = checkpoint.open(resume)
+        documents = islice(iter_documents(source_path), done, None)
+        # the sentences are kept until the tuples of their document come back, as many documents as
+        # the extraction reads ahead (see the window of `tuple_extraction.extract_documents`)
+        documents, sentences = tee([sent for sent, _ in document] for document in documents)
+        stats = Counter()
+        results = extract_document_tuples(documents, simplification, concurrency, workers, batch_size, n_process,
+                                          stats)
+        for document, tuples in zip(sentences, results):
+            checkpoint.append(group_tuples(document, tuples))
+        checkpoint.finish()
+        done = checkpoint.done
+    if SentenceBuilder.parse_cache is not None:
+        SentenceBuilder.parse_cache.commit()
+    return {"documents": done, "projected": stats["projected"], "reparsed": stats["reparsed"]}
+
+
+def extract_tuples_from_raw_sentence(source_path, save_path, parse_cache_path=None, concurrency=1, workers=1,
+                                     resume=True, batch_size=64, n_process=1, graph_class=None):
+    return extract_to_file(source_path, save_path, False, parse_cache_path, concurrency, workers, resume,
+                           batch_size, n_process, graph_class=graph_class)
+
+
+def extract_tuples_with_simplification(source_path, save_path, parse_cache_path=None, concurrency=1, workers=1,
+                                       resume=True, projecting=False, graph_class=None):
+    return extract_to_file(source_path, save_path, True, parse_cache_path, concurrency, workers, resume,
+                           projecting=projecting, graph_class=graph_class)
+
+
+def annotate_documents_(source_path, save_path, resume=True):
+    annotate_documents(iter_documents(source_path), save_path, resume, make_fingerprint(file_fingerprint(source_path)))
 
 
 if __name__ == "__main__":
     extract_tuples_from_raw_sentence("data/extraction_raw.txt", "data/tuples_spacy_raw.pkl")
     # extract_tuples_with_simplification("data/wiki_sentences_extraction.txt", "data/tuples_lexical.pkl")
 
-    # with open("data/tuples_raw.pkl", "rb") as fi:
-    #     documents1 = pickle.load(fi)
-    #
-    # with open("data/tuples_lexical.pkl", "rb") as fi:
-    #     documents2 = pickle.load(fi)
+    # documents1 = load_records("data/tuples_raw.pkl")
+    # documents2 = load_records("data/tuples_lexical.pkl")
     #
     # documents = merge_documents(documents1, documents2)
     # annotate_graph(documents, "data/annotated_docs.txt", "data/graph.pkl", semantic_graph=True)
@@ -1,5 +1,5 @@
-from corenlp_util import is_copula
-from clause_classification import ClauseClassifier
+from clause_classification import ClauseClassifier, FEATURES
+from decision_table import DecisionTable
 
 SV = "SV"
 SP = "SP"
@@ -37,51 +37,26 @@ AUX = "aux"
 CONJ = "conj"
 OPRD = "oprd"
 
+# (incoming relations, features, clause type), see `clause_classification.RULES`
+RULES = [
+    ([AUX, AUXPASS], ["copula"], None),
+    (None, ["copula", "subject", "has_ccomp"], SVcC),
+    (None, ["copula", "subject", "has_xcomp"], SVcX),
+    (None, ["copula", "has_attr", "has_expl"], SVb),   # there be
+    (None, ["subject", "has_attr"], SVc),
+    (None, ["subject", "has_dobj", "has_iobj"], SVOO),
+    (None, ["subject", "has_dobj", "has_oprd"], SVOC),
+    (None, ["subject", "has_dobj"], SVO),
+    ([CONJ], ["shares_objects"], SVO),   # sharing the objects of the first conjunct
+    (None, ["!subject"], None),
+    (None, ["has_xcomp"], SVX),
+    (None, ["has_ccomp"], SVC),
+    (None, ["has_oprd"], SVX),
+    (None, [], SV),
+]
+
+TABLE = DecisionTable(RULES, FEATURES)
 
-class SpacyClauseClassifier(ClauseClassifier):
-    def classify_clause(self, tree, index):
-        in_relation = tree.in_coming_relation(index)
-        if is_copula(tree.words[index].word):
-            if AUX == in_relation or AUXPASS == in_relation:
-                return None
-            out_relations = tree.out_going_relations(index)
-            if tree.get_subjects(index) and CCOMP in out_relations:
-                return SVcC
-            if tree.get_subjects(index) and XCOMP in out_relations:
-                return SVcX
-            if ATTR in out_relations and EXPL in out_relations:   # there be
-                return SVb
-
-        out_relations = tree.out_going_relations(index)
-        conj = None
-        conj_objects = None
-        in_relation = tree.in_coming_relation(index)
-        if in_relation == CONJ:
-            conj = tree.parents[index]
-            conj_objects = tree.get_objects(conj)
-
-        if tree.get_subjects(index) and ATTR in out_relations:
-            return SVc
-
-        if tree.get_subjects(index) and DOBJ in out_relations and IOBJ in out_relations:
-            return SVOO
-
-        if tree.get_subjects(index) and DOBJ in out_relations and OPRD in out_relations:
-            return SVOC
 
-        if tree.get_subjects(index) and DOBJ in out_relations:
-            return SVO
-        elif conj and conj_objects and min(conj_objects) > index:
-            return SVO
-
-        if tree.get_subjects(index) and DOBJ not in out_relations and XCOMP in out_relations:  #
-            return SVX
-
-        if tree.get_subjects(index) and DOBJ not in out_relations and CCOMP in out_relations:  #
-            return SVC
-
-        if OPRD in out_relations and tree.get_subjects(index):
-            return SVX
-
-        if DOBJ not in out_relations and tree.get_subjects(index):
-            return SV
+class SpacyClauseClassifier(ClauseClassifier):
+    table = TABLE
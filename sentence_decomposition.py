@@ -52,8 +52,7 @@ class CorenlpDecomposer():
                 # removing conjunction and punctuation
                 for i in range(parent+1, end):
                     if tree.in_coming_relation(i) in ["cc", "punct"]:
-                        del tree.words[i]
-                        del tree.parents[i]
+                        tree.remove_word(i)
         clauses.append([item[1] for item in sorted(tree.words.items(), key=itemgetter(0))])
         return clauses
 
@@ -68,7 +67,7 @@ class CorenlpDecomposer():
             return has_subject
         subtree_ = tree.get_subtree(tree.parents[idx], exclusion=["conj", "cc", "punct"])
         for node in sorted(subtree_):
-            if node > idx and node not in subtree:
+            if node > idx and not tree.is_descendant(node, idx):
                 clause.append(tree.words[node])
         return has_subject
 
@@ -107,21 +106,48 @@ class CorenlpDecomposer():
         :param restructurer:
         :return:
         """
-        original_tokens, tokens, chunks = extract_noun_chunks(sentence)
-        tokens = [Token(token[0], None, i, token[1]) for i, token in enumerate(tokens)]
-        sentence = self.builder.from_un_parsed_tokens(tokens, False)
-        # print(" ".join([token.word for token in sentence.tree.words.values()]))
-        restructurer.extract_appositive(sentence)
-        nmods = sentence.tree.get_noun_nmods()
-        sentence = self.reparse(sentence, False)
-        adverbials = sentence.tree.get_extra_adverbial()
-        sentence = self.reparse(sentence, False)
-        restructurer.restructure(sentence)
-        clauses = []
-        for sub_sent in sentence.iter_subsentence():
-            for clause in self.decompose_compound(sub_sent):
-                clauses.append(clause)
-        return original_tokens, chunks, nmods, adverbials, clauses
+        return self.lexical_simplification_first_batch([sentence], restructurer)[0]
+
+    def lexical_simplification_first_batch(self, sentences, restructurer):
+        """
+        The batched version of `lexical_simplification_first`. Every step parses the sentences of
+        the document together: the sentences, the appositives with the first reparse, the second
+        reparse and then the clauses of each level of the restructuring.
+
+        :param sentences: raw sentences
+        :param restructurer:
+        :return: the result of `lexical_simplification_first` for each sentence
+        """
+        prepared = []
+        pending = []
+        for sentence in sentences:
+            original_tokens, tokens, chunks = extract_noun_chunks(sentence)
+            tokens = [Token(token[0], None, i, token[1]) for i, token in enumerate(tokens)]
+            prepared.append((original_tokens, chunks))
+            pending.append(self.builder.defer(tokens, False))
+        self.builder.flush(pending)
+
+        nmods = []
+        for sentence in pending:
+            restructurer.detach_appositives(sentence)
+            nmods.append(sentence.tree.get_noun_nmods())
+        appositives = [sent for sentence in pending for _, sent in sentence.left]
+        pending = [self.defer_reparse(sentence, False) for sentence in pending]
+        self.builder.flush(appositives + pending)
+
+        adverbials = [sentence.tree.get_extra_adverbial() for sentence in pending]
+        pending = [self.defer_reparse(sentence, False) for sentence in pending]
+        self.builder.flush(pending)
+
+        restructurer.restructure_all(pending)
+        results = []
+        for (original_tokens, chunks), nmods_, adverbials_, sentence in zip(prepared, nmods, adverbials, pending):
+            clauses = []
+            for sub_sent in sentence.iter_subsentence():
+                for clause in self.decompose_compound(sub_sent):
+                    clauses.append(clause)
+            results.append((original_tokens, chunks, nmods_, adverbials_, clauses))
+        return results
 
     def compound_first(self, sentence, restructurer):
         tokens = tokenize(sentence)
@@ -134,12 +160,21 @@ class CorenlpDecomposer():
                 for clause in self.appositive_first(sent, restructurer):
                     yield clause
 
+    def defer_reparse(self, sentence, merging_nouns=False):
+        """
+        `reparse` with the parsing postponed until the builder's `flush`.
+        """
+        left = sentence.left
+        right = sentence.right
+        sentence = self.builder.defer_rebuild(sentence.tree, merging_nouns)
+        sentence.left = left
+        sentence.right = right
+        return sentence
+
     def reparse(self, sentence, merging_nouns=False, printing=False):
         left = sentence.left
         right = sentence.right
-        sentence = self.builder.from_un_parsed_tokens(
-            [item[1] for item in sorted(sentence.tree.words.items(), key=itemgetter(0))], merging_nouns, printing=printing
-        )
+        sentence = self.builder.rebuild(sentence.tree, merging_nouns, printing=printing)
         sentence.left = left
         sentence.right = right
         return sentence
@@ -184,8 +219,7 @@ class SpacyDecomposer(CorenlpDecomposer):
                 # removing conjunction and punctuation
                 for i in range(parent+1, end):
                     if tree.in_coming_relation(i) in ["cc", "punct"]:
-                        del tree.words[i]
-                        del tree.parents[i]
+                        tree.remove_word(i)
         clauses.append([item[1] for item in sorted(tree.words.items(), key=itemgetter(0))])
         return clauses
 
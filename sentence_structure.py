@@ -7,6 +7,7 @@ from spacy_util import stem
 LEFT2RIGHT_PARSE_ONCE = "left to right; parse once"
 LEFT2RIGHT_PARSE_MULTIPLE = "left to righ; parse multiple"
 APPOSITION_FIRST = "apposition first"
+MAX_CLAUSE_DEPTH = 100  # clauses nested deeper come from a malformed tree
 
 
 class ClauseMessage():
@@ -33,6 +34,29 @@ class SentenceRestructurer():
             self.apposition_first(sentence)
 
     def left2right_parse_once(self, sentence):
+        self.restructure_all([sentence])
+
+    def restructure_all(self, sentences):
+        """
+        Restructuring several sentences left to right, parsing once. The sentences and then their
+        clauses are restructured a level at a time, the clauses of a level (of all the sentences)
+        are parsed in one request.
+        """
+        level = list(sentences)
+        depth = 0
+        while level:
+            depth += 1
+            if depth > MAX_CLAUSE_DEPTH:
+                raise RecursionError("Clauses nested deeper than %d levels." % MAX_CLAUSE_DEPTH)
+            for sentence in level:
+                self.detach_clauses(sentence)
+            level = [sent for sentence in level for _, sent in sentence.left + sentence.right]
+            self.sentence_builder.flush(level)
+
+    def detach_clauses(self, sentence):
+        """
+        Moving the clauses of the sentence to its left and right, their parsing is deferred.
+        """
         tree = sentence.tree
         nodes = self.clause_detector.get_potential_point(sentence)
         for node in nodes:
@@ -41,12 +65,6 @@ class SentenceRestructurer():
                 if clause_type != clause_detection.CORE:
                     self.process_clause(sentence, node, clause_type)
                     sentence.clause = " ".join([item[1].word for item in sorted(tree.words.items(), key=itemgetter(0))])
-        if sentence.left:
-            for _, sent in sentence.left:
-                self.restructure(sent)
-        if sentence.right:
-            for _, sent in sentence.right:
-                self.restructure(sent)
 
     def left2right_parse_multiple(self, sentence):
         tree = sentence.tree
@@ -60,9 +78,10 @@ class SentenceRestructurer():
                     self.process_clause(sentence, node, clause_type)
                     processed = True
                     break
+        self.flush(sentence)
         if processed and len(tree.words) != token_num:
             # re-parse the sentence
-            sent = self.sentence_builder.from_un_parsed_tokens([item[1] for item in sorted(tree.words.items(), key=itemgetter(0))])
+            sent = self.sentence_builder.rebuild(tree)
             sentence.clause = sent.clause
             sentence.tree = sent.tree
             # recursive call
@@ -81,8 +100,7 @@ class SentenceRestructurer():
         self.extract_appositive(sentence)
         if len(tree.words) != token_num:
             # re-parse the sentence
-            sent = self.sentence_builder.from_un_parsed_tokens(
-                [item[1] for item in sorted(tree.words.items(), key=itemgetter(0))])
+            sent = self.sentence_builder.rebuild(tree)
             sentence.clause = sent.raw_sentence
             sentence.tree = sent.tree
             self.apposition_first(sentence)
@@ -90,6 +108,13 @@ class SentenceRestructurer():
             self.left2right_parse_once(sentence)
 
     def extract_appositive(self, sentence):
+        self.detach_appositives(sentence)
+        self.flush(sentence)
+
+    def detach_appositives(self, sentence):
+        """
+        Moving the appositives of the sentence to its left as clauses, their parsing is deferred.
+        """
         tree = sentence.tree
         idxes = sorted([idx for idx in tree.words.keys()], reverse=True)
         for idx in idxes:
@@ -103,11 +128,17 @@ class SentenceRestructurer():
                     subtree, clause = self.extract_appositive_clause(tree, idx)
                 else:
                     subtree, clause = self.extract_appositive_clause(tree, idx, False)
-                sent = self.sentence_builder.from_un_parsed_tokens(clause)
+                sent = self.sentence_builder.defer(clause)
                 message = ClauseMessage(clause_detection.APPOS, None, None)
                 sentence.left.append((message, sent))
                 tree.delete_subtree(subtree)
 
+    def flush(self, sentence):
+        """
+        Parsing the clauses extracted from the sentence in one request.
+        """
+        self.sentence_builder.flush([sent for _, sent in sentence.left + sentence.right])
+
     def extract_appositive_clause(self, tree, idx, normal=True):
         subtree = sorted(tree.get_subtree(idx))
         clause = [tree.words[node] for node in subtree]
@@ -166,7 +197,7 @@ class SentenceRestructurer():
         for i, token in enumerate(conjunction):
             clause.insert(i, token)
         clause.insert(len(conjunction), Token("be", "VBZ", -1, -1))
-        sent = self.sentence_builder.from_un_parsed_tokens(clause)
+        sent = self.sentence_builder.defer(clause)
         message = ClauseMessage(clause_detection.ADVCL, None, None)
         sentence.left.append((message, sent))
         tree.delete_subtree(subtree)
@@ -184,7 +215,7 @@ class SentenceRestructurer():
             del clause[0]
             mark = "that"
         message = ClauseMessage(clause_detection.OBJCL, mark, tree.words[parent])
-        sent = self.sentence_builder.from_un_parsed_tokens(clause)
+        sent = self.sentence_builder.defer(clause)
         sentence.right.append((message, sent))
         tree.delete_subtree(subtree)
 
@@ -209,7 +240,7 @@ class SentenceRestructurer():
             mark = clause[0].word
         if len(clause) != len(tree.words):  # to avoid bad case like "Rolling created"
             message = ClauseMessage(clause_detection.ACL, mark, tree.words[parent])
-            sent = self.sentence_builder.from_un_parsed_tokens(clause)
+            sent = self.sentence_builder.defer(clause)
             sentence.right.append((message, sent))
             tree.delete_subtree(subtree)
 
@@ -220,7 +251,7 @@ class SentenceRestructurer():
         clause = [tree.words[node] for node in subtree]
         mark = clause[0].word
         message = ClauseMessage(clause_detection.ADVCL, mark, tree.words[parent])
-        sent = self.sentence_builder.from_un_parsed_tokens(clause)
+        sent = self.sentence_builder.defer(clause)
         sentence.left.append((message, sent))
         tree.delete_subtree(subtree, True)
 
@@ -266,7 +297,7 @@ class SentenceRestructurer():
                 for i, token in enumerate(subjects):
                     clause.insert(i, token)
 
-        sent = self.sentence_builder.from_un_parsed_tokens(clause)
+        sent = self.sentence_builder.defer(clause)
         message = ClauseMessage(clause_detection.ADVCL, mark, tree.words[parent])
         sentence.left.append((message, sent))
         tree.delete_subtree(subtree)
@@ -291,7 +322,7 @@ class SentenceRestructurer():
             tree.words[idx].word = stem(tree.words[idx].word)
         else:
             clause.insert(len(conjunction), Token("be", "VBZ", -1, -1))
-        sent = self.sentence_builder.from_un_parsed_tokens(clause)
+        sent = self.sentence_builder.defer(clause)
         message = ClauseMessage(clause_detection.ACL, None, None)
         sentence.left.append((message, sent))
         tree.delete_subtree(subtree)
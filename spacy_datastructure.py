@@ -1,27 +1,32 @@
-from datastructure import SyntaxTree, SentenceBuilder
+from datastructure import SyntaxTree, SentenceBuilder, CONJ_CODE, TRIM
 import corenlp_util
 import spacy_util
 from collections import defaultdict
+from vocab import relations, tags
+
+PREP_CODE = relations.code("prep")
+VBG_CODE = tags.code("VBG")
+TRIMMED_CODES = relations.code_set(["acl", "advcl", "acl:relcl", "relcl"])  # the clauses cut off by `trim_subtree`
 
 
 class SpacySynaxTree(SyntaxTree):
     """
     SyntaxTree for corenlp parser
     """
-    def __init__(self, tokens, dependencies):
-        super().__init__(tokens, dependencies)
+    def __init__(self, tokens, dependencies, graph_class=None):
+        super().__init__(tokens, dependencies, graph_class)
 
-    def get_conjunction(self, index):
+    def find_conjunction(self, index):
         conjunctions = []
         for child in self.children(index):
-            if self.dependent_relation(index, child) == "conj":
+            if self.dependent_code(index, child) == CONJ_CODE:
                 conjunctions.append(child)
                 break
         if len(conjunctions) == 1:
             index = conjunctions[0]
             while index:
                 for child in self.children(index):
-                    if self.dependent_relation(index, child) == "conj":
+                    if self.dependent_code(index, child) == CONJ_CODE:
                         conjunctions.append(child)
                         index = child
                         break
@@ -83,33 +88,14 @@ class SpacySynaxTree(SyntaxTree):
             adverbial.append(subtree)
         return adverbial
 
-    def trim_subtree(self, subtree):
-        i = 0
-        n = len(subtree)
-        while i < n:
-            node = subtree[i]
-            if self.in_coming_relation(node) == "prep":
-                if self.words[node].pos == "VBG":
-                    subtree = self.trim_at(subtree, node)
-                    i = 0
-                    n = len(subtree)
-                else:
-                    i += 1
-            elif self.in_coming_relation(node) in ["acl", "advcl", "acl:relcl", "relcl"]:
-                subtree = self.trim_at(subtree, node)
-                i = 0
-                n = len(subtree)
-            else:
-                i += 1
-        return subtree
-
-    def trim_at(self, subtree, node):
-        subtree = [node for node in subtree]  # copy
-        subtree_ = self.get_subtree(node)
-        for node_ in subtree_:
-            if node_ in subtree:
-                subtree.remove(node_)
-        return subtree
+    def trim_point(self, node):
+        code = self.in_coming_code(node)
+        if code == PREP_CODE:
+            if self.words[node].pos_code == VBG_CODE:
+                return TRIM
+        elif code in TRIMMED_CODES:
+            return TRIM
+        return None
 
     def get_extra_adverbial(self):
         adverbials = defaultdict(list)
@@ -154,13 +140,28 @@ class SpacySynaxTree(SyntaxTree):
 
 
 class SpacySentenceBuilder(SentenceBuilder):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, batch_size=64, n_process=1, graph_class=None):
+        """
+        :param batch_size: the number of texts buffered by nlp.pipe when parsing several sentences
+        :param n_process: the number of processes used by nlp.pipe
+        :param graph_class: see `SentenceBuilder`
+        """
+        super().__init__(graph_class)
+        self.batch_size = batch_size
+        self.n_process = n_process
         self.syntaxtree_class = SpacySynaxTree
+        self.backend = "spacy"
+        self.parse_properties = {"model": spacy_util.MODEL_NAME}
 
     def parse(self, sentence):
         return spacy_util.parse(sentence)
 
+    def parse_batch(self, sentences):
+        results = spacy_util.pipe_parse(sentences, self.batch_size, self.n_process)
+        # an empty sentence has no parsing result of its own
+        return [result[0] if result else {"words": [], "pos_tags": [], "dependencies": [], "nes": {}}
+                for result in results]
+
     def chunk_nouns(self, sentence):
         return spacy_util.chunk_nouns(sentence)
 
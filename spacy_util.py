@@ -1,8 +1,6 @@
-import spacy
-from spacy.tokens import Doc
-from collections import defaultdict
-from spacy.lemmatizer import Lemmatizer
-from spacy.lang.en import LEMMA_INDEX, LEMMA_EXC, LEMMA_RULES
+from collections import OrderedDict
+import threading
+from lemma_util import verb_lemmatizer
 
 
 class WhitespaceTokenizer(object):
@@ -13,25 +11,148 @@ class WhitespaceTokenizer(object):
         self.vocab = vocab
 
     def __call__(self, text):
+        from spacy.tokens import Doc
         words = text.split(' ')
         # All tokens 'own' a subsequent space character in this tokenizer
         spaces = [True] * len(words)
         return Doc(self.vocab, words=words, spaces=spaces)
 
 
-nlp = spacy.load('en_core_web_sm')
-# nlp.tokenizer = WhitespaceTokenizer(nlp.vocab)  # hook custom tokenizer
+MODEL_NAME = "en_core_web_sm"
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    the spacy pipeline, the model is loaded on first use
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                _nlp = spacy.load(MODEL_NAME)
+                # _nlp.tokenizer = WhitespaceTokenizer(_nlp.vocab)  # hook custom tokenizer
+    return _nlp
+
+
+class SpacyAnalysis():
+    """
+    The analysis of a text. The spacy pipeline runs once and tokens, noun chunks, dependencies
+    and named entities are all read from the same Doc.
+    """
+    def __init__(self, doc):
+        self.doc = doc
+
+    def tokens(self):
+        return [token.text for token in self.doc]
+
+    def split_sentence(self):
+        return [" ".join([token.text for token in sent]) for sent in self.doc.sents]
+
+    def noun_chunks(self):
+        return [[item.i+1 for item in ck] for ck in self.doc.noun_chunks]
+
+    def parse(self):
+        result = []
+        for sent in self.doc.sents:
+            start = sent.start
+            words = [token.text for token in sent]
+            pos_tags = [token.tag_ for token in sent]
+            nes = {ent.text: ent.label_ for ent in sent.ents}
+            dependencies = []
+            for i, token in enumerate(sent):
+                if token.dep_ == "dative":
+                    dependencies.append((token.head.i-start+1, i+1, "iobj"))
+                else:
+                    dependencies.append((token.head.i-start+1, i+1, token.dep_))
+            result.append({"words": words, "pos_tags": pos_tags, "dependencies": dependencies, "nes": nes})
+        return result
+
+    def extract_noun_chunks(self):
+        chunks = []
+        tokens = [token for token in self.doc]
+        covered = set()
+        heads = set()
+        for ck in self.doc.noun_chunks:
+            span = [item.i + 1 for item in ck]
+            if len(span) > 1:
+                covered.update(span)
+                for item in span:
+                    if tokens[item-1].head.i + 1 not in span:
+                        chunks.append((item, span))
+                        heads.add(item)
+                        break
+        tokens_ = []
+        for token in tokens:
+            idx = token.i + 1
+            if idx in covered and idx not in heads and token.dep_ not in ["det", "poss"]:
+                continue
+            tokens_.append(token)
+        tokens = [token.text for token in tokens]
+        kept_tokens = [(token.text, token.i) for token in tokens_]
+        return tokens, kept_tokens, chunks
+
+
+ANALYSIS_CACHE_SIZE = 256
+_analyses = OrderedDict()
+_analyses_lock = threading.Lock()
+_pipeline_lock = threading.Lock()
+
+
+def analyze(text):
+    """
+    Analyzing the text with spacy, the analyses of recently seen texts are reused. They are keyed
+    by the exact text only: the space-joined tokens of a text may be analyzed differently from it.
+
+    :return: a SpacyAnalysis
+    """
+    with _analyses_lock:
+        analysis = _analyses.get(text)
+        if analysis is not None:
+            _analyses.move_to_end(text)
+            return analysis
+    nlp = get_nlp()
+    with _pipeline_lock:  # the pipeline is not safe to call from several threads at once
+        doc = nlp(text)
+    analysis = SpacyAnalysis(doc)
+    remember(text, analysis)
+    return analysis
+
+
+def remember(text, analysis):
+    with _analyses_lock:
+        _analyses[text] = analysis
+        _analyses.move_to_end(text)
+        while len(_analyses) > ANALYSIS_CACHE_SIZE:
+            _analyses.popitem(last=False)
+
+
+def analyze_texts(texts, batch_size=64, n_process=1):
+    """
+    Analyzing many texts with nlp.pipe.
+
+    :param texts: an iterable of texts
+    :param batch_size: the number of texts buffered by spacy
+    :param n_process: the number of processes, -1 for all cores
+
+    :return: a generator of SpacyAnalysis, in the order of the input texts
+    """
+    pairs = ((text, text) for text in texts)
+    for doc, text in get_nlp().pipe(pairs, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        analysis = SpacyAnalysis(doc)
+        remember(text, analysis)
+        yield analysis
 
 
 def tokenize(sentence):
-    sent = nlp(sentence)
-    return [token.text for token in sent]
+    return analyze(sentence).tokens()
 
 
 def split_sentence(text):
-    doc = nlp(text)
-    sentences = [" ".join([token.text for token in sent]) for sent in doc.sents]
-    return sentences
+    return analyze(text).split_sentence()
 
 
 def parse(text):
@@ -42,60 +163,40 @@ def parse(text):
 
     :return:
     """
-    result = []
-    doc = nlp(text)
-    for sent in doc.sents:
-        words = [token.text for token in sent]
-        pos_tags = [token.tag_ for token in sent]
-        nes = {}
-        for ent in doc.ents:
-            nes[ent.text] = ent.label_
-        dependencies = []
-        for i, token in enumerate(sent):
-            if token.dep_ == "dative":
-                dependencies.append((token.head.i+1, i+1, "iobj"))
-            else:
-                dependencies.append((token.head.i+1, i+1, token.dep_))
-        result.append({"words": words, "pos_tags": pos_tags, "dependencies": dependencies, "nes": nes})
-    return result
+    return analyze(text).parse()
 
 
 def chunk_nouns(sentence):
-    sent = nlp(sentence)
-    for ck in sent.noun_chunks:
-        yield [item.i+1 for item in ck]
+    for chunk in analyze(sentence).noun_chunks():
+        yield chunk
 
 
 def extract_noun_chunks(sentence):
-    sent = nlp(sentence)
-    chunks = []
-    tokens = [token for token in sent]
-    covered = []
-    heads = []
-    for ck in sent.noun_chunks:
-        span = [item.i + 1 for item in ck]
-        if len(span) > 1:
-            covered.extend(span)
-            for item in span:
-                if tokens[item-1].head.i + 1 not in span:
-                    chunks.append((item, span))
-                    heads.append(item)
-                    break
-    tokens_ = []
-    for token in tokens:
-        idx = token.i + 1
-        if idx in covered and idx not in heads and token.dep_ not in ["det", "poss"]:
-            continue
-        tokens_.append(token)
-    tokens = [token.text for token in tokens]
-    kept_tokens = [(token.text, token.i) for token in tokens_]
-    return tokens, kept_tokens, chunks
+    return analyze(sentence).extract_noun_chunks()
+
+
+def pipe_tokenize(texts, batch_size=64, n_process=1):
+    for analysis in analyze_texts(texts, batch_size, n_process):
+        yield analysis.tokens()
+
+
+def pipe_split_sentence(texts, batch_size=64, n_process=1):
+    for analysis in analyze_texts(texts, batch_size, n_process):
+        yield analysis.split_sentence()
+
+
+def pipe_parse(texts, batch_size=64, n_process=1):
+    for analysis in analyze_texts(texts, batch_size, n_process):
+        yield analysis.parse()
+
+
+def pipe_chunk_nouns(texts, batch_size=64, n_process=1):
+    for analysis in analyze_texts(texts, batch_size, n_process):
+        yield analysis.noun_chunks()
 
 
 def stem(verb):
-    lemmatizer = Lemmatizer(LEMMA_INDEX, LEMMA_EXC, LEMMA_RULES)
-    lemma = lemmatizer(verb, 'VERB')
-    return lemma[0]
+    return verb_lemmatizer(verb)
 
 
 if __name__ == "__main__":
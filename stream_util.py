@@ -0,0 +1,163 @@
+"""
+Append-friendly result files: every record (eg. the tuples of a document) is pickled on its own
+right after it is produced, so a long run never holds all of its results, and the records are read
+back one at a time. `Checkpoint` makes such a file resumable.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+
+def append_record(fo, record):
+    """
+    :param fo: a file opened in binary write or append mode
+    """
+    pickle.dump(record, fo, protocol=pickle.HIGHEST_PROTOCOL)
+    fo.flush()
+
+
+def iter_records(path):
+    with open(path, "rb") as fi:
+        while True:
+            try:
+                yield pickle.load(fi)
+            except EOFError:
+                return
+
+
+def load_records(path):
+    return list(iter_records(path))
+
+
+def file_fingerprint(path):
+    """
+    the path, size and modification time of a file, enough to tell a checkpoint of another input
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def make_fingerprint(*parts):
+    """
+    :param parts: JSON values identifying a run, eg. `file_fingerprint` of its input and its options
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class Checkpoint():
+    """
+    Durable progress of a run appending a record per document to a file. Every `sync_every` records
+    (and on closing) the file is synced to disk, then the number of documents done and the size of
+    the file are appended to `<path>.ckpt` and synced as well. A run restarted after a crash
+    truncates the file back to the last checkpoint and skips the documents done, so the file ends up
+    the same as the interrupted run would have written.
+
+    The checkpoint records the fingerprint of the run (see `make_fingerprint`), and a run with
+    another fingerprint refuses to resume from it instead of appending to the records of other input.
+    """
+    def __init__(self, path, fingerprint=None, sync_every=20):
+        """
+        :param fingerprint: identifying the input and the options of the run
+        :param sync_every: the number of records synced to disk together
+        """
+        self.path = path
+        self.checkpoint_path = path + ".ckpt"
+        self.fingerprint = fingerprint
+        self.sync_every = sync_every
+        self.done = 0
+        self.state = None  # a JSON value saved with the checkpoint, eg. a counter the records depend on
+        self.offset = 0    # the end of the last complete record
+        self.unsynced = 0
+        self.fo = None
+        self.fc = None
+
+    def open(self, resume=True):
+        """
+        :param resume: continuing from the checkpoint if there is one, otherwise starting over
+        :return: the number of documents done
+        """
+        self.done = 0
+        self.state = None
+        self.unsynced = 0
+        offset = 0
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as fi:
+                for line in fi:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:  # the last line may be cut off by the crash
+                        break
+                    if entry.get("fingerprint") != self.fingerprint:
+                        raise ValueError("The checkpoint %s is of another input or other options, remove it or "
+                                         "start over without resuming." % self.checkpoint_path)
+                    self.done, offset, self.state = entry["done"], entry["offset"], entry["state"]
+        if offset and os.path.exists(self.path):
+            self.fo = open(self.path, "r+b")
+            self.fo.truncate(offset)  # dropping a record written after the last checkpoint
+            self.fo.seek(offset)
+        else:
+            self.done = 0
+            self.state = None
+            self.fo = open(self.path, "wb")
+        self.offset = offset if self.done else 0
+        # rewriting the checkpoint file without a line cut off
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fc:
+            if self.done:
+                fc.write(self.entry())
+            fc.flush()
+            os.fsync(fc.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+        self.fc = open(self.checkpoint_path, "a", encoding="utf-8")
+        return self.done
+
+    def entry(self):
+        return json.dumps({"done": self.done, "offset": self.offset, "state": self.state,
+                           "fingerprint": self.fingerprint}) + "\n"
+
+    def append(self, record, state=None):
+        append_record(self.fo, record)
+        self.done += 1
+        self.state = state
+        self.offset = self.fo.tell()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """
+        Syncing the records appended so far, then checkpointing them.
+        """
+        if not self.unsynced:
+            return
+        self.fo.flush()
+        os.fsync(self.fo.fileno())
+        self.fc.write(self.entry())
+        self.fc.flush()
+        os.fsync(self.fc.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        if self.fo is not None and self.fc is not None:
+            self.sync()
+        for file in (self.fo, self.fc):
+            if file is not None:
+                file.close()
+        self.fo = None
+        self.fc = None
+
+    def finish(self):
+        """
+        Closing the files of a completed run, the checkpoint is removed.
+        """
+        self.close()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
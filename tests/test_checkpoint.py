@@ -0,0 +1,108 @@
+import copy
+
+import pytest
+
+from datastructure import Element, Graph, Node, Tuple
+from graph import wrap_document_entities
+from stream_util import Checkpoint, load_records
+
+
+def crash(checkpoint):
+    # the files are closed without syncing the records appended since the last checkpoint
+    checkpoint.fo.close()
+    checkpoint.fc.close()
+    checkpoint.fo = checkpoint.fc = None
+
+
+def test_resuming_drops_the_records_after_the_last_checkpoint(tmp_path):
+    path = str(tmp_path / "records.pkl")
+    checkpoint = Checkpoint(path, "run", sync_every=3)
+    assert checkpoint.open() == 0
+    for i in range(7):
+        checkpoint.append({"document": i}, state=i)
+    crash(checkpoint)
+
+    with Checkpoint(path, "run", sync_every=3) as checkpoint:
+        done = checkpoint.open()
+        assert done == 6 and checkpoint.state == 5
+        for i in range(done, 10):
+            checkpoint.append({"document": i}, state=i)
+        checkpoint.finish()
+    assert load_records(path) == [{"document": i} for i in range(10)]
+
+
+def test_closing_checkpoints_the_records_appended(tmp_path):
+    path = str(tmp_path / "records.pkl")
+    with Checkpoint(path, "run", sync_every=100) as checkpoint:
+        checkpoint.open()
+        checkpoint.append("a")
+        checkpoint.append("b")
+    with Checkpoint(path, "run") as checkpoint:
+        assert checkpoint.open() == 2
+
+
+def test_a_checkpoint_of_another_run_is_refused(tmp_path):
+    path = str(tmp_path / "records.pkl")
+    with Checkpoint(path, "run") as checkpoint:
+        checkpoint.open()
+        checkpoint.append("a")
+    with pytest.raises(ValueError):
+        Checkpoint(path, "another run").open()
+    with Checkpoint(path, "another run") as checkpoint:
+        assert checkpoint.open(resume=False) == 0
+
+
+def test_a_line_cut_off_is_ignored(tmp_path):
+    path = str(tmp_path / "records.pkl")
+    with Checkpoint(path, "run", sync_every=1) as checkpoint:
+        checkpoint.open()
+        checkpoint.append("a")
+        checkpoint.append("b")
+    with open(path + ".ckpt", "a", encoding="utf-8") as fc:
+        fc.write('{"done": 3, "off')
+    with Checkpoint(path, "run") as checkpoint:
+        assert checkpoint.open() == 2
+
+
+def make_element(word, uris):
+    element = Element()
+    element.word = word
+    element.word_index = [1]
+    element.entity = [{"uri": uri} for uri in uris] if uris else None
+    return element
+
+
+def make_tuples():
+    shared = make_element("Obama", ["Barack_Obama"])  # an element in two tuples is wrapped twice
+    tuples = []
+    for i, (obj, adverbial) in enumerate([("Senate", ["in 2004"]), ("Chicago", [])]):
+        tuple_ = Tuple()
+        tuple_.subject = shared
+        tuple_.predicate = make_element("won%d" % i, None)
+        tuple_.direct_object = make_element(obj, [obj + "_uri", "Other"])
+        tuple_.adverbial = [make_element(word, [word]) for word in adverbial]
+        tuples.append(tuple_)
+    return [tuples, []]
+
+
+def entities(all_tuples):
+    result = []
+    for tuples in all_tuples:
+        for tuple_ in tuples:
+            for element in [tuple_.subject, tuple_.predicate, tuple_.direct_object] + tuple_.adverbial:
+                result.append([node.node_id for node in element.entity] if element.entity is not None else None)
+    return result
+
+
+@pytest.mark.parametrize("semantic_graph", [True, False])
+def test_wrapping_the_entities_of_skipped_documents_matches_building_the_graph(semantic_graph):
+    built = make_tuples()
+    skipped = copy.deepcopy(built)
+    if semantic_graph:
+        Graph().build_semantic_graph(built)
+    else:
+        Graph(built)
+    current_id = Node.current_id
+    wrap_document_entities(skipped)
+    assert Node.current_id == current_id
+    assert entities(skipped) == entities(built)
@@ -0,0 +1,36 @@
+import copy
+from itertools import product
+
+import pytest
+
+import clause_classification
+import clause_detection
+import sentence_classification_spacy
+from vocab import relations
+
+
+def with_assigned_features(table):
+    """
+    the compiled table reading its features from a dict passed as the context
+    """
+    table = copy.copy(table)
+    table.features = {name: (lambda context, index, name=name: context[name]) for name in table.features}
+    return table
+
+
+@pytest.mark.parametrize("table", [
+    clause_detection.TABLE,
+    clause_detection.SPACY_TABLE,
+    clause_classification.TABLE,
+    sentence_classification_spacy.TABLE,
+], ids=["clause_detection", "clause_detection_spacy", "clause_classification", "sentence_classification_spacy"])
+def test_compiled_table_matches_first_match(table):
+    table = with_assigned_features(table)
+    names = sorted(table.features)
+    # every relation with a table of its own, no relation and one falling back to the other rules
+    in_codes = sorted(table.tables) + [0, relations.code("no-such-relation")]
+    for in_code in in_codes:
+        for values in product([False, True], repeat=len(names)):
+            context = dict(zip(names, values))
+            assert table.classify(context, in_code, 1) == table.first_match(context, in_code, 1), \
+                (relations.strings[in_code], context)
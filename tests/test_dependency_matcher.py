@@ -0,0 +1,232 @@
+import random
+
+import pytest
+
+import clause_classification as CLF
+import openie
+import openie_spacy
+import sentence_classification_spacy as SCLF
+from array_graph import ArrayGraph
+from corenlp_datastructure import CorenlpSyntaxTree
+from datastructure import Sentence, Token
+from openie import DependencyMatcher, expand_phrase
+from spacy_datastructure import SpacySynaxTree
+from vocab import IS_NOUN, IS_VERB
+
+# the extractions the patterns replaced, each SVX tuple copied instead of mutated between yields
+
+
+def negative(tree, index):
+    return openie.NEG_CODE in tree.out_going_codes(index)
+
+
+@expand_phrase
+def extract_SV(tree, index):
+    for subject in tree.get_subjects(index):
+        yield {"S": tree.words[subject], "V": tree.words[index], "N": negative(tree, index), "category": CLF.SV}
+
+
+@expand_phrase
+def extract_SVO(tree, index):
+    for subject in tree.get_subjects(index):
+        for object in tree.get_objects(index):
+            yield {"S": tree.words[subject], "V": tree.words[index], "O": tree.words[object],
+                   "N": negative(tree, index), "category": CLF.SVO}
+
+
+@expand_phrase
+def extract_SVOO(tree, index):
+    dobj, iobj = openie.get_idobj(tree, index)
+    dobjects = []
+    iobjects = []
+    for obj in dobj:
+        dobjects.append(tree.words[obj])
+        dobjects.extend(tree.words[conjunction] for conjunction in tree.get_conjunction(obj))
+    for obj in iobj:
+        iobjects.append(tree.words[obj])
+        iobjects.extend(tree.words[conjunction] for conjunction in tree.get_conjunction(obj))
+    for subject in tree.get_subjects(index):
+        for dobject in dobjects:
+            for iobject in iobjects:
+                yield {"S": tree.words[subject], "V": tree.words[index], "dO": dobject, "iO": iobject,
+                       "N": negative(tree, index), "category": CLF.SVOO}
+
+
+@expand_phrase
+def extract_SVc(tree, index, processed):
+    parent = tree.parents[index]
+    subjects = tree.get_subjects(parent)
+    conjunctions = tree.get_conjunction(parent)
+    conjunctions.append(parent)
+    processed.append(parent)
+    for subject in subjects:
+        for conjunction in conjunctions:
+            if tree.words[conjunction].pos_flags & IS_VERB:
+                continue
+            if conjunction != parent and openie.COP_CODE in tree.out_going_codes(conjunction):
+                continue
+            yield {"S": tree.words[subject], "V": tree.words[index], "P": tree.words[conjunction],
+                   "category": CLF.SVc}
+
+
+@expand_phrase
+def extract_spacy_SVc(tree, index):
+    subjects = tree.get_subjects(index)
+    objects = []
+    for child in tree.children(index):
+        if tree.dependent_code(index, child) == openie_spacy.ATTR_CODE:
+            objects = [child] + tree.get_conjunction(child)
+            break
+    for subject in subjects:
+        for object in objects:
+            yield {"category": SCLF.SVc, "S": tree.words[subject], "V": tree.words[index], "P": tree.words[object],
+                   "N": negative(tree, tree.parents[index])}
+
+
+def svx(noun_complement):
+    @expand_phrase
+    def extract_SVX(tree, index):
+        for child in tree.graph.neighbors(index):
+            code = tree.dependent_code(index, child)
+            if code == openie.XCOMP_CODE and tree.words[child].pos_flags & IS_VERB:
+                phrase = [tree.words[idx] for idx in range(index, child+1) if idx in tree.words]
+                objects = tree.get_objects(child)
+                for subject in tree.get_subjects(index):
+                    n_tuple = {"category": "SVX", "S": tree.words[subject], "V": phrase, "N": negative(tree, index)}
+                    if objects:
+                        for object in objects:
+                            n_tuple["O"] = tree.words[object]
+                            yield dict(n_tuple)
+                    else:
+                        yield dict(n_tuple)
+            elif code == noun_complement and tree.words[child].pos_flags & IS_NOUN:
+                objects = [child] + tree.get_conjunction(child)
+                for subject in tree.get_subjects(index):
+                    n_tuple = {"category": "SVX", "S": tree.words[subject], "V": tree.words[index],
+                               "N": negative(tree, index)}
+                    for object in objects:
+                        n_tuple["O"] = tree.words[object]
+                        yield dict(n_tuple)
+    return extract_SVX
+
+
+REFERENCES = {
+    "corenlp": {
+        CLF.SV: lambda tree, index, processed: extract_SV(tree, index),
+        CLF.SVO: lambda tree, index, processed: extract_SVO(tree, index),
+        CLF.SVOO: lambda tree, index, processed: extract_SVOO(tree, index),
+        CLF.SVc: extract_SVc,
+        CLF.SVX: lambda tree, index, processed: svx(openie.XCOMP_CODE)(tree, index),
+    },
+    "spacy": {
+        CLF.SV: lambda tree, index, processed: extract_SV(tree, index),
+        CLF.SVO: lambda tree, index, processed: extract_SVO(tree, index),
+        CLF.SVOO: lambda tree, index, processed: extract_SVOO(tree, index),
+        SCLF.SVc: lambda tree, index, processed: extract_spacy_SVc(tree, index),
+        SCLF.SVX: lambda tree, index, processed: svx(openie_spacy.OPRD_CODE)(tree, index),
+    },
+}
+BACKENDS = {"corenlp": (CorenlpSyntaxTree, openie.EXTRACTIONS), "spacy": (SpacySynaxTree, openie_spacy.EXTRACTIONS)}
+
+# the relations of the patterns drawn more often than the modifiers expanding their nodes
+RELATIONS = ["nsubj", "nsubjpass", "dobj", "iobj", "xcomp", "conj", "cop", "neg", "attr", "oprd"] * 3 + \
+    ["aux", "auxpass", "det", "amod", "compound", "nmod:poss", "case", "cc"]
+TAGS = ["VB", "VBD", "VBG", "VBN", "NN", "NNS", "NNP", "JJ", "DT", "PRP"]
+
+
+def describe_element(element):
+    if isinstance(element, list):
+        return [describe_element(item) for item in element]
+    if isinstance(element, Token):
+        return element.word, element.idx
+    return element
+
+
+def describe(tuples):
+    return [sorted((key, describe_element(value)) for key, value in tuple_.items()) for tuple_ in tuples]
+
+
+def run(extract):
+    try:
+        return describe(list(extract())), None
+    except Exception as e:
+        return None, type(e)
+
+
+def random_tree(rng, tree_class, graph_class):
+    n = rng.randint(2, 10)
+    order = list(range(1, n + 1))
+    rng.shuffle(order)
+    dependencies = [(0, order[0], "ROOT")]
+    for i in range(1, n):
+        dependencies.append((order[rng.randrange(i)], order[i], rng.choice(RELATIONS)))
+    tokens = [Token("w%d" % i, rng.choice(TAGS), i, i) for i in range(n)]
+    return tree_class(tokens, dependencies, graph_class)
+
+
+def assert_patterns_match(backend, tree):
+    extractions = BACKENDS[backend][1]
+    for index in sorted(tree.words):
+        for type_, reference in REFERENCES[backend].items():
+            processed, expected_processed = [], []
+            expected = run(lambda: reference(tree, index, expected_processed))
+            matcher = DependencyMatcher(tree)
+            actual = run(lambda: extractions[type_](matcher, index, None, processed))
+            assert actual == expected, (type_, index)
+            assert processed == expected_processed
+
+
+# "She did not give him and Ann the old book and a pen"
+WORDS = [("She", "PRP"), ("did", "VBD"), ("not", "RB"), ("give", "VB"), ("him", "PRP"), ("and", "CC"),
+         ("Ann", "NNP"), ("the", "DT"), ("old", "JJ"), ("book", "NN"), ("and", "CC"), ("a", "DT"), ("pen", "NN")]
+DEPENDENCIES = [(4, 1, "nsubj"), (4, 2, "aux"), (4, 3, "neg"), (0, 4, "ROOT"), (4, 5, "iobj"), (5, 6, "cc"),
+                (5, 7, "conj"), (10, 8, "det"), (10, 9, "amod"), (4, 10, "dobj"), (10, 11, "cc"), (13, 12, "det"),
+                (10, 13, "conj")]
+
+
+@pytest.mark.parametrize("backend", ["corenlp", "spacy"])
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_double_object_pattern(backend, graph_class):
+    tokens = [Token(word, pos, i, i) for i, (word, pos) in enumerate(WORDS)]
+    tree = BACKENDS[backend][0](tokens, DEPENDENCIES, graph_class)
+    matcher = DependencyMatcher(tree)
+    tuples = list(BACKENDS[backend][1][CLF.SVOO](matcher, 4, None, []))
+    assert len(tuples) == 4 and all(tuple_["N"] for tuple_ in tuples)
+    assert_patterns_match(backend, tree)
+
+
+@pytest.mark.parametrize("backend", ["corenlp", "spacy"])
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_patterns_match_the_extractions_they_replaced(backend, graph_class):
+    rng = random.Random(22)
+    for _ in range(1000):
+        assert_patterns_match(backend, random_tree(rng, BACKENDS[backend][0], graph_class))
+
+
+class Labels():
+    """
+    the clause labels of each tree, keyed by its first word
+    """
+    def __init__(self, labels):
+        self.labels = labels
+
+    def label_tree(self, tree, features):
+        return self.labels[tree.words[1].word]
+
+
+def make_sentence(raw_sentence, words, dependencies):
+    tokens = [Token(word, pos, i, i) for i, (word, pos) in enumerate(words)]
+    return Sentence(raw_sentence, CorenlpSyntaxTree(tokens, dependencies))
+
+
+def test_complement_clause_is_extracted_with_the_classifier():
+    sentence = make_sentence("he said that", [("he", "PRP"), ("said", "VBD"), ("that", "IN")],
+                             [(2, 1, "nsubj"), (0, 2, "ROOT"), (2, 3, "mark")])
+    clause = make_sentence("she left", [("she", "PRP"), ("left", "VBD")], [(2, 1, "nsubj"), (0, 2, "ROOT")])
+    sentence.right.append((3, clause))
+    clause_clf = Labels({"he": [(2, CLF.SVC)], "she": [(2, CLF.SV)]})
+    tuples = list(openie.extract_tuples(clause_clf, sentence))
+    assert sentence.object_clause
+    assert [(tuple_["S"].word, tuple_["V"].word, tuple_["category"]) for tuple_ in tuples] == [("he", "said", CLF.SVC)]
+    [complement] = tuples[0]["C"]
+    assert (complement["S"].word, complement["V"].word, complement["clause"]) == ("she", "left", "she left")
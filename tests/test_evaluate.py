@@ -0,0 +1,169 @@
+import copy
+import random
+
+from datastructure import Element, Tuple
+from evaluate import TripleEvaluator, build_tuple, merge_sentence_tuples, merge_tuples
+
+
+def make_tuple(line, clause_type=None):
+    tuple_ = build_tuple([split.strip() for split in line.split(";")])
+    tuple_.clause_type = clause_type
+    return tuple_
+
+
+SENTENCE = "Obama 's party won the election in 2008 ."
+GOLD = [[(SENTENCE, [make_tuple("Obama's party; won; the election; ; in 2008")])]]
+SYSTEMS = {
+    "good": [[(SENTENCE, [make_tuple("Obama 's party; won; The Election; ; ", "SVO"),
+                          make_tuple("Obama 's party; won; ; ; in 2008", "SV")])]],
+    "bad": [[(SENTENCE, [make_tuple("Obama 's party; won; the election; ; ", "SVO"),
+                         make_tuple("party; lost; ; ; ", "SV")])]],
+}
+
+
+def counts(score):
+    return score["correct"], score["extracted"], score["gold"]
+
+
+def test_triples_are_scored_overall_and_by_label():
+    results = TripleEvaluator(SYSTEMS).evaluate(GOLD, SYSTEMS)
+    good, bad = results["good"], results["bad"]
+    assert counts(good["overall"]) == (2, 2, 2) and good["overall"]["f1"] == 1.0
+    assert counts(bad["overall"]) == (1, 2, 2) and bad["overall"]["precision"] == 0.5
+    assert counts(bad["label"]["dobj"]) == (1, 1, 1)
+    assert counts(bad["label"]["in"]) == (0, 0, 1)
+    assert bad["label"]["in"]["recall"] == 0.0
+    assert counts(bad["label"]["None"]) == (0, 1, 0)
+
+
+def test_clause_types_get_their_precision_only():
+    # the gold tuples have no clause type, which gives no recall to the clause types
+    results = TripleEvaluator(SYSTEMS).evaluate(GOLD, SYSTEMS)
+    assert set(results["good"]["clause_type"]) == {"SVO", "SV"}
+    for clause_type, precision in [("SVO", 1.0), ("SV", 0.0)]:
+        score = results["bad"]["clause_type"][clause_type]
+        assert score["precision"] == precision
+        assert score["gold"] is None and score["recall"] is None and score["f1"] is None
+
+
+def test_evaluations_add_up():
+    evaluator = TripleEvaluator(["bad"])
+    evaluator.evaluate(GOLD, {"bad": SYSTEMS["bad"]})
+    results = evaluator.evaluate(iter(GOLD), {"bad": iter(SYSTEMS["bad"])})
+    assert counts(results["bad"]["overall"]) == (2, 4, 4)
+
+
+def reference_merge_tuples(tuple1, tuple2):
+    # the pairwise merge `merge_sentence_tuples` replaced
+    to_merge = False
+    if tuple1.subject == tuple2.subject and tuple1.predicate == tuple2.predicate:
+        to_merge = True
+    if tuple1.direct_object is not None and tuple2.direct_object is not None:
+        if tuple1.direct_object != tuple2.direct_object:
+            to_merge = False
+    elif tuple1.direct_object is not None or tuple2.direct_object is not None:
+        to_merge = False
+    if tuple1.indirect_object is not None and tuple2.indirect_object is not None:
+        if tuple1.indirect_object != tuple2.indirect_object:
+            to_merge = False
+    elif tuple1.indirect_object is not None or tuple2.indirect_object is not None:
+        to_merge = False
+    if not to_merge:
+        return None
+    triples1 = tuple1.to_triples()
+    triples2 = tuple2.to_triples()
+    for triple2 in triples2:
+        for triple1 in triples1:
+            if Tuple.compare_triple(triple1, triple2):
+                break
+        else:
+            triples1.append(triple2)
+    tuple_ = Tuple()
+    for triple in triples1:
+        if tuple_.predicate is None:
+            tuple_.predicate = triple[1]
+        label = triple[3]
+        if label == "dobj":
+            tuple_.subject = triple[0]
+            tuple_.direct_object = triple[2]
+        if label == "iobj":
+            tuple_.subject = triple[0]
+            tuple_.indirect_object = triple[2]
+        if label is None:
+            tuple_.subject = triple[0]
+        elif triple[2] not in tuple_.adverbial:
+            tuple_.subject = triple[0]
+            tuple_.adverbial.append(triple[2])
+    return tuple_
+
+
+def reference_merge_sentence_tuples(tuples1, tuples2):
+    tuples = [tuple_ for tuple_ in tuples1]
+    for tuple2 in tuples2:
+        tuple_ = None
+        merged_tuple = None
+        for tuple1 in tuples:
+            tuple_ = reference_merge_tuples(tuple1, tuple2)
+            if tuple_ is not None:
+                merged_tuple = tuple1
+                break
+        if tuple_ is not None:
+            tuples.remove(merged_tuple)
+            tuples.append(tuple_)
+        else:
+            tuples.append(tuple2)
+    return tuples
+
+
+def describe_element(element):
+    if element is None:
+        return None
+    return element.word, element.prep, tuple(element.word_index)
+
+
+def describe(tuples):
+    return [(describe_element(tuple_.subject), describe_element(tuple_.predicate),
+             describe_element(tuple_.direct_object), describe_element(tuple_.indirect_object),
+             [describe_element(item) for item in tuple_.adverbial]) for tuple_ in tuples]
+
+
+# case and spacing variants the merge treats as the same words
+WORDS = ["Obama", "obama", "Obama 's party", "Obama's party", "the Senate", "The senate", "a pen"]
+PREDICATES = ["won", "Won", "ran"]
+PREPS = ["in", "In", "for"]
+
+
+def random_element(rng, words, prep=False):
+    element = Element()
+    element.word = rng.choice(words)
+    element.word_index = [rng.randint(1, 3)]  # told apart in the result, not by the merge
+    if prep:
+        element.prep = rng.choice(PREPS)
+    return element
+
+
+def random_tuple(rng):
+    tuple_ = Tuple()
+    tuple_.subject = random_element(rng, WORDS[:4])
+    tuple_.predicate = random_element(rng, PREDICATES)
+    if rng.random() < 0.5:
+        tuple_.direct_object = random_element(rng, WORDS)
+    if rng.random() < 0.2:
+        tuple_.indirect_object = random_element(rng, WORDS)
+    tuple_.adverbial = [random_element(rng, WORDS, prep=True) for _ in range(rng.choice([0, 0, 1, 2]))]
+    return tuple_
+
+
+def test_merging_matches_the_pairwise_merge():
+    rng = random.Random(23)
+    for _ in range(2000):
+        tuples1 = [random_tuple(rng) for _ in range(rng.randint(0, 5))]
+        tuples2 = [random_tuple(rng) for _ in range(rng.randint(0, 5))]
+        expected = describe(reference_merge_sentence_tuples(copy.deepcopy(tuples1), copy.deepcopy(tuples2)))
+        assert describe(merge_sentence_tuples(tuples1, tuples2)) == expected
+        for tuple1, tuple2 in zip(tuples1, tuples2):
+            expected = reference_merge_tuples(tuple1, tuple2)
+            merged = merge_tuples(tuple1, tuple2)
+            assert (merged is None) == (expected is None)
+            if merged is not None:
+                assert describe([merged]) == describe([expected])
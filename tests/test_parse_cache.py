@@ -0,0 +1,50 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from parse_cache import ParseCache
+
+
+def test_a_disk_hit_doesnt_write_until_the_commit(tmp_path):
+    path = str(tmp_path / "parses.sqlite")
+    cache = ParseCache(path, memory_size=10)
+    cache.put("a", {"words": ["a"]})
+    cache.commit()
+    cache.memory.clear()
+    assert cache.get("a") == {"words": ["a"]}
+    assert not cache.connection.in_transaction
+    other = sqlite3.connect(path, timeout=0)  # another process can write meanwhile
+    other.execute("UPDATE parses SET accessed = 0 WHERE key = 'a'")
+    other.commit()
+    cache.commit()
+    assert other.execute("SELECT accessed FROM parses WHERE key = 'a'").fetchone()[0] > 0
+    cache.close()
+
+
+shared_cache = None  # the cache the forked workers inherit
+started = None       # a barrier making the workers write at the same time
+
+
+def write_in_worker(worker):
+    shared_cache.reopen()
+    started.wait()
+    for i in range(50):  # fewer writes than commit_every
+        shared_cache.memory.clear()
+        assert shared_cache.get("shared") == {"words": ["shared"]}
+        shared_cache.put("%d-%d" % (worker, i), {"words": [str(i)]})
+    return worker
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_forked_workers_share_the_file(tmp_path):
+    global shared_cache, started
+    path = str(tmp_path / "parses.sqlite")
+    shared_cache = cache = ParseCache(path, timeout=5)
+    cache.put("shared", {"words": ["shared"]})
+    cache.share()
+    started = multiprocessing.get_context("fork").Barrier(4)
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        assert sorted(pool.map(write_in_worker, range(4))) == [0, 1, 2, 3]
+    assert cache.connection.execute("SELECT COUNT(*) FROM parses").fetchone()[0] == 201
+    cache.close()
@@ -0,0 +1,91 @@
+import networkx as nx
+
+from array_graph import ArrayGraph
+from corenlp_datastructure import CorenlpSentenceBuilder
+from datastructure import Phrase
+
+# "The man who smiled bought a car", and the parse of the words left after deleting "who smiled"
+PARSES = {
+    "The man who smiled bought a car": {
+        "words": ["The", "man", "who", "smiled", "bought", "a", "car"],
+        "pos_tags": ["DT", "NN", "WP", "VBD", "VBD", "DT", "NN"],
+        "dependencies": [(2, 1, "det"), (5, 2, "nsubj"), (4, 3, "nsubj"), (2, 4, "acl:relcl"), (0, 5, "ROOT"),
+                         (7, 6, "det"), (5, 7, "dobj")],
+    },
+    "The man bought a car": {
+        "words": ["The", "man", "bought", "a", "car"],
+        "pos_tags": ["DT", "NN", "VBD", "DT", "NN"],
+        "dependencies": [(2, 1, "det"), (3, 2, "nsubj"), (0, 3, "ROOT"), (5, 4, "det"), (3, 5, "dobj")],
+    },
+}
+CHUNKS = {
+    "The man who smiled bought a car": [[1, 2], [6, 7]],
+    "The man bought a car": [[1, 2], [4, 5]],
+}
+
+
+class RecordedBuilder(CorenlpSentenceBuilder):
+    def parse(self, sentence):
+        return [PARSES[sentence]]
+
+    def chunk_nouns(self, sentence):
+        return iter(CHUNKS[sentence])
+
+
+def describe(tree):
+    words = []
+    for index, word in sorted(tree.words.items()):
+        if isinstance(word, Phrase):
+            words.append((index, tuple((i, token.word, token.pos, token.idx) for i, token in word.tokens)))
+        else:
+            words.append((index, word.word, word.pos, word.idx))
+    edges = sorted((gov, dep, tree.dependent_relation(gov, dep)) for gov, dep in tree.graph.edges())
+    return tree.root, words, edges
+
+
+def rebuilt(projecting, merging_noun):
+    builder = RecordedBuilder()
+    builder.projecting = projecting
+    sentence = builder.from_raw_senence("The man who smiled bought a car", merging_noun)
+    tree = sentence.tree
+    tree.delete_subtree(sorted(tree.get_subtree(4)))
+    return builder, builder.rebuild(tree, merging_noun)
+
+
+def test_projected_tree_is_the_reparsed_tree():
+    for merging_noun in (False, True):
+        projector, projected = rebuilt(True, merging_noun)
+        reparser, reparsed = rebuilt(False, merging_noun)
+        assert projector.projection_stats == {"projected": 1, "reparsed": 0}
+        assert reparser.projection_stats == {"projected": 0, "reparsed": 1}
+        assert projected.raw_sentence == reparsed.raw_sentence == "The man bought a car"
+        assert describe(projected.tree) == describe(reparsed.tree)
+
+
+def test_malformed_projection_is_reparsed():
+    builder = RecordedBuilder()
+    builder.projecting = True
+    tree = builder.from_raw_senence("The man who smiled bought a car", False).tree
+    tree.remove_word(2)  # "The" loses its head
+    assert builder.project(tree, False) is None
+
+
+def test_use_projection_sets_the_default_of_the_class():
+    try:
+        RecordedBuilder.use_projection()
+        assert RecordedBuilder().projecting
+        assert not CorenlpSentenceBuilder().projecting
+    finally:
+        del RecordedBuilder.projecting
+
+
+def test_builders_build_on_their_graph_class():
+    try:
+        RecordedBuilder.use_graph_class(ArrayGraph)
+        _, projected = rebuilt(True, True)
+        assert isinstance(projected.tree.graph, ArrayGraph)
+        sentence = RecordedBuilder(graph_class=nx.DiGraph).from_raw_senence("The man bought a car", True)
+        assert isinstance(sentence.tree.graph, nx.DiGraph)
+        assert CorenlpSentenceBuilder().graph_class is None
+    finally:
+        del RecordedBuilder.graph_class
@@ -0,0 +1,256 @@
+import random
+
+import pytest
+
+from array_graph import ArrayGraph
+from corenlp_datastructure import CorenlpSyntaxTree
+from datastructure import Phrase, Token, add_dependency
+
+
+class ReferenceTree(CorenlpSyntaxTree):
+    """
+    The tree changing its graph in place on every stretch and shrink, the way it did before it kept
+    the two views.
+    """
+    def remove_word(self, index):
+        del self.words[index]
+        del self.parents[index]
+        self.memo.clear()
+
+    def merge_noun_phrases(self, spans):
+        for span in spans:
+            if len(span) > 1:
+                head = self.get_phrase_head(span)
+                if not head:
+                    continue
+                min_ = min(span)
+                max_ = max(span)
+                in_edges = []
+                for item in range(min_, max_+1):
+                    if item != head:
+                        parent = self.parents[item]
+                        in_edges.append((parent, item, self.dependent_relation(parent, item)))
+                tokens = [(i, self.words[i]) for i in range(min_, max_+1)]
+                phrase = Phrase(tokens, self.words[head], in_edges)
+                self.noun_phrases.append(phrase)
+                self.shrink_nounphrase(phrase)
+
+    def shrink_nounphrase(self, phrase):
+        for idx, token in phrase.tokens:
+            if token != phrase.head and self.graph.has_node(idx):
+                self.invalidate()
+                self.graph.remove_node(idx)
+                del self.words[idx]
+                del self.parents[idx]
+            elif token == phrase.head:
+                self.words[idx] = phrase
+
+    def stretch_nounphrases(self):
+        for phrase in self.noun_phrases:
+            for idx, token in phrase.tokens:
+                self.words[idx] = token
+            for edge in phrase.in_edges:
+                self.invalidate()
+                add_dependency(self.graph, edge[0], edge[1], edge[2])
+                self.parents[edge[1]] = edge[0]
+
+    def shrink_nounphrases(self):
+        for phrase in self.noun_phrases:
+            self.shrink_nounphrase(phrase)
+
+    def merge_verb_phrase(self, chunk):
+        root = None
+        min_ = min(chunk)
+        max_ = max(chunk)
+        span_range = range(min_, max_ + 1)
+        nodes_with_outedges = []
+        for item in span_range:
+            if item not in self.parents:
+                return
+            if self.parents[item] not in span_range:
+                if root is not None:
+                    return
+                root = item
+            else:
+                for child in self.children(item):
+                    if child not in span_range:
+                        nodes_with_outedges.append(item)
+                        break
+        if len(nodes_with_outedges) > 1:
+            return
+        if nodes_with_outedges:
+            node = nodes_with_outedges[0]
+            for child in self.children(node):
+                rel = self.dependent_relation(node, child)
+                self.invalidate()
+                self.parents[child] = root
+                add_dependency(self.graph, root, child, rel)
+        tokens = [(i, self.words[i]) for i in range(min_, max_ + 1)]
+        phrase = Phrase(tokens, self.words[root], None, None, "VERB")
+        self.words[root] = phrase
+
+    def delete_subtree(self, subtree, drop_following_comma=False):
+        self.invalidate()
+        idxes = []
+        for node in subtree:
+            if node in self.words:
+                if hasattr(self.words[node], "tokens"):
+                    idxes.extend([token[1].idx + 1 for token in self.words[node].tokens])
+                else:
+                    idxes.append(self.words[node].idx + 1)
+                del self.words[node]
+                del self.parents[node]
+                self.graph.remove_node(node)
+        if not idxes:
+            return
+        start = min(idxes)
+        idx = start - 1
+        if idx in self.words and self.words[idx].word == ",":
+            del self.words[idx]
+            del self.parents[idx]
+            self.graph.remove_node(idx)
+        if drop_following_comma:
+            end = max(idxes)
+            idx = end + 1
+            if idx in self.words and self.words[idx].word == ",":
+                del self.words[idx]
+                del self.parents[idx]
+                self.graph.remove_node(idx)
+
+
+def describe(tree):
+    words = []
+    for index, word in sorted(tree.words.items()):
+        if isinstance(word, Phrase):
+            words.append((index, word.type(), word.word, word.head.word))
+        else:
+            words.append((index, word.word))
+    nodes = sorted(tree.graph.nodes())
+    edges = sorted((gov, dep, tree.dependent_relation(gov, dep), tree.dependent_code(gov, dep))
+                   for gov, dep in tree.graph.edges())
+    children = [(node, tree.children(node)) for node in nodes]
+    subtrees = [(node, tree.get_subtree(node)) for node in nodes]
+    return words, sorted(tree.parents.items()), nodes, edges, children, subtrees
+
+
+def make_trees(words, dependencies, graph_class=None):
+    trees = []
+    for tree_class in (CorenlpSyntaxTree, ReferenceTree):
+        tokens = [Token(word, pos, i, i + 1) for i, (word, pos) in enumerate(words)]
+        trees.append(tree_class(tokens, dependencies, graph_class))
+    return trees
+
+
+# "The boy has been given a book"
+WORDS = [("The", "DT"), ("boy", "NN"), ("has", "VBZ"), ("been", "VBN"), ("given", "VBN"), ("a", "DT"),
+         ("book", "NN")]
+DEPENDENCIES = [(2, 1, "det"), (5, 2, "nsubjpass"), (5, 3, "aux"), (5, 4, "auxpass"), (0, 5, "ROOT"),
+                (7, 6, "det"), (5, 7, "dobj")]
+NOUN_PHRASES = [[1, 2], [6, 7]]
+
+
+def apply(tree, operation, *args):
+    if operation == "merge_noun_phrases":
+        tree.merge_noun_phrases(*args)
+    elif operation == "stretch":
+        tree.stretch_nounphrases()
+    elif operation == "shrink":
+        tree.shrink_nounphrases()
+    elif operation == "merge_verb_phrase":
+        tree.merge_verb_phrase(*args)
+    elif operation == "delete_subtree":
+        tree.delete_subtree(tree.get_subtree(args[0]))
+    elif operation == "remove_word":
+        tree.remove_word(*args)
+
+
+@pytest.mark.parametrize("operations", [
+    [("stretch",), ("shrink",), ("stretch",), ("shrink",)],
+    [("stretch",), ("merge_verb_phrase", [3, 4, 5]), ("shrink",), ("stretch",)],
+    [("stretch",), ("merge_verb_phrase", [1, 2]), ("stretch",), ("shrink",), ("stretch",)],
+    [("delete_subtree", 7), ("stretch",), ("shrink",)],
+    [("stretch",), ("delete_subtree", 7), ("shrink",), ("stretch",)],
+    [("stretch",), ("stretch",), ("shrink",), ("shrink",), ("stretch",)],
+    [("shrink",), ("remove_word", 3), ("stretch",), ("shrink",)],
+])
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_switching_views_matches_changing_the_graph(operations, graph_class):
+    tree, reference = make_trees(WORDS, DEPENDENCIES, graph_class)
+    tree.merge_noun_phrases(NOUN_PHRASES)
+    reference.merge_noun_phrases(NOUN_PHRASES)
+    for operation in operations:
+        apply(tree, *operation)
+        apply(reference, *operation)
+        assert describe(tree) == describe(reference), operation
+
+
+def test_unchanged_tree_swaps_views():
+    tree, _ = make_trees(WORDS, DEPENDENCIES)
+    tree.merge_noun_phrases(NOUN_PHRASES)
+    phrase_graph = tree.graph
+    tree.stretch_nounphrases()
+    token_graph = tree.graph
+    tree.shrink_nounphrases()
+    assert tree.graph is phrase_graph
+    tree.stretch_nounphrases()
+    assert tree.graph is token_graph
+    tree.merge_verb_phrase([3, 4, 5])  # a change drops the other view, the next shrink changes the graph
+    tree.shrink_nounphrases()
+    assert tree.other_view is None and tree.graph is token_graph
+
+
+RELATIONS = ["det", "nsubj", "dobj", "amod", "compound", "nmod", "case", "conj", "punct", "acl"]
+TAGS = ["NN", "DT", "JJ", "VBD", "VBG", "IN", ","]
+
+
+def random_operation(rng, tree):
+    n = len(WORDS) if tree is None else tree.word_count
+    choice = rng.random()
+    if choice < 0.3:
+        return ("stretch",)
+    if choice < 0.6:
+        return ("shrink",)
+    if choice < 0.75:
+        start = rng.randint(1, n)
+        return ("merge_verb_phrase", list(range(start, min(n, start + rng.randint(0, 3)) + 1)))
+    if choice < 0.85:
+        start = rng.randint(1, n)
+        return ("merge_noun_phrases", [list(range(start, min(n, start + rng.randint(1, 3)) + 1))])
+    nodes = sorted(tree.graph.nodes())
+    if not nodes:
+        return ("stretch",)
+    if choice < 0.95:
+        return ("delete_subtree", rng.choice(nodes))
+    words = sorted(tree.words)
+    return ("remove_word", rng.choice(words)) if words else ("stretch",)
+
+
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_random_view_switching_matches_changing_the_graph(graph_class):
+    rng = random.Random(16)
+    for _ in range(300):
+        n = rng.randint(2, 10)
+        order = list(range(1, n + 1))
+        rng.shuffle(order)
+        dependencies = [(0, order[0], "ROOT")]
+        for i in range(1, n):
+            dependencies.append((order[rng.randrange(i)], order[i], rng.choice(RELATIONS)))
+        words = [("w%d" % i, rng.choice(TAGS)) for i in range(1, n + 1)]
+        tree, reference = make_trees(words, dependencies, graph_class)
+        spans = []
+        for _ in range(rng.randint(0, 3)):
+            start = rng.randint(1, n)
+            spans.append(list(range(start, min(n, start + rng.randint(1, 3)) + 1)))
+        tree.merge_noun_phrases(spans)
+        reference.merge_noun_phrases(spans)
+        assert describe(tree) == describe(reference)
+        for _ in range(12):
+            operation = random_operation(rng, reference)
+            try:
+                apply(reference, *operation)
+            except (KeyError, ValueError) as e:
+                with pytest.raises(type(e)):
+                    apply(tree, *operation)
+                break
+            apply(tree, *operation)
+            assert describe(tree) == describe(reference), operation
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from array_graph import ArrayGraph
+from corenlp_datastructure import CorenlpSyntaxTree
+from datastructure import Token
+from spacy_datastructure import SpacySynaxTree
+
+RELATIONS = ["nmod", "case", "prep", "acl", "advcl", "relcl", "acl:relcl", "dobj", "conj", "det"]
+TAGS = ["VBG", "VBD", "NN", "IN"]
+
+
+def reference_corenlp_trim(tree, subtree):
+    # the scan `CorenlpSyntaxTree.trim_subtree` did before it was done in one pass: it restarts
+    # after each cut, and the for-else makes the scan after an nmod cut start at the second node
+    i = 0
+    n = len(subtree)
+    while i < n:
+        node = subtree[i]
+        if tree.in_coming_relation(node) == "nmod":
+            for child in tree.children(node):
+                if tree.dependent_relation(node, child) == "case" and tree.words[child].pos == "VBG":
+                    subtree = reference_trim_at(tree, subtree, node)
+                    i = 0
+                    n = len(subtree)
+            else:
+                i += 1
+        elif tree.in_coming_relation(node) in ["acl", "advcl", "acl:relcl", "relcl"]:
+            subtree = reference_trim_at(tree, subtree, node)
+            i = 0
+            n = len(subtree)
+        else:
+            i += 1
+    return subtree
+
+
+def reference_spacy_trim(tree, subtree):
+    i = 0
+    n = len(subtree)
+    while i < n:
+        node = subtree[i]
+        if tree.in_coming_relation(node) == "prep":
+            if tree.words[node].pos == "VBG":
+                subtree = reference_trim_at(tree, subtree, node)
+                i = 0
+                n = len(subtree)
+            else:
+                i += 1
+        elif tree.in_coming_relation(node) in ["acl", "advcl", "acl:relcl", "relcl"]:
+            subtree = reference_trim_at(tree, subtree, node)
+            i = 0
+            n = len(subtree)
+        else:
+            i += 1
+    return subtree
+
+
+def reference_trim_at(tree, subtree, node):
+    subtree = [node for node in subtree]  # copy
+    for node_ in tree.walk_subtree(node):
+        if node_ in subtree:
+            subtree.remove(node_)
+    return subtree
+
+
+def make_tree(tree_class, words, dependencies, graph_class=None):
+    tokens = [Token(word, pos, i + 1, i + 1) for i, (word, pos) in enumerate(words)]
+    return tree_class(tokens, dependencies, graph_class)
+
+
+# "met people including Ann who smiled"
+WORDS = [("met", "VBD"), ("people", "NNS"), ("including", "VBG"), ("Ann", "NNP"), ("who", "WP"), ("smiled", "VBD")]
+DEPENDENCIES = [(0, 1, "ROOT"), (1, 2, "dobj"), (4, 3, "case"), (2, 4, "nmod"), (6, 5, "nsubj"), (2, 6, "acl:relcl")]
+
+
+@pytest.mark.parametrize("subtree, expected", [
+    ([2, 3, 4, 5, 6], [2]),
+    ([6, 5, 4, 3, 2], [2]),
+    # after the nmod cut the scan starts at the second node, so the relative clause in front survives
+    ([4, 3, 6, 5, 2], [6, 5, 2]),
+    # a later cut restarts the scan from the first node, which trims it
+    ([4, 3, 6, 5, 2, 6], [2]),
+    ([2, 5], [2, 5]),
+    ([], []),
+])
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_corenlp_trim_subtree(subtree, expected, graph_class):
+    tree = make_tree(CorenlpSyntaxTree, WORDS, DEPENDENCIES, graph_class)
+    assert reference_corenlp_trim(tree, subtree) == expected
+    assert tree.trim_subtree(subtree) == expected
+
+
+def random_tree(rng, tree_class, graph_class):
+    n = rng.randint(1, 12)
+    order = list(range(1, n + 1))
+    rng.shuffle(order)
+    dependencies = [(0, order[0], "ROOT")]
+    for i in range(1, n):
+        dependencies.append((order[rng.randrange(i)], order[i], rng.choice(RELATIONS)))
+    words = [("w%d" % i, rng.choice(TAGS)) for i in range(1, n + 1)]
+    return make_tree(tree_class, words, dependencies, graph_class)
+
+
+def random_subtree(rng, tree):
+    nodes = list(tree.words)
+    subtree = [rng.choice(nodes) for _ in range(rng.randint(0, 2 * len(nodes)))]
+    if rng.random() < 0.5:
+        subtree.sort()
+    return subtree
+
+
+@pytest.mark.parametrize("tree_class, reference", [
+    (CorenlpSyntaxTree, reference_corenlp_trim),
+    (SpacySynaxTree, reference_spacy_trim),
+])
+@pytest.mark.parametrize("graph_class", [None, ArrayGraph])
+def test_trim_subtree_matches_the_restarting_scan(tree_class, reference, graph_class):
+    rng = random.Random(14)
+    for _ in range(500):
+        tree = random_tree(rng, tree_class, graph_class)
+        for _ in range(4):
+            subtree = random_subtree(rng, tree)
+            assert tree.trim_subtree(list(subtree)) == reference(tree, list(subtree)), subtree
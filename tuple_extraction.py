@@ -1,31 +1,78 @@
-import gevent
-# from gevent import monkey
-# monkey.patch_all()
+import asyncio
+import heapq
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
+from itertools import islice, tee
 
 from sentence_structure import SentenceRestructurer
+import corenlp_util
 from corenlp_util import parse
+from lemma_util import verb_lemmatizer
 from openie import CorenlpOpenIE, flatten
 from sentence_decomposition import CorenlpDecomposer, SpacyDecomposer
-from spacy_util import tokenize
+from spacy_util import tokenize, pipe_tokenize, get_nlp
 from corenlp_datastructure import CorenlpSentenceBuilder
-from datastructure import Tuple, Element
+from datastructure import Tuple, Element, SentenceBuilder
 from clause_detection import ClauseDetector, SpacyClauseDetector
 
 from openie_spacy import SpacyOpenIE
 from spacy_datastructure import SpacySentenceBuilder
 
 
-builder = CorenlpSentenceBuilder()
-clause_detector = ClauseDetector()
-restructurer = SentenceRestructurer(builder, clause_detector)
-openie = CorenlpOpenIE()
-decomposer = CorenlpDecomposer()
-
-
-# builder = SpacySentenceBuilder()
-# clause_detector = SpacyClauseDetector()
-# restructurer = SentenceRestructurer(builder, clause_detector)
-# openie = SpacyOpenIE()
+class Components():
+    """
+    the components of the extraction pipeline
+    """
+    def __init__(self, request_slots=None):
+        """
+        :param request_slots: a semaphore bounding the parser requests in flight, shared between the components
+                              of several threads, see `extract_document_async`
+        """
+        self.builder = CorenlpSentenceBuilder()
+        self.clause_detector = ClauseDetector()
+        self.restructurer = SentenceRestructurer(self.builder, self.clause_detector)
+        self.openie = CorenlpOpenIE()
+        self.decomposer = CorenlpDecomposer()
+        self.builder.request_slots = request_slots
+        self.decomposer.builder.request_slots = request_slots
+
+        # self.builder = SpacySentenceBuilder()
+        # self.clause_detector = SpacyClauseDetector()
+        # self.restructurer = SentenceRestructurer(self.builder, self.clause_detector)
+        # self.openie = SpacyOpenIE()
+
+    def projection_stats(self):
+        """
+        :return: the reparses the builders avoided by projecting ("projected") and those they sent ("reparsed")
+        """
+        return Counter(self.builder.projection_stats) + Counter(self.decomposer.builder.projection_stats)
+
+
+_components = None
+_components_lock = threading.Lock()
+
+
+def components():
+    """
+    the pipeline components, created on first use
+    """
+    global _components
+    if _components is None:
+        with _components_lock:
+            if _components is None:
+                _components = Components()
+    return _components
+
+
+def __getattr__(name):
+    # keeps `from tuple_extraction import restructurer` working without creating the components at import
+    if name in ("builder", "clause_detector", "restructurer", "openie", "decomposer"):
+        return getattr(components(), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 def build_tuple(tuple_):
@@ -132,51 +179,310 @@ def reconstruct_element(element, tokens, chunks, nmods, adverbial=False):
             element.word = element.word[idx+1:]
 
 
-def extract_tuples_with_lexical_simplification(sentence):
-    tokens, chunks, nmods, adverbials, clauses = decomposer.lexical_simplification_first(sentence, restructurer)
-    for clause in clauses:
-        # text = " ".join(token.word for token in clause)
-        # print(text)
-        sent = builder.from_un_parsed_tokens(clause)
-        for tuple_ in openie.process_sentence(sent):
-            tuple_ = build_tuple(tuple_)
-            tuple_.predicate.sentence = sentence  # recording the raw sentence in the predicate
-            reconstruct_tuple(tuple_, tokens, chunks, nmods, adverbials)
-            yield tuple_
+def extract_tuples_with_lexical_simplification(sentence, c=None):
+    for tuple_ in extract_document_with_lexical_simplification([sentence], c):
+        yield tuple_
+
+
+def extract_document_with_lexical_simplification(document, c=None):
+    """
+    Extracting tuples from the sentences of a document with lexical simplification. The sentences,
+    and then the decomposed clauses of all the sentences, are parsed in batched requests.
+
+    :param c: the Components to extract with, the shared ones by default
+    """
+    c = c or components()
+    decomposed = c.decomposer.lexical_simplification_first_batch(document, c.restructurer)
+    clauses = [clause for item in decomposed for clause in item[4]]
+    sentences = iter(c.builder.from_un_parsed_tokens_batch(clauses))
+    for sentence, (tokens, chunks, nmods, adverbials, clauses) in zip(document, decomposed):
+        for _ in clauses:
+            sent = next(sentences)
+            for tuple_ in c.openie.process_sentence(sent):
+                tuple_ = build_tuple(tuple_)
+                tuple_.predicate.sentence = sentence  # recording the raw sentence in the predicate
+                reconstruct_tuple(tuple_, tokens, chunks, nmods, adverbials)
+                yield tuple_
 
 
 def extract_tuples(sentence):
+    c = components()
     raw_sentence = sentence
     sentence = " ".join(tokenize(sentence))
-    sentence = builder.from_raw_senence(sentence)
-    restructurer.apposition_first(sentence)
-    for tuple_ in openie.process_sentence(sentence):
+    sentence = c.builder.from_raw_senence(sentence)
+    c.restructurer.apposition_first(sentence)
+    for tuple_ in c.openie.process_sentence(sentence):
         tuple_ = build_tuple(tuple_)
         tuple_.predicate.sentence = raw_sentence  # recording the raw sentence in the predicate
         yield tuple_
 
 
-def extract_from_raw_sentence(sentence):
+def extract_from_raw_sentence(sentence, c=None):
+    c = c or components()
     raw_sentence = sentence
     sentence = " ".join(tokenize(sentence))
-    sentence = builder.from_raw_senence(sentence)
-    for tuple_ in openie.process_sentence(sentence):
+    sentence = c.builder.from_raw_senence(sentence)
+    for tuple_ in c.openie.process_sentence(sentence):
         tuple_ = build_tuple(tuple_)
         tuple_.predicate.sentence = raw_sentence  # recording the raw sentence in the predicate
         yield tuple_
 
 
-def process_document(document, simplification=False):
-    if simplification:
-        jobs = [gevent.spawn(extract_tuples_with_lexical_simplification, sentence) for sentence in document]
+def extract_from_raw_sentences(sentences, batch_size=64, n_process=1):
+    """
+    Extracting tuples from raw sentences. The sentences are tokenized with one nlp.pipe call and
+    parsed in batched requests, `batch_size` sentences at a time.
+
+    :param sentences: an iterable of raw sentences
+    """
+    for _, tuples in iter_raw_sentences(sentences, batch_size, n_process):
+        for tuple_ in tuples:
+            yield tuple_
+
+
+def iter_raw_sentences(sentences, batch_size=64, n_process=1):
+    """
+    :param sentences: an iterable of raw sentences, read lazily
+    :param n_process: the number of processes tokenizing the sentences, the pool is started once
+
+    :return: a generator of (raw sentence, the tuples extracted from it), in the order of the sentences
+    """
+    c = components()
+    sentences, texts = tee(sentences)
+    tokenized = zip(sentences, pipe_tokenize(texts, batch_size, n_process))
+    while True:
+        batch = list(islice(tokenized, batch_size))
+        if not batch:
+            break
+        parsed = c.builder.from_raw_sentences([" ".join(tokens) for _, tokens in batch])
+        for (raw_sentence, _), sentence in zip(batch, parsed):
+            tuples = []
+            for tuple_ in c.openie.process_sentence(sentence):
+                tuple_ = build_tuple(tuple_)
+                tuple_.predicate.sentence = raw_sentence  # recording the raw sentence in the predicate
+                tuples.append(tuple_)
+            yield raw_sentence, tuples
+
+
+def extract_from_raw_documents(documents, batch_size=64, n_process=1):
+    """
+    Extracting tuples from the raw sentences of documents, the sentences of all the documents go
+    through one nlp.pipe call, so that its worker processes are started only once.
+
+    :param documents: an iterable of documents, each a list of raw sentences
+    :return: a generator of the tuples of each document, in the order of the documents
+    """
+    lengths = deque()  # the number of sentences of the documents read so far
+
+    def sentences():
+        for document in documents:
+            lengths.append(len(document))
+            for sentence in document:
+                yield sentence
+
+    tuples = []
+    remaining = 0
+    for _, sentence_tuples in iter_raw_sentences(sentences(), batch_size, n_process):
+        while remaining == 0:  # a sentence was read, so the length of its document is known
+            remaining = lengths.popleft()
+            if remaining == 0:
+                yield []
+        tuples.extend(sentence_tuples)
+        remaining -= 1
+        if remaining == 0:
+            yield tuples
+            tuples = []
+    for _ in lengths:  # empty documents at the end
+        yield []
+
+
+def process_document(document, simplification=False, concurrency=1, stats=None):
+    """
+    :param concurrency: the number of sentences extracted at the same time, 1 to parse the document
+                        in batched requests instead
+    :param stats: a Counter the projection counts of the document are added to, see
+                  `Components.projection_stats` (only the simplification rebuilds trees)
+    """
+    if concurrency > 1:
+        for _, tuples in iter_document(document, simplification, concurrency, stats=stats):
+            for tuple_ in tuples:
+                yield tuple_
+    elif simplification:
+        c = components()
+        before = c.projection_stats()
+        for tuple_ in extract_document_with_lexical_simplification(document, c):
+            yield tuple_
+        if stats is not None:
+            stats.update(c.projection_stats() - before)
     else:
-        jobs = [gevent.spawn(extract_from_raw_sentence, sentence) for sentence in document]
-    gevent.joinall(jobs)
-    for job in jobs:
-        for tuple_ in job.value:
+        for tuple_ in extract_from_raw_sentences(document):
             yield tuple_
 
 
+async def extract_document_async(document, simplification=False, concurrency=8, max_requests=None, stats=None):
+    """
+    Extracting tuples from the sentences of a document in `concurrency` worker threads, each extracting
+    with components of its own. At most `max_requests` parser requests (`concurrency` by default) are in
+    flight at a time, and the CoreNLP client keeps as many connections alive.
+
+    The threads only overlap while they wait for the parser: the spacy pipeline is shared and its calls
+    are serialized (`spacy_util.analyze`), and the rest of the extraction holds the GIL.
+
+    :param stats: a Counter the projection counts of the threads are added to once they are done
+    :return: an async generator of (sentence index, tuples), in the order of completion
+    """
+    extract = extract_tuples_with_lexical_simplification if simplification else extract_from_raw_sentence
+    request_slots = threading.BoundedSemaphore(max_requests or concurrency)
+    corenlp_util.get_client().reserve_connections(max_requests or concurrency)
+    local = threading.local()
+    created = []  # the components of every thread
+
+    def extract_in_worker(sentence):
+        if not hasattr(local, "components"):
+            local.components = Components(request_slots)
+            created.append(local.components)
+        return list(extract(sentence, local.components))
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def run(index, sentence):
+        return index, await loop.run_in_executor(executor, extract_in_worker, sentence)
+
+    tasks = [asyncio.ensure_future(run(i, sentence)) for i, sentence in enumerate(document)]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=True)
+        if stats is not None:
+            for c in created:
+                stats.update(c.projection_stats())
+
+
+def iter_document(document, simplification=False, concurrency=8, max_requests=None, stats=None):
+    """
+    The synchronous version of `extract_document_async`, driving an event loop of its own.
+
+    :return: a generator of (sentence index, tuples), in the order of completion
+    """
+    loop = asyncio.new_event_loop()
+    results = extract_document_async(document, simplification, concurrency, max_requests, stats)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+
+def warm_up():
+    """
+    Loading everything the extraction uses up front: the components, the spacy model, the verb lemma
+    table and the verb phrase grammar.
+    """
+    components()
+    get_nlp()
+    verb_lemmatizer.get_table()
+    corenlp_util.get_vp_parser()
+
+
+def reopen_connections():
+    """
+    the initializer of a forked worker, which inherits the loaded models but not the connections
+    """
+    corenlp_util.reopen_client()
+    if SentenceBuilder.parse_cache is not None:
+        SentenceBuilder.parse_cache.reopen()
+
+
+def document_size(document):
+    return sum(len(sentence) for sentence in document)
+
+
+def extract_document(task):
+    index, document, simplification = task
+    stats = Counter()
+    tuples = list(process_document(document, simplification, stats=stats))
+    if SentenceBuilder.parse_cache is not None:  # the pool may be terminated before the worker commits
+        SentenceBuilder.parse_cache.commit()
+    return index, tuples, stats
+
+
+def extract_documents(documents, simplification=False, workers=None, stats=None, window=None):
+    """
+    Extracting tuples from documents in a pool of worker processes. The models are loaded once
+    before the workers are forked, so that their memory is shared copy-on-write (where fork isn't
+    available every worker loads them). The documents are read at most `window` ahead of the first
+    one not yielded yet, and the longest document read is handed out whenever a worker is free, so
+    that no worker is left with a long one at the end while the memory stays bounded.
+
+    :param documents: an iterable of documents, each a list of raw sentences
+    :param workers: the number of worker processes, the number of CPUs by default, 1 to extract in
+                    this process
+    :param stats: a Counter the projection counts of the workers are added to, see `process_document`
+    :param window: the number of documents read ahead, 8 per worker by default
+    :return: a generator of the tuples of each document, in the order of the documents
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for document in documents:
+            yield list(process_document(document, simplification, stats=stats))
+        return
+    if window is None:
+        window = 8 * workers
+    if SentenceBuilder.parse_cache is not None:
+        SentenceBuilder.parse_cache.share()  # the workers write to the SQLite file too
+    if "fork" in multiprocessing.get_all_start_methods():
+        warm_up()
+        context = multiprocessing.get_context("fork")
+        initializer = reopen_connections
+    else:
+        context = multiprocessing.get_context()
+        initializer = warm_up
+    documents = iter(documents)
+    pending = []  # (-size, index, document) of the documents read but not handed out, longest first
+    results = {}  # index -> tuples of the documents finished ahead of their turn
+    finished = queue.Queue()
+    next_read = 0
+    next_index = 0
+    running = 0
+    exhausted = False
+    with context.Pool(workers, initializer) as pool:
+        while True:
+            while not exhausted and next_read < next_index + window:
+                document = next(documents, None)
+                if document is None:
+                    exhausted = True
+                    break
+                heapq.heappush(pending, (-document_size(document), next_read, document))
+                next_read += 1
+            while pending and running < workers:
+                _, index, document = heapq.heappop(pending)
+                pool.apply_async(extract_document, ((index, document, simplification),),
+                                 callback=finished.put, error_callback=finished.put)
+                running += 1
+            if not running:
+                break
+            result = finished.get()
+            running -= 1
+            if isinstance(result, BaseException):
+                raise result
+            index, tuples, document_stats = result
+            if stats is not None:
+                stats.update(document_stats)
+            results[index] = tuples
+            while next_index in results:  # holding back the documents finished ahead of their turn
+                yield results.pop(next_index)
+                next_index += 1
+
+
 if __name__ == "__main__":
     # tuples = []
     # for paragraph in paragraphs[:5]:
@@ -0,0 +1,99 @@
+"""
+Interned vocabularies of dependency relations and Penn Treebank tags. Every string gets a small
+integer code once, together with a bitmask of its categories, so the clause logic can test
+integers instead of comparing strings on every node. Code 0 stands for no relation (or tag).
+"""
+import threading
+
+# relation categories
+IS_CLAUSAL = 1        # heads a clause: advcl, acl, acl:relcl, relcl, ccomp, csubj, xcomp
+IS_ADNOMINAL = 2      # a clause modifying a noun: acl, acl:relcl, relcl
+IS_NOMINAL_SUBJECT = 4
+IS_AUX = 8            # aux, auxpass
+IS_COMPOUND = 16      # compound, compound:prt, ...
+
+# tag categories
+IS_VERB = 1
+IS_NOUN = 2
+IS_ADJ = 4
+IS_PARTICIPLE = 8     # VBG, VBN
+
+CLAUSAL_RELATIONS = ["advcl", "acl", "acl:relcl", "relcl", "ccomp", "csubj", "xcomp"]
+ADNOMINAL_RELATIONS = ["acl", "acl:relcl", "relcl"]
+
+# interned first so that the codes of the common strings are the same in every process
+RELATIONS = ["ROOT", "root", "acl", "acl:relcl", "advcl", "advmod", "amod", "appos", "attr", "aux", "auxpass",
+             "case", "cc", "ccomp", "compound", "compound:prt", "conj", "cop", "csubj", "csubjpass", "dep", "det",
+             "dobj", "expl", "iobj", "mark", "neg", "nmod", "nmod:poss", "nsubj", "nsubjpass", "nummod", "oprd",
+             "pobj", "poss", "prep", "prt", "punct", "quantmod", "relcl", "xcomp"]
+TAGS = ["CC", "CD", "DT", "EX", "FW", "IN", "JJ", "JJR", "JJS", "LS", "MD", "NN", "NNS", "NNP", "NNPS", "PDT",
+        "POS", "PRP", "PRP$", "RB", "RBR", "RBS", "RP", "SYM", "TO", "UH", "VB", "VBD", "VBG", "VBN", "VBP",
+        "VBZ", "WDT", "WP", "WP$", "WRB"]
+
+
+def relation_flags(relation):
+    flags = 0
+    if relation in CLAUSAL_RELATIONS:
+        flags |= IS_CLAUSAL
+    if relation in ADNOMINAL_RELATIONS:
+        flags |= IS_ADNOMINAL
+    if relation in ("nsubj", "nsubjpass"):
+        flags |= IS_NOMINAL_SUBJECT
+    if relation in ("aux", "auxpass"):
+        flags |= IS_AUX
+    if relation.startswith("compound"):
+        flags |= IS_COMPOUND
+    return flags
+
+
+def tag_flags(tag):
+    flags = 0
+    if tag.startswith("VB"):
+        flags |= IS_VERB
+    if tag.startswith("NN"):
+        flags |= IS_NOUN
+    if tag.startswith("JJ"):
+        flags |= IS_ADJ
+    if tag in ("VBG", "VBN"):
+        flags |= IS_PARTICIPLE
+    return flags
+
+
+class Vocabulary():
+    """
+    strings interned into integer codes, with the category bitmask of each code
+    """
+    def __init__(self, categorize, strings=()):
+        """
+        :param categorize: a function computing the bitmask of a string
+        :param strings: the strings interned at first
+        """
+        self.categorize = categorize
+        self.strings = [None]  # code 0 is None
+        self.flags = [0]
+        self.codes = {None: 0}
+        self.lock = threading.Lock()
+        for string in strings:
+            self.code(string)
+
+    def code(self, string):
+        code = self.codes.get(string)
+        if code is None:
+            with self.lock:
+                code = self.codes.get(string)
+                if code is None:
+                    code = len(self.strings)
+                    self.strings.append(string)
+                    self.flags.append(self.categorize(string))
+                    self.codes[string] = code
+        return code
+
+    def code_set(self, strings):
+        return frozenset(self.code(string) for string in strings)
+
+    def __len__(self):
+        return len(self.strings)
+
+
+relations = Vocabulary(relation_flags, RELATIONS)
+tags = Vocabulary(tag_flags, TAGS)